@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""
+    Benchmarks of the message passing and the HTTP servers.
+
+    Run them all from the root of the repository, results are written to a
+    JSON file and compared against the stored baseline:
+        python -m benchmarks
+        python -m benchmarks --output results.json
+        python -m benchmarks ping_pong http_server
+        python -m benchmarks --save-baseline
+
+    Every benchmark runs in a process of its own (actors and servers are
+    halted in between, memory is measured from a clean slate) and returns
+    a dict of metrics. Metrics ending in '_per_second' are better higher,
+    all the others (latencies, costs, bytes, errors) are better lower. A
+    metric worse than the baseline by more than the tolerance (25% by
+    default, twice that for the noisier tail latencies, '_p99_') is a
+    regression, and the exit status is 1. Benchmarks with regressions are
+    run again (--retries) keeping the best of each metric, so a burst of
+    load elsewhere in the machine isn't mistaken for one.
+
+    The baseline is only meaningful on the machine it was recorded on:
+    record a new one (--save-baseline) before comparing on another.
+
+    Nothing but the loopback interface is used, the HTTP load is generated
+    by client processes started by the benchmark itself.
+"""
+
+import gc
+import time
+import resource
+import collections
+
+
+# name -> function, in the order they run
+registry = collections.OrderedDict()
+
+MODULES = ('benchmarks.messaging', 'benchmarks.dispatch', 'benchmarks.webserver')
+
+
+def benchmark(function):
+    """Register a function returning a dict of metrics as a benchmark."""
+    registry[function.__name__] = function
+    return function
+
+
+def load():
+    for module in MODULES:
+        __import__(module)
+    return registry
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_second')
+
+
+def tolerance(metric, default):
+    """How much worse than the baseline 'metric' may be."""
+    if '_p99_' in '_%s' % metric:
+        return default * 2
+    return default
+
+
+def percentile(values, fraction):
+    """The value below which 'fraction' (0.0 to 1.0) of the values fall."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def timed(function, repeat=5):
+    """Best wall time of function(), in seconds, over 'repeat' runs (like
+    timeit, the others are mostly slowed down by whatever else runs)."""
+    best = None
+    for _ in range(repeat):
+        started = time.time()
+        function()
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def rss():
+    """Resident memory of this process, in bytes."""
+    gc.collect()
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        # Peak rather than current, on Linux ru_maxrss is in KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
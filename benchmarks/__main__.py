@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+"""
+    Runs the benchmarks, see benchmarks/__init__.py.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+
+import benchmarks
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def run(name):
+    """Run a benchmark in a new process, returns its metrics."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks', '--worker', name],
+                               cwd=root, stdout=subprocess.PIPE)
+    out = process.communicate()[0]
+    if process.returncode != 0:
+        raise RuntimeError("Benchmark %s failed (exit status %i)" % (name, process.returncode))
+    # The metrics are on the last line, in case anything else got printed
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(name):
+    """Run a benchmark and print its metrics as they come."""
+    sys.stderr.write("%s... " % name)
+    started = time.time()
+    metrics = run(name)
+    sys.stderr.write("%.1fs\n" % (time.time() - started))
+    for metric, value in sorted(metrics.items()):
+        sys.stderr.write("    %-28s %14.3f\n" % (metric, value))
+    return metrics
+
+
+def worker(name):
+    """Body of the process running a benchmark."""
+    import hollywood
+    logging.basicConfig(level=logging.ERROR)
+    try:
+        metrics = benchmarks.load()[name]()
+    finally:
+        hollywood.System.halt()
+    sys.stdout.write(json.dumps(metrics, sort_keys=True) + '\n')
+
+
+def best(first, second):
+    """The best of two sets of metrics of the same benchmark."""
+    merged = dict(first)
+    for metric, value in second.items():
+        if metric not in merged:
+            merged[metric] = value
+        elif benchmarks.higher_is_better(metric):
+            merged[metric] = max(merged[metric], value)
+        else:
+            merged[metric] = min(merged[metric], value)
+    return merged
+
+
+def compare(results, baseline, tolerance):
+    """List of (benchmark, metric, baseline, result) for the regressions."""
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            expected = baseline.get(name, {}).get(metric)
+            if expected is None:
+                continue
+            allowed = benchmarks.tolerance(metric, tolerance)
+            if benchmarks.higher_is_better(metric):
+                worse = value < expected * (1 - allowed)
+            else:
+                worse = value > expected * (1 + allowed)
+            if worse:
+                regressions.append((name, metric, expected, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('names', nargs='*', help="benchmarks to run (all by default)")
+    parser.add_argument('--output', help="where to write the results (JSON)")
+    parser.add_argument('--baseline', default=BASELINE, help="results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="how much worse than the baseline is a regression (0.25 = 25%%)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="times a regressed benchmark is run again to confirm it")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        return worker(options.worker)
+
+    registry = benchmarks.load()
+    names = options.names or list(registry)
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        parser.error("unknown benchmarks: %s (there's %s)" % (
+            ', '.join(unknown), ', '.join(registry)))
+
+    results = {}
+    for name in names:
+        results[name] = measure(name)
+
+    baseline = None
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as stored:
+            baseline = json.load(stored)['results']
+    if baseline is not None and not options.save_baseline:
+        # Other processes slow benchmarks down every now and then: only
+        # regressions which happen again count
+        for _ in range(options.retries):
+            regressed = set(name for name, _, _, _ in
+                            compare(results, baseline, options.tolerance))
+            for name in sorted(regressed):
+                sys.stderr.write("Confirming regression: ")
+                results[name] = best(results[name], measure(name))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True, separators=(',', ': '))
+
+    if options.save_baseline:
+        # Keeps the benchmarks which weren't run this time
+        report['results'] = dict(baseline or {}, **results)
+        with open(options.baseline, 'w') as stored:
+            json.dump(report, stored, indent=2, sort_keys=True, separators=(',', ': '))
+            stored.write('\n')
+        sys.stderr.write("Baseline saved: %s\n" % options.baseline)
+        return 0
+
+    if baseline is None:
+        sys.stderr.write("No baseline to compare with: %s\n" % options.baseline)
+        return 0
+    regressions = compare(results, baseline, options.tolerance)
+    for name, metric, expected, value in regressions:
+        sys.stderr.write("REGRESSION %s.%s: %.3f (baseline %.3f)\n" % (
+            name, metric, value, expected))
+    if regressions:
+        return 1
+    sys.stderr.write("No regressions against %s\n" % options.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
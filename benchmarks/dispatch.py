@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""
+    Cost of hollywood.fun.patternmatch dispatch, next to a plain method.
+"""
+
+import hollywood.fun
+
+from benchmarks import benchmark, timed
+
+
+class Plain(object):
+
+    def receive(self, message):
+        return message
+
+
+class Matched(object):
+
+    @hollywood.fun.patternmatch(int)
+    def receive(self, message):
+        return message
+
+    @hollywood.fun.patternmatch(str)
+    def receive(self, message):
+        return message
+
+    @hollywood.fun.patternmatch(int, int)
+    def receive(self, first, second):
+        return first
+
+    @hollywood.fun.default
+    def receive(self, *args):
+        return args
+
+
+@benchmark
+def patternmatch(rounds=5, calls=200000):
+    """Nanoseconds per call, by how the method is matched."""
+    plain, matched = Plain(), Matched()
+    cases = (
+        ('plain_ns', lambda: plain.receive(1)),
+        ('single_ns', lambda: matched.receive(1)),
+        # Matched through the MRO (bool is an int)
+        ('subclass_ns', lambda: matched.receive(True)),
+        ('two_args_ns', lambda: matched.receive(1, 2)),
+        ('default_ns', lambda: matched.receive(1.0)),
+    )
+    metrics = {}
+    for metric, call in cases:
+        def loop():
+            for _ in xrange(calls):
+                call()
+        loop()
+        metrics[metric] = timed(loop, rounds) / calls * 1e9
+    return metrics
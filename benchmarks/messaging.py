@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+"""
+    Message passing: latency, throughput, spawn cost and memory.
+"""
+
+import time
+import threading
+
+import hollywood
+import hollywood.actor
+
+from benchmarks import benchmark, percentile, timed, rss
+
+
+class Echo(hollywood.actor.Threaded):
+
+    def receive(self, message):
+        return message
+
+
+class PooledEcho(hollywood.actor.Pooled):
+
+    def receive(self, message):
+        return message
+
+
+class Worker(hollywood.actor.Pooled):
+
+    def receive(self, number):
+        return number * 2
+
+
+class Collector(hollywood.actor.Threaded):
+
+    def __init__(self):
+        super(Collector, self).__init__()
+        self.count = 0
+
+    def receive(self, message):
+        self.count += 1
+        return self.count
+
+
+class Player(hollywood.actor.Threaded):
+
+    def receive(self, count, partner, done):
+        if count == 0:
+            done.set()
+        else:
+            partner.tell(count - 1, self.address, done)
+
+
+class Ping(Player):
+    pass
+
+
+class Pong(Player):
+    pass
+
+
+class Idle(hollywood.actor.Pooled):
+
+    def receive(self, message):
+        pass
+
+
+class IdleThread(hollywood.actor.Threaded):
+
+    def receive(self, message):
+        pass
+
+
+@benchmark
+def tell_ask(rounds=5, messages=2000):
+    """Round trip of ask().get() and cost of tell, for threads and the pool."""
+    metrics = {}
+    for prefix, actor_class in (('threaded', Echo), ('pooled', PooledEcho)):
+        address = hollywood.System.spawn(actor_class)
+        for i in range(messages):
+            address.ask(i).get()
+
+        latencies = []
+        for _ in range(rounds):
+            for i in range(messages):
+                started = time.time()
+                address.ask(i).get()
+                latencies.append(time.time() - started)
+        metrics[prefix + '_ask_p50_us'] = percentile(latencies, 0.5) * 1e6
+        metrics[prefix + '_ask_p99_us'] = percentile(latencies, 0.99) * 1e6
+
+        def tells():
+            for i in range(messages * 10):
+                address.tell(i)
+            # Everything told before is processed by then
+            address.ask(None).get()
+        elapsed = timed(tells, rounds)
+        metrics[prefix + '_tell_per_second'] = messages * 10 / elapsed
+    return metrics
+
+
+@benchmark
+def fan_out_in(rounds=5, messages=20000, workers=8, senders=8):
+    """Messages through a pool of workers (fan-out) and from many threads
+    to a single actor (fan-in)."""
+    pool = hollywood.System.spawn_pool(Worker, workers)
+    [future.get() for future in [pool.ask(i) for i in range(messages)]]
+    fan_out = timed(lambda: [future.get() for future in
+                             [pool.ask(i) for i in range(messages)]], rounds)
+
+    collector = hollywood.System.spawn(Collector)
+
+    def send():
+        for i in range(messages // senders):
+            collector.tell(i)
+
+    def fan_in():
+        threads = [threading.Thread(target=send) for _ in range(senders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        collector.ask(None).get()
+    fan_in_elapsed = timed(fan_in, rounds)
+
+    return {
+        'fan_out_per_second': messages / fan_out,
+        'fan_in_per_second': messages // senders * senders / fan_in_elapsed,
+    }
+
+
+@benchmark
+def ping_pong(rounds=5, exchanges=20000):
+    """A message bounced back and forth between two actors."""
+    ping = hollywood.System.spawn(Ping)
+    pong = hollywood.System.spawn(Pong)
+
+    def play():
+        done = threading.Event()
+        ping.tell(exchanges, pong, done)
+        done.wait()
+    play()
+    elapsed = timed(play, rounds)
+    return {
+        'messages_per_second': exchanges / elapsed,
+        'round_trip_us': elapsed / exchanges * 2 * 1e6,
+    }
+
+
+@benchmark
+def spawn(pooled=5000, threaded=200):
+    """Cost of spawning actors and memory taken by idle ones."""
+    metrics = {}
+    for prefix, actor_class, count in (('pooled', Idle, pooled),
+                                       ('threaded', IdleThread, threaded)):
+        before = rss()
+        started = time.time()
+        address = hollywood.System.spawn_pool(actor_class, count)
+        elapsed = time.time() - started
+        metrics[prefix + '_spawn_us'] = elapsed / count * 1e6
+        metrics[prefix + '_bytes_per_actor'] = float(max(rss() - before, 0)) / count
+        address.stop()
+    return metrics
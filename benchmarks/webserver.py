@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+"""
+    Requests per second and latency of the HTTP servers, under the load of
+    a few client processes sending requests back to back.
+"""
+
+import time
+import socket
+import multiprocessing
+
+import hollywood
+import hollywood.net.http
+
+from benchmarks import benchmark, percentile
+
+
+REQUEST = 'GET / HTTP/1.1\r\nHost: localhost\r\n%s\r\n'
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _connected(client, timeout=10):
+    """Send the first request, as soon as the server is listening."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return client.request()
+        except socket.error:
+            client.sock = None
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+class _Client(object):
+    """Sends requests to the server and reads whole responses."""
+
+    def __init__(self, port, keep_alive):
+        self.port = port
+        self.keep_alive = keep_alive
+        self.sock = None
+        self.buffered = ''
+
+    def request(self):
+        if self.sock is None:
+            self.sock = socket.create_connection(('127.0.0.1', self.port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.buffered = ''
+        header = '' if self.keep_alive else 'Connection: close\r\n'
+        self.sock.sendall(REQUEST % header)
+        while '\r\n\r\n' not in self.buffered:
+            self._recv()
+        head, self.buffered = self.buffered.split('\r\n\r\n', 1)
+        length, closing = None, not self.keep_alive
+        for line in head.split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                closing = True
+        if length is None:
+            # Delimited by the end of the connection
+            try:
+                while True:
+                    self._recv()
+            except EOFError:
+                pass
+            closing = True
+        else:
+            while len(self.buffered) < length:
+                self._recv()
+            self.buffered = self.buffered[length:]
+        if closing:
+            self.sock.close()
+            self.sock = None
+
+    def _recv(self):
+        data = self.sock.recv(65536)
+        if not data:
+            raise EOFError
+        self.buffered += data
+
+
+def _load(port, keep_alive, requests, start, results):
+    """Body of a client process: time 'requests' requests."""
+    client = _Client(port, keep_alive)
+    latencies, errors = [], 0
+    start.wait()
+    for _ in range(requests):
+        started = time.time()
+        try:
+            client.request()
+        except (socket.error, EOFError):
+            errors += 1
+            if client.sock is not None:
+                client.sock.close()
+                client.sock = None
+            continue
+        latencies.append(time.time() - started)
+    results.put((latencies, errors))
+
+
+def _measure(server_class, keep_alive, clients=8, requests=300, warmup=100):
+    # The clients are forked before the server starts any thread
+    port = _free_port()
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_load,
+                                         args=(port, keep_alive, requests, start, results))
+                 for _ in range(clients)]
+    for process in processes:
+        process.start()
+
+    server = hollywood.System.spawn(server_class)
+    server.tell('127.0.0.1', port)
+    warming = _Client(port, keep_alive)
+    _connected(warming)
+    for _ in range(warmup):
+        warming.request()
+
+    started = time.time()
+    start.set()
+    latencies, errors = [], 0
+    for _ in processes:
+        measured, failed = results.get()
+        latencies.extend(measured)
+        errors += failed
+    elapsed = time.time() - started
+    for process in processes:
+        process.join()
+
+    return {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'errors': float(errors),
+    }
+
+
+@benchmark
+def http_server():
+    """hollywood.net.http.Server, a connection per request."""
+    return _measure(hollywood.net.http.Server, False)
+
+
+@benchmark
+def http_event_server():
+    """hollywood.net.http.EventServer, with keep-alive connections."""
+    return _measure(hollywood.net.http.EventServer, True)
@@ -21,13 +21,29 @@
 
 import time
 import Queue
+import functools
+import itertools
 import threading
 import logging
+import signal
+import collections
+import cPickle as pickle
+import multiprocessing
 
 import hollywood.future
+import hollywood.ipc
+import hollywood.metrics
+import hollywood.scheduler
+from hollywood.scheduler import asyncio
 import hollywood.exceptions
 
 
+# Placed in the inbox to wake up and terminate the event loop
+_STOP = object()
+# Placed in the inbox to wake up the event loop, without any other effect
+_WAKE = object()
+
+
 class Address(object):
     """
         This class is just syntatic sugar.
@@ -49,10 +65,14 @@ class Address(object):
     """
 
     def __init__(self, actor):
-        name = '/'.join([actor.__module__, actor.__class__.__name__])
-        self.name = name.replace('.', '/')
+        self.name = Address.name_of(actor.__class__)
         self.actor = actor
 
+    @staticmethod
+    def name_of(actor_class):
+        name = '/'.join([actor_class.__module__, actor_class.__name__])
+        return name.replace('.', '/')
+
     def ask(self, *args, **kwargs):
         return self.actor.ask(*args, **kwargs)
 
@@ -62,6 +82,12 @@ class Address(object):
     def stop(self):
         return self.actor.stop()
 
+    def pressure(self):
+        return self.actor.pressure()
+
+    def depth(self):
+        return self.actor.depth()
+
     def __repr__(self):
         return self.name
 
@@ -70,76 +96,319 @@ class Base(object):
     """Abstract-y class that implements a synchronous actor.
 
     A synchronous actor is completely unusable, do not subclass this directly.
-    Instead, prefer one of the backends (Threaded).
+    Instead, prefer one of the backends (Threaded, Pooled, Process, Asyncio).
 
     The start/stop method control whether the event loop is running or not.
 
     For every iteration of the event loop, one message is extracted from the
-    inbox and passed as-is to the receive(*message) method.
+    inbox and passed as-is to the receive(*message) method. The event loop
+    blocks on the inbox while it's empty, so idle actors don't use any CPU.
+    Stopping the actor places a sentinel in the inbox to wake it up.
+    Draining it places the same sentinel at the end of the inbox: messages
+    already queued are processed before the event loop terminates.
 
     The method 'tell' is "fire-and-forget": will cause the actor to do some work
     but always returns None.
 
     The method 'ask' is very similar to tell, but returns a future with the
-    result of the computation.
+    result of the computation. If 'receive' raises an exception, the actor
+    carries on and the future's get() raises it instead.
+
+    Messages are queued as (future, args, kwargs, queued) tuples, the future
+    being None for tells and 'queued' the time it was sent at.
+
+    Each actor keeps count of its messages, errors and how long they take in
+    'metrics' (a hollywood.metrics.Metrics), see System.stats().
+
+    Supervised actors (see hollywood.supervisor) stop at the first exception
+    raised by 'receive' and leave the rest of their inbox to the instance
+    their supervisor replaces them with.
+
+    The inbox holds at most 'mailbox_size' messages (0 means unbounded).
+    When it's full, 'overflow' decides what happens to new messages:
+        block: the sender waits for up to 'overflow_timeout' seconds (None
+            waits forever), then MailboxFullError is raised.
+        reject: MailboxFullError is raised straight away.
+        drop_newest: the new message is discarded.
+        drop_oldest: the oldest message in the inbox is discarded.
+    Discarded messages are counted in 'dropped' and their futures fail with
+    MailboxFullError. Senders can check pressure() to back off before that happens.
+    depth() is how many messages are queued or being processed.
+
+    Actors which can process several messages at once more efficiently
+    (e.g. a single write to a socket, file or database) may implement
+    receive_batch(messages) instead of receive. It's handed up to
+    'batch_size' queued messages as a list of (args, kwargs) tuples, waiting
+    up to 'batch_timeout' seconds for the batch to fill up, and returns a
+    list with one result per message (or None, resolving all to None).
     """
 
+    # Weight of the latest sample in the service time moving average
+    service_time_weight = 0.1
+
+    mailbox_size = 0
+    overflow = 'block'
+    overflow_timeout = None
+
+    receive_batch = None
+    batch_size = 100
+    batch_timeout = 0
+
     def __init__(self):
         self.address = Address(self)
-        self.inbox = Queue.Queue()
+        self.inbox = Queue.Queue(maxsize=self.mailbox_size)
         self.is_alive = True
+        self.dropped = 0
+        self.metrics = hollywood.metrics.Metrics()
+        # Moving average of the time spent in 'receive', in seconds
+        self.service_time = 0.0
+        # Messages being processed
+        self.in_flight = 0
+        # Address of the Supervisor, and the exception which stopped the actor
+        self.supervisor = None
+        self.failure = None
+        # Set once the event loop has exited
+        self.terminated = threading.Event()
 
     def stop(self):
         logging.debug("[%s] Received stop signal.", self.address)
         self.is_alive = False
+        # Wake up the event loop in case it's blocked on an empty inbox,
+        # if the inbox is full it isn't blocked anyways
+        try:
+            self.inbox.put_nowait(_STOP)
+        except Queue.Full:
+            pass
+
+    def drain(self, timeout=None):
+        """Stop once the messages already queued are processed.
+
+        Waits for up to 'timeout' seconds for room in a full inbox, raises
+        Queue.Full if there's still none.
+        """
+        logging.debug("[%s] Received drain signal.", self.address)
+        self.inbox.put(_STOP, True, timeout)
+
+    def suspend(self):
+        """Stop after the message being processed, leaving the inbox as is."""
+        logging.debug("[%s] Received suspend signal.", self.address)
+        self.is_alive = False
+        try:
+            self.inbox.put_nowait(_WAKE)
+        except Queue.Full:
+            pass
+
+    def _adopt(self, previous):
+        """Take over the address and inbox of 'previous', which has terminated."""
+        self.address = previous.address
+        self.address.actor = self
+        self.supervisor = previous.supervisor
+        self.metrics = previous.metrics
+        self.dropped = previous.dropped
+        self._adopt_inbox(previous)
+
+    def _adopt_inbox(self, previous):
+        inbox, self.inbox = self.inbox, previous.inbox
+        # The event loop may be waiting on the inbox it had (empty)
+        inbox.put_nowait(_WAKE)
+
+    def _reject(self, error):
+        """Fail the futures of every message left in the inbox."""
+        while True:
+            try:
+                message = self.inbox.get_nowait()
+            except Queue.Empty:
+                return
+            if message not in (_STOP, _WAKE) and message[0] is not None:
+                message[0].set_exception(error)
+
+    def _terminate(self):
+        """The event loop has exited, for good or because 'receive' failed."""
+        logging.info("[%s] Shutting down.", self.address.name)
+        self.terminated.set()
+        if self.failure is not None and self.supervisor is not None:
+            self.supervisor.tell(self, self.failure)
 
     def _loop(self):
         while self.is_alive:
-            if self.inbox.empty():
-                time.sleep(0.01)
+            message = self.inbox.get()
+            if message is _WAKE:
                 continue
-            logging.debug("[%s] Inbox size: %i", self.address, self.inbox.qsize())
-            args, kwargs = self.inbox.get_nowait()
+            if message is _STOP:
+                self.is_alive = False
+                break
+            if self.receive_batch is None:
+                self._process(message)
+            else:
+                self._process_batch(self._batch([message], self.batch_size,
+                                                self.batch_timeout))
+        self._terminate()
+
+    def _batch(self, messages, size, timeout):
+        """Take messages from the inbox until there are 'size' of them."""
+        deadline = time.time() + timeout
+        while len(messages) < size:
             try:
-                self.receive(*args, **kwargs)
-            except Exception as error:
-                logging.error(error, exc_info=True)
-                raise hollywood.exceptions.ActorRuntimeError
-        logging.debug("[%s] Shutting down.", self.address)
-
-    def _loop(self):
-        while self.is_alive:
-            if self.inbox.empty():
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    message = self.inbox.get(True, remaining)
+                else:
+                    message = self.inbox.get_nowait()
+            except Queue.Empty:
+                break
+            if message is _WAKE:
                 continue
-            logging.debug("[%s] Inbox size: %i", self.address.name, self.inbox.qsize())
-            future = self.inbox.get()
-            args, kwargs = future.args, future.kwargs
-            logging.debug("[%s] Processing: %s %s", self.address.name, args, kwargs)
+            if message is _STOP:
+                self.is_alive = False
+                break
+            messages.append(message)
+        return messages
+
+    def _process(self, message):
+        future, args, kwargs, queued = message
+        logging.debug("[%s] Processing: %s %s", self.address.name, args, kwargs)
+        started = time.time()
+        self.metrics.dequeued(started - queued)
+        self.in_flight = 1
+        try:
             result = self._handle(*args, **kwargs)
-            future.put(result)
-        logging.info("[%s] Shutting down.", self.address.name)
-
-    def _handle(self, *args, **kwargs):
+        except Exception as error:
+            self._fail(future, error)
+        else:
+            if future is not None:
+                future.put(result)
+        self.in_flight = 0
+        elapsed = time.time() - started
+        self.service_time += (elapsed - self.service_time) * self.service_time_weight
+        self.metrics.service.observe(elapsed)
+
+    def _process_batch(self, messages):
+        logging.debug("[%s] Processing batch of %i.", self.address.name, len(messages))
+        started = time.time()
+        for message in messages:
+            self.metrics.dequeued(started - message[3])
+        self.in_flight = len(messages)
         try:
-            return self.receive(*args, **kwargs)
+            results = self._handle_batch([(args, kwargs) for _, args, kwargs, _ in messages])
+            if results is None:
+                results = [None] * len(messages)
+            elif not isinstance(results, collections.Sequence) or len(results) != len(messages):
+                # Some futures would never be resolved
+                raise hollywood.exceptions.ActorRuntimeError(
+                    "%s: receive_batch must return %i results, got: %.100r" % (
+                        self.address.name, len(messages), results))
         except Exception as error:
+            for message in messages:
+                self._fail(message[0], error)
+        else:
+            for message, result in itertools.izip(messages, results):
+                if message[0] is not None:
+                    message[0].put(result)
+        self.in_flight = 0
+        elapsed = (time.time() - started) / len(messages)
+        self.service_time += (elapsed - self.service_time) * self.service_time_weight
+        for _ in messages:
+            self.metrics.service.observe(elapsed)
+
+    def _fail(self, future, error):
+        """Hand the exception raised by 'receive' over to whoever asked."""
+        self.metrics.errors += 1
+        if future is None:
+            # Told, nobody would ever know otherwise
             logging.error(error, exc_info=True)
-            self.stop()
-            raise hollywood.exceptions.ActorRuntimeError
+        else:
+            logging.debug(error, exc_info=True)
+            future.set_exception(error)
+        if self.supervisor is not None and self.failure is None:
+            # The supervisor decides what happens next
+            self.failure = error
+            self.is_alive = False
+
+    def _handle(self, *args, **kwargs):
+        return self.receive(*args, **kwargs)
+
+    def _handle_batch(self, messages):
+        return self.receive_batch(messages)
 
     def tell(self, *args, **kwargs):
-        return self.ask(*args, **kwargs)
+        logging.debug("[%s] Queueing message: %s %s", self.address.name, args, kwargs)
+        self._enqueue((None, args, kwargs, time.time()))
+        self.metrics.enqueued(self.dropped)
 
     def ask(self, *args, **kwargs):
-        logging.debug("[%s] Queueing message: %s %s", self.address.name, *args, **kwargs)
-        future = hollywood.future.Base(*args, **kwargs)
-        self.inbox.put(future)
+        logging.debug("[%s] Queueing message: %s %s", self.address.name, args, kwargs)
+        future = hollywood.future.Base()
+        self._enqueue((future, args, kwargs, time.time()))
+        self.metrics.enqueued(self.dropped)
         return future
 
+    def pressure(self):
+        """How full the inbox is, from 0.0 (empty or unbounded) to 1.0."""
+        if not self.mailbox_size:
+            return 0.0
+        return min(self.inbox.qsize() / float(self.mailbox_size), 1.0)
+
+    def depth(self):
+        """Messages in the inbox plus those being processed."""
+        return self.inbox.qsize() + self.in_flight
+
+    def _enqueue(self, message):
+        if self.overflow == 'block':
+            try:
+                self.inbox.put(message, True, self.overflow_timeout)
+            except Queue.Full:
+                raise hollywood.exceptions.MailboxFullError(self.address.name)
+            return
+
+        try:
+            self.inbox.put_nowait(message)
+            return
+        except Queue.Full:
+            if self.overflow == 'reject':
+                raise hollywood.exceptions.MailboxFullError(self.address.name)
+
+        if self.overflow == 'drop_newest':
+            logging.warning("[%s] Inbox full, dropping newest message.", self.address.name)
+            self._drop(message)
+            return
+
+        logging.warning("[%s] Inbox full, dropping oldest message.", self.address.name)
+        while True:
+            with self.inbox.mutex:
+                queued = self.inbox.queue
+                if len(queued) >= self.inbox.maxsize:
+                    # Swapped in place, the markers stay where they are
+                    oldest = _oldest(queued)
+                    if oldest is not None:
+                        queued.remove(oldest)
+                        queued.append(message)
+                    break
+            try:
+                self.inbox.put_nowait(message)
+                return
+            except Queue.Full:
+                continue
+        # Nothing but markers in the inbox otherwise
+        self._drop(message if oldest is None else oldest)
+
+    def _drop(self, message):
+        self.dropped += 1
+        future = message[0]
+        if future is not None:
+            future.set_exception(hollywood.exceptions.MailboxFullError(self.address.name))
+
     def receive(self, *args, **kwargs):
         raise NotImplementedError("'receive' method must be overriden.")
 
 
+def _oldest(queued):
+    """The oldest message in an inbox's deque, skipping the markers."""
+    for message in queued:
+        if message is not _STOP and message is not _WAKE:
+            return message
+    return None
+
+
 class Threaded(Base):
     """
     self.is_alive = True
@@ -150,4 +419,451 @@ class Threaded(Base):
     """
     def __init__(self):
         super(Threaded, self).__init__()
-        threading.Thread(name=self.address, target=self._loop).start()
+        hollywood.scheduler.start_thread(self.address, self._loop)
+
+
+class Pooled(Base):
+    """
+        Multiplex the event loop onto a shared pool of worker threads.
+
+        Doesn't own a thread, so it's cheap enough to spawn tens of thousands
+        of them. Messages are still processed sequentially, but at most
+        'quantum' of them at a time before yielding the worker to another
+        actor (defaults to the scheduler's quantum).
+
+        To tune the pool, replace the scheduler before spawning actors:
+            hollywood.actor.Pooled.scheduler = \
+                hollywood.scheduler.Scheduler(workers=16, quantum=100)
+    """
+
+    scheduler = hollywood.scheduler.Scheduler()
+    quantum = None
+
+    def __init__(self):
+        super(Pooled, self).__init__()
+        self.lock = threading.Lock()
+        self.scheduled = False
+
+    def stop(self):
+        super(Pooled, self).stop()
+        self._schedule()
+
+    def drain(self, timeout=None):
+        super(Pooled, self).drain(timeout)
+        self._schedule()
+
+    def suspend(self):
+        super(Pooled, self).suspend()
+        self._schedule()
+
+    def _adopt(self, previous):
+        super(Pooled, self)._adopt(previous)
+        self._schedule()
+
+    def _enqueue(self, message):
+        super(Pooled, self)._enqueue(message)
+        self._schedule()
+
+    def _schedule(self):
+        with self.lock:
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.scheduler.schedule(self)
+
+    def _run(self, quantum):
+        remaining = self.quantum or quantum
+        while remaining > 0 and self.is_alive:
+            try:
+                message = self.inbox.get_nowait()
+            except Queue.Empty:
+                break
+            if message is _WAKE:
+                continue
+            if message is _STOP:
+                self.is_alive = False
+                break
+            if not self.is_alive:
+                # Suspended or stopped since, the message is left for
+                # whoever takes over the inbox
+                self._requeue(message)
+                break
+            if self.receive_batch is None:
+                self._process(message)
+                remaining -= 1
+            else:
+                # Can't hold the worker waiting for the batch to fill up
+                messages = self._batch([message], min(self.batch_size, remaining), 0)
+                self._process_batch(messages)
+                remaining -= len(messages)
+
+        with self.lock:
+            stopped = not self.is_alive
+            if not stopped and self.inbox.empty():
+                self.scheduled = False
+                return
+        if stopped:
+            # Stays flagged as scheduled so it's never run again
+            self._terminate()
+            return
+        self.scheduler.schedule(self)
+
+    def _requeue(self, message):
+        """Put a message taken from the inbox back at its head."""
+        with self.inbox.mutex:
+            self.inbox.queue.appendleft(message)
+            self.inbox.not_empty.notify()
+
+
+class _Reply(hollywood.future.Base):
+    """Stands in for the parent's future inside a worker process."""
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        super(_Reply, self).__init__()
+        self.key = key
+
+
+def _picklable(error):
+    """Exceptions sent back by worker processes must survive pickling."""
+    if error is None:
+        return None
+    try:
+        pickle.loads(pickle.dumps(error, pickle.HIGHEST_PROTOCOL))
+        return error
+    except Exception:
+        return hollywood.exceptions.ActorRuntimeError(repr(error))
+
+
+class Process(Base):
+    """
+        Run 'receive' in a worker process, escaping the GIL.
+
+        The worker process is forked when the first message arrives, so any
+        state set up in __init__ is carried over. From then on the actor's
+        state lives in the worker: changes aren't visible to the parent.
+
+        Messages and results must be picklable. Messages are written to the
+        pipe in batches of up to 'batch_size' and results come back in
+        batches too. Any str/bytearray argument (or result) larger than
+        'shared_threshold' bytes is transferred through shared memory
+        instead of the pipe (see hollywood.ipc). When receive_batch is
+        implemented, each batch is handed over to it as it arrives.
+
+        Messages count as in flight (see depth) from the moment they're
+        written to the pipe until the worker is done with their batch. If
+        the worker process dies, their futures fail with ActorRuntimeError,
+        as do those of the messages taken out of the inbox along with a
+        stop request.
+    """
+
+    batch_size = 64
+    shared_threshold = 64 * 1024
+
+    def __init__(self):
+        super(Process, self).__init__()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.sequence = itertools.count()
+        self.process = None
+        self.connection = None
+
+    def stop(self):
+        super(Process, self).stop()
+        self._stopped_unstarted()
+
+    def drain(self, timeout=None):
+        super(Process, self).drain(timeout)
+        self._stopped_unstarted()
+
+    def _stopped_unstarted(self):
+        with self.lock:
+            if self.process is None:
+                # Never got a message, there's nothing to wait for
+                self.is_alive = False
+                self.terminated.set()
+
+    def _enqueue(self, message):
+        if self.process is None:
+            self._start()
+        super(Process, self)._enqueue(message)
+
+    def _start(self):
+        with self.lock:
+            if self.process is not None:
+                return
+            self.connection, child_connection = multiprocessing.Pipe()
+            self.process = multiprocessing.Process(name=self.address.name,
+                                                   target=self._serve,
+                                                   args=(child_connection,))
+            self.process.start()
+            child_connection.close()
+            hollywood.scheduler.start_thread(self.address, self._loop)
+            hollywood.scheduler.start_thread(self.address, self._collect)
+
+    def _loop(self):
+        """Feed the worker process with batches of messages."""
+        running = True
+        while running:
+            messages = [self.inbox.get()]
+            while len(messages) < self.batch_size:
+                try:
+                    messages.append(self.inbox.get_nowait())
+                except Queue.Empty:
+                    break
+
+            batch = []
+            for position, message in enumerate(messages):
+                if message is _WAKE:
+                    continue
+                if message is _STOP or not self.is_alive:
+                    self.is_alive = False
+                    running = False
+                    # Taken out of the inbox along with the stop request
+                    self._abandon(messages[position:])
+                    break
+                future, args, kwargs, queued = message
+                self.metrics.dequeued(time.time() - queued)
+                key = None
+                if future is not None:
+                    key = next(self.sequence)
+                    self.pending[key] = future
+                args, kwargs = hollywood.ipc.share_message(args, kwargs,
+                                                           self.shared_threshold)
+                batch.append((key, args, kwargs))
+
+            try:
+                if batch:
+                    with self.lock:
+                        self.in_flight += len(batch)
+                    self.connection.send(batch)
+                if not running:
+                    self.connection.send(None)
+            except (IOError, EOFError):
+                # The worker process is gone, _collect may have failed the
+                # pending futures before these were added
+                self._fail_pending()
+                break
+        logging.info("[%s] Shutting down.", self.address.name)
+
+    def _abandon(self, messages):
+        """Fail the futures of messages which will never reach the worker."""
+        error = hollywood.exceptions.ActorRuntimeError(self.address.name)
+        for message in messages:
+            if message not in (_STOP, _WAKE) and message[0] is not None:
+                message[0].set_exception(error)
+
+    def _fail_pending(self):
+        with self.lock:
+            self.in_flight = 0
+        for key in list(self.pending):
+            future = self.pending.pop(key, None)
+            if future is not None:
+                future.set_exception(hollywood.exceptions.ActorRuntimeError(self.address.name))
+
+    def _collect(self):
+        """Resolve the futures with the results sent by the worker process."""
+        while True:
+            try:
+                results = self.connection.recv()
+            except (IOError, EOFError):
+                break
+            done, results = results
+            with self.lock:
+                self.in_flight -= done
+            for key, result, error in results:
+                if error is None:
+                    self.pending.pop(key).put(result)
+                else:
+                    self.metrics.errors += 1
+                    self.pending.pop(key).set_exception(error)
+        if self.is_alive:
+            logging.error("[%s] Worker process died.", self.address.name)
+            self.stop()
+        self._fail_pending()
+        self.connection.close()
+        self.process.join()
+        self.terminated.set()
+
+    def _serve(self, connection):
+        """Event loop of the worker process."""
+        # Ctrl-C is handled by the parent, which stops us cleanly
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self.connection.close()
+        while True:
+            batch = connection.recv()
+            if batch is None:
+                break
+            # Same as in-process, with futures standing in for the keys
+            now = time.time()
+            messages = [(_Reply(key) if key is not None else None, args, kwargs, now)
+                        for key, args, kwargs in batch]
+            if self.receive_batch is None:
+                for message in messages:
+                    self._process(message)
+            else:
+                self._process_batch(messages)
+            results = [(future.key,
+                        hollywood.ipc.share(future.payload, self.shared_threshold),
+                        _picklable(future.error))
+                       for future, _, _, _ in messages if future is not None]
+            # Sent for tells too, the parent counts the messages in flight
+            connection.send((len(messages), results))
+        connection.close()
+
+
+class Asyncio(Base):
+    """
+        Run the actor in an event loop shared by all Asyncio actors.
+
+        'receive' may return a coroutine (or any awaitable), which is run to
+        completion before the next message is processed. Thousands of I/O
+        bound actors can share the single event loop thread.
+
+        'ask' returns a hollywood.future.Awaitable: other coroutines in the
+        event loop can await it, while threads (or other backends) can
+        still block on get(). Messages may be sent from any thread.
+
+        Messages are queued asynchronously, so a sender can't be blocked or
+        get an exception when the inbox is full: the 'block' and 'reject'
+        overflow policies behave like 'drop_newest'. receive_batch isn't
+        supported.
+    """
+
+    eventloop = hollywood.scheduler.EventLoop()
+
+    def __init__(self):
+        super(Asyncio, self).__init__()
+        # Replaced by an asyncio.Queue, which must be created in the loop
+        self.inbox = None
+        self.eventloop.call(self._start)
+
+    def stop(self):
+        logging.debug("[%s] Received stop signal.", self.address)
+        self.is_alive = False
+        self.eventloop.call(self._deliver, _STOP)
+
+    def drain(self, timeout=None):
+        logging.debug("[%s] Received drain signal.", self.address)
+        self.eventloop.call(self._deliver, _STOP)
+
+    def suspend(self):
+        logging.debug("[%s] Received suspend signal.", self.address)
+        self.is_alive = False
+        self.eventloop.call(self._deliver, _WAKE)
+
+    def _adopt_inbox(self, previous):
+        # The inboxes only exist in the loop (this runs after _start)
+        self.eventloop.call(super(Asyncio, self)._adopt_inbox, previous)
+
+    def _reject(self, error):
+        self.eventloop.call(self._reject_now, error)
+
+    def _reject_now(self, error):
+        while not self.inbox.empty():
+            message = self.inbox.get_nowait()
+            if message not in (_STOP, _WAKE) and message[0] is not None:
+                message[0].set_exception(error)
+
+    def tell(self, *args, **kwargs):
+        logging.debug("[%s] Queueing message: %s %s", self.address.name, args, kwargs)
+        self.eventloop.call(self._deliver, (None, args, kwargs, time.time()))
+
+    def ask(self, *args, **kwargs):
+        logging.debug("[%s] Queueing message: %s %s", self.address.name, args, kwargs)
+        future = hollywood.future.Awaitable(self.eventloop.loop)
+        self.eventloop.call(self._deliver, (future, args, kwargs, time.time()))
+        return future
+
+    def pressure(self):
+        if self.inbox is None:
+            return 0.0
+        return super(Asyncio, self).pressure()
+
+    def depth(self):
+        if self.inbox is None:
+            return 0
+        return super(Asyncio, self).depth()
+
+    def _start(self):
+        self.inbox = asyncio.Queue(maxsize=self.mailbox_size)
+        self._next()
+
+    def _deliver(self, message):
+        if self.inbox.full():
+            if message is _STOP or message is _WAKE:
+                # The consumer isn't waiting on an empty inbox, it will
+                # notice on the next message
+                self.is_alive = False
+                return
+            if self.overflow != 'drop_oldest':
+                logging.warning("[%s] Inbox full, dropping newest message.", self.address.name)
+                self._drop(message)
+                return
+            logging.warning("[%s] Inbox full, dropping oldest message.", self.address.name)
+            oldest = _oldest(self.inbox._queue)
+            if oldest is None:
+                self._drop(message)
+                return
+            self.inbox._queue.remove(oldest)
+            self._drop(oldest)
+        self.inbox.put_nowait(message)
+        if message is not _STOP and message is not _WAKE:
+            self.metrics.enqueued(self.dropped)
+
+    def _next(self):
+        if not self.is_alive:
+            # Failed while supervised, or suspended
+            self._terminate()
+            return
+        if self.inbox.empty():
+            getter = asyncio.ensure_future(self.inbox.get())
+            getter.add_done_callback(lambda getter: self._receive(getter.result()))
+        else:
+            self.eventloop.loop.call_soon(self._receive, self.inbox.get_nowait())
+
+    def _receive(self, message):
+        if message is _WAKE:
+            # Terminates if suspended
+            self._next()
+            return
+        if message is _STOP:
+            self.is_alive = False
+            self._terminate()
+            return
+        future, args, kwargs, queued = message
+        logging.debug("[%s] Processing: %s %s", self.address.name, args, kwargs)
+        started = time.time()
+        self.metrics.dequeued(started - queued)
+        self.in_flight = 1
+        try:
+            result = self._handle(*args, **kwargs)
+        except Exception as error:
+            self._fail(future, error)
+            self._done(started)
+            return
+        if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+            task = asyncio.ensure_future(result)
+            task.add_done_callback(functools.partial(self._complete, future, started))
+        else:
+            if future is not None:
+                future.put(result)
+            self._done(started)
+
+    def _complete(self, future, started, task):
+        try:
+            result = task.result()
+        except Exception as error:
+            self._fail(future, error)
+        else:
+            if future is not None:
+                future.put(result)
+        self._done(started)
+
+    def _done(self, started):
+        self.in_flight = 0
+        elapsed = time.time() - started
+        self.service_time += (elapsed - self.service_time) * self.service_time_weight
+        self.metrics.service.observe(elapsed)
+        self._next()
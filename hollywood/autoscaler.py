@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""
+    Grows and shrinks a pool of actors depending on the load.
+
+    Usage:
+        handler = hollywood.System.spawn_pool(MyResponseHandler, 2)
+        scaler = hollywood.System.spawn(hollywood.autoscaler.AutoScaler,
+                                        handler, minimum=2, maximum=16)
+        scaler.tell()
+
+    Every 'interval' seconds the pool is sampled:
+        - If the average depth (messages queued or being processed, see
+          depth()) is above 'backlog', or there are messages waiting and
+          the average time spent in 'receive' is above 'latency' (in
+          seconds), a new instance is added.
+        - If the inboxes are (almost) empty and the service time is well
+          below 'latency', the least loaded instance is removed. The
+          service time of an idle pool doesn't count, it only reflects
+          the messages processed before.
+
+    After each change the pool is left alone for 'cooldown' seconds, so the
+    effect of the change can be observed before making another one.
+
+    Surplus instances are drained before being stopped: they no longer
+    receive new messages but process whatever is in their inbox. The
+    scaler never waits for room in a full inbox, it tries again on the
+    next sample.
+"""
+
+import time
+import Queue
+import logging
+import threading
+
+import hollywood
+import hollywood.actor
+
+
+class AutoScaler(hollywood.actor.Threaded):
+
+    def __init__(self, pool, minimum=1, maximum=8, backlog=10, latency=None,
+                 cooldown=5.0):
+        super(AutoScaler, self).__init__()
+        self.router = pool.actor
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backlog = backlog
+        self.latency = latency
+        self.cooldown = cooldown
+        self.last_change = 0
+        self.draining = []
+        # Draining, but their inbox was too full to tell them so yet
+        self.undrained = []
+        # Set when stopped, interrupts the wait between samples
+        self.stopping = threading.Event()
+
+    def stop(self):
+        super(AutoScaler, self).stop()
+        self.stopping.set()
+
+    def drain(self, timeout=None):
+        # Samples until stopped, the inbox is never read meanwhile
+        self.stop()
+
+    def receive(self, interval=1.0):
+        logging.info("[%s] Scaling %s (%i-%i instances).", self.address.name,
+                     self.router.address, self.minimum, self.maximum)
+        while self.is_alive:
+            self.scale()
+            self.stopping.wait(interval)
+        for member in self.draining:
+            hollywood.System.forget(member)
+
+    def scale(self):
+        self._reap()
+        members = self.router.members
+        if not members:
+            return
+        if time.time() - self.last_change < self.cooldown:
+            return
+
+        backlog = sum(m.depth() for m in members) / float(len(members))
+        latency = 0.0
+        if backlog:
+            latency = sum(getattr(m, 'service_time', 0.0) for m in members) / len(members)
+        overloaded = backlog > self.backlog or \
+            (self.latency is not None and latency > self.latency)
+        underloaded = backlog < 1 and \
+            (self.latency is None or latency < self.latency / 2)
+
+        if len(members) < self.maximum and overloaded:
+            member = self.router.factory()
+            self.router.add(member)
+            logging.info("[%s] Added %s (backlog: %.1f, latency: %.3fs).",
+                         self.address.name, member.address, backlog, latency)
+        elif len(members) > self.minimum and underloaded:
+            member = min(members, key=lambda m: m.depth())
+            self.router.remove(member)
+            self.draining.append(member)
+            self._drain(member)
+            logging.info("[%s] Draining %s (backlog: %.1f, latency: %.3fs).",
+                         self.address.name, member.address, backlog, latency)
+        else:
+            return
+        self.last_change = time.time()
+
+    def _drain(self, member):
+        try:
+            member.drain(0)
+        except Queue.Full:
+            self.undrained.append(member)
+        else:
+            if member in self.undrained:
+                self.undrained.remove(member)
+
+    def _reap(self):
+        """Forget the drained instances which have already stopped."""
+        for member in list(self.undrained):
+            self._drain(member)
+        for member in [m for m in self.draining if not m.is_alive]:
+            self.draining.remove(member)
+            hollywood.System.forget(member)
@@ -6,6 +6,9 @@
     Doesn't include exceptions for specific actor implementations.
 """
 
+import Queue
+
+
 class ActorNotRegisteredError(Exception):
     """
         When the actor was attempted to be used but it's not yet registered.
@@ -17,8 +20,44 @@ class ActorNotRegisteredError(Exception):
 
 class ActorRuntimeError(Exception):
     """
-        When an actor's "receive" method raises any exception.
+        When an actor won't process a message: its worker process died, its
+        Supervisor gave up restarting it, or the System halted before it got
+        to the message.
+    """
+    pass
+
+class MailboxFullError(Exception):
+    """
+        When a message can't be queued because the actor's inbox is full.
+
+        Raised to the sender when the overflow policy is 'reject', or when
+        it's 'block' and the inbox is still full after the timeout.
+    """
+    pass
+
+class FutureTimeoutError(Queue.Empty):
+    """
+        When the result of a future isn't available in time.
 
-        Should be used by the Supervisor to restart the actor.
+        Subclasses Queue.Empty, which is what futures used to raise.
+    """
+    pass
+
+class FutureAlreadyResolvedError(Exception):
+    """When a result (or exception) is set on a future which already has one."""
+    pass
+
+class NodeConnectionError(Exception):
+    """
+        When the connection to a remote node is lost (or can't be used).
+
+        Futures waiting for a reply from that node fail with it.
+    """
+    pass
+
+class NodeAuthenticationError(NodeConnectionError):
+    """
+        When a node doesn't know the shared secret (see
+        hollywood.remote.authenticate), or doesn't answer the challenge.
     """
     pass
@@ -42,44 +42,149 @@
     In addition:
         - Supports user-defined types:
             @patternmatch(hollywood.net.http.Request)
+        - Subclasses match too, the most specific method wins:
+            @patternmatch(object) matches everything with one argument.
+        - Any matches any type in its position:
+            @patternmatch(int, Any)
+        - A default method is called when nothing else matches, instead of
+          raising TypeError:
+            @default
+            def something(self, *args)
         - The number of arguments in the decorator must be an exact match for
           the number of arguments in the method.
-        - No **kwargs (an anti-pattern anyways when using this style).
+        - No **kwargs for matching (an anti-pattern anyways when using this
+          style), they're passed along as they are.
+
+    Each class body has its own registry: methods are matched among the
+    ones decorated in the same class, under the same name.
+
+    The method matching each combination of argument types is looked up
+    once and remembered, after that calling it costs a dictionary lookup.
 """
 
-class MultiMethod(object):
+import sys
+import inspect
+from types import ClassType
+
+
+class Any(object):
+    """Placeholder type, matches an argument of any type."""
+    pass
 
-    registry = {}
+
+class MultiMethod(object):
 
     def __init__(self, name):
         self.name = name
         self.typemap = {}
-    def __call__(self, *args):
-        types = tuple(arg.__class__ for arg in args[1:])
-        function = self.typemap.get(types)
+        # Registration order, to settle ties between equally specific methods
+        self.order = []
+        self.default = None
+        # Argument type(s) -> method, None when nothing matches
+        self.cache = {}
+
+    def __call__(self, instance, *args, **kwargs):
+        if len(args) == 1:
+            key = args[0].__class__
+        else:
+            key = tuple(arg.__class__ for arg in args)
+        try:
+            function = self.cache[key]
+        except KeyError:
+            function = self.lookup(key)
+        return function(instance, *args, **kwargs)
+
+    def lookup(self, key):
+        """Resolve and remember the method for the argument type(s)."""
+        function = self.resolve(key)
         if function is None:
-            raise TypeError("No match: %s %s" % (self.name, types))
-        return function(*args)
+            raise TypeError("No match: %s %s" % (self.name, key))
+        self.cache[key] = function
+        return function
+
+    def resolve(self, key):
+        """The method for the argument type(s), the default if none matches."""
+        types = (key,) if isinstance(key, (type, ClassType)) else key
+        mros = [inspect.getmro(cls) for cls in types]
+        best, best_score = None, None
+        for index, signature in enumerate(self.order):
+            if len(signature) != len(types):
+                continue
+            score = 0
+            for mro, expected in zip(mros, signature):
+                if expected is Any:
+                    score += len(mro) + 1
+                elif expected in mro:
+                    score += mro.index(expected)
+                else:
+                    break
+            else:
+                if best_score is None or score < best_score:
+                    best, best_score = self.typemap[signature], score
+        return best or self.default
 
     def register(self, types, function):
         if types in self.typemap:
             raise TypeError("Duplicate registration: %s %s" % (self.name, types))
         self.typemap[types] = function
+        self.order.append(types)
+        self.cache.clear()
+
+    def register_default(self, function):
+        if self.default is not None:
+            raise TypeError("Duplicate default: %s" % (self.name))
+        self.default = function
+        self.cache.clear()
+
+
+def _multimethod(function, frame):
+    """The multimethod which 'function' is part of, in the class being defined."""
+    # Stacked decorators
+    mm = getattr(function, 'multimethod', None)
+    if mm is not None:
+        return mm, function.function
+    # Previous definitions with the same name in the same class body
+    previous = frame.f_locals.get(function.__name__)
+    mm = getattr(previous, 'multimethod', None)
+    if mm is None:
+        mm = MultiMethod(function.__name__)
+    return mm, function
+
+
+def _method(mm, function):
+    # Same as mm.__call__, one call less
+    cache = mm.cache
+    def method(instance, *args, **kwargs):
+        if len(args) == 1:
+            key = args[0].__class__
+        else:
+            key = tuple(arg.__class__ for arg in args)
+        try:
+            function = cache[key]
+        except KeyError:
+            function = mm.lookup(key)
+        return function(instance, *args, **kwargs)
+    method.__name__ = function.__name__
+    method.__doc__ = function.__doc__
+    method.multimethod = mm
+    method.function = function
+    return method
+
 
 def patternmatch(*types):
     def register(function):
-        function = getattr(function, "__lastreg__", function)
-        name = function.__name__
-        mm = MultiMethod.registry.get(name)
-        if mm is None:
-            mm = MultiMethod.registry[name] = MultiMethod(name)
+        mm, function = _multimethod(function, sys._getframe(1))
         mm.register(types, function)
-        mm.__lastreg__ = function
-        def getter(instance, *args, **kwargs):
-            return mm(instance, *args, **kwargs)
-        return getter
+        return _method(mm, function)
     return register
 
+
+def default(function):
+    """Method called when no other matches the arguments."""
+    mm, function = _multimethod(function, sys._getframe(1))
+    mm.register_default(function)
+    return _method(mm, function)
+
 # Aliases
 def handle(*types):
     return patternmatch(*types)
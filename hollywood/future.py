@@ -1,25 +1,239 @@
 #!/usr/bin/env python
 
-import Queue
+"""
+    Futures: the results of asking something to an actor.
+
+    A future is resolved exactly once, either with a result (put) or with
+    an exception (set_exception), in which case get() raises it.
+
+    Futures are created for every 'ask', so they're kept as light as
+    possible: no lock or event is allocated unless a thread actually has to
+    wait for the result. State changes are guarded by a single lock shared
+    by all futures, which is only held for a few instructions.
+
+    Futures can be combined without blocking any thread:
+        future.map(function): future of function(result).
+        future.then(function): same, but function may return a future,
+            e.g. to ask the next actor in a pipeline.
+        future.timeout(seconds): fails with FutureTimeoutError if the
+            result isn't available in time.
+        gather(futures): future of the list of all the results.
+        first(futures): future of the first result available.
+    Exceptions are propagated through all of them.
+"""
+
+import threading
+import logging
+
+import hollywood.exceptions
+import hollywood.scheduler
+from hollywood.scheduler import asyncio
+
+
+_lock = threading.Lock()
+_timer = hollywood.scheduler.Timer()
 
 
 class Base(object):
 
-    def __init__(self, *args, **kwargs):
-        self.args = args
-        self.kwargs = kwargs
-        self.outqueue = Queue.Queue(maxsize=1)
+    __slots__ = ('payload', 'error', 'done', 'event', 'callbacks')
+
+    def __init__(self):
         self.payload = None
+        self.error = None
+        self.done = False
+        self.event = None
+        self.callbacks = None
 
     def put(self, payload):
-        self.outqueue.put(payload)
+        self._resolve(payload, None)
+
+    def set_exception(self, error):
+        self._resolve(None, error)
+
+    def _resolve(self, payload, error):
+        with _lock:
+            if self.done:
+                raise hollywood.exceptions.FutureAlreadyResolvedError
+            self.payload = payload
+            self.error = error
+            self.done = True
+            event, callbacks = self.event, self.callbacks
+            self.callbacks = None
+        if event is not None:
+            event.set()
+        if callbacks:
+            for callback in callbacks:
+                self._run(callback)
+
+    def _run(self, callback):
+        try:
+            callback(self)
+        except Exception as error:
+            logging.error(error, exc_info=True)
+
+    def add_done_callback(self, callback):
+        """Call callback(future) once resolved, straight away if it already is.
+
+        Runs in the thread resolving the future, so it should be quick.
+        """
+        with _lock:
+            if not self.done:
+                if self.callbacks is None:
+                    self.callbacks = []
+                self.callbacks.append(callback)
+                return
+        self._run(callback)
 
     def get(self, block=True, timeout=None):
-        self.payload = self.outqueue.get(block, timeout)
+        if not self.done:
+            if not block:
+                raise hollywood.exceptions.FutureTimeoutError
+            with _lock:
+                if not self.done and self.event is None:
+                    self.event = threading.Event()
+                event = self.event
+            if event is not None and not event.wait(timeout):
+                raise hollywood.exceptions.FutureTimeoutError
+        if self.error is not None:
+            raise self.error
         return self.payload
 
     def get_nowait(self, block=False, timeout=0):
         return self.get(block, timeout)
 
     def ready(self):
-        return self.outqueue.qsize()
+        return self.done
+
+    def _copy_to(self, other):
+        """Resolve other with the same outcome, unless it already is."""
+        try:
+            if self.error is not None:
+                other.set_exception(self.error)
+            else:
+                other.put(self.payload)
+        except hollywood.exceptions.FutureAlreadyResolvedError:
+            pass
+
+    def map(self, function):
+        future = Base()
+        def callback(_):
+            if self.error is not None:
+                future.set_exception(self.error)
+                return
+            try:
+                result = function(self.payload)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.put(result)
+        self.add_done_callback(callback)
+        return future
+
+    def then(self, function):
+        future = Base()
+        def callback(_):
+            if self.error is not None:
+                future.set_exception(self.error)
+                return
+            try:
+                result = function(self.payload)
+            except Exception as error:
+                future.set_exception(error)
+                return
+            if isinstance(result, Base):
+                result.add_done_callback(lambda result: result._copy_to(future))
+            else:
+                future.put(result)
+        self.add_done_callback(callback)
+        return future
+
+    def timeout(self, seconds):
+        future = Base()
+        self.add_done_callback(lambda _: self._copy_to(future))
+        _timer.call_later(seconds, _expire, future)
+        return future
+
+
+def _expire(future):
+    try:
+        future.set_exception(hollywood.exceptions.FutureTimeoutError())
+    except hollywood.exceptions.FutureAlreadyResolvedError:
+        pass
+
+
+def gather(futures):
+    """Future of the list of results, fails as soon as any of them does."""
+    futures = list(futures)
+    combined = Base()
+    if not futures:
+        combined.put([])
+        return combined
+    remaining = [len(futures)]
+    def callback(future):
+        if future.error is not None:
+            future._copy_to(combined)
+            return
+        with _lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            combined.put([f.payload for f in futures])
+        except hollywood.exceptions.FutureAlreadyResolvedError:
+            # One of them failed already
+            pass
+    for future in futures:
+        future.add_done_callback(callback)
+    return combined
+
+
+def first(futures):
+    """Future of whichever result (or exception) is available first."""
+    combined = Base()
+    for future in futures:
+        future.add_done_callback(lambda future: future._copy_to(combined))
+    return combined
+
+
+class Awaitable(Base):
+    """
+        A future which can also be awaited from within an event loop.
+
+        Awaiting it creates an asyncio future in 'loop' (the waiter), which
+        is resolved along with this one. It must be awaited from the event
+        loop's thread, get() works from anywhere.
+
+        Trollius can't yield arbitrary objects, use the waiter instead:
+            result = yield From(address.ask(message).waiter)
+    """
+
+    __slots__ = ('loop', '_waiter')
+
+    def __init__(self, loop):
+        super(Awaitable, self).__init__()
+        self.loop = loop
+        self._waiter = None
+
+    @property
+    def waiter(self):
+        if self._waiter is None:
+            self._waiter = asyncio.Future(loop=self.loop)
+            self.add_done_callback(self._wake)
+        return self._waiter
+
+    def _wake(self, _):
+        self.loop.call_soon_threadsafe(self._resolve_waiter)
+
+    def _resolve_waiter(self):
+        if self._waiter.done():
+            return
+        if self.error is not None:
+            self._waiter.set_exception(self.error)
+        else:
+            self._waiter.set_result(self.payload)
+
+    def __iter__(self):
+        return iter(self.waiter)
+
+    __await__ = __iter__
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""
+    Helpers to pass messages between processes.
+
+    Messages are pickled and written to a pipe, which is fine for small
+    payloads but terrible for large strings: they are copied in and out of
+    the kernel in pipe-sized chunks, waking up the reader every time.
+
+    Large str/bytearray payloads are instead written to a file in shared
+    memory (/dev/shm when available). Only the path goes through the pipe,
+    the receiving process maps the file, copies it out and removes it.
+    This is transparent to the receiver: the payload unpickles as the
+    original type.
+"""
+
+from __future__ import absolute_import
+
+import os
+import mmap
+import tempfile
+
+
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _load(path, size, kind):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.unlink(path)
+        if not size:
+            return kind()
+        buf = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        try:
+            return buf[:] if kind is str else kind(buf)
+        finally:
+            buf.close()
+    finally:
+        os.close(fd)
+
+
+class Shared(object):
+    """Wraps a str/bytearray so it's pickled through shared memory."""
+
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __reduce__(self):
+        fd, path = tempfile.mkstemp(prefix='hollywood-', dir=SHM_DIR)
+        try:
+            view = memoryview(self.payload)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        return _load, (path, len(self.payload), type(self.payload))
+
+
+def share(value, threshold):
+    """Wrap value in Shared if it's a large enough str/bytearray."""
+    if isinstance(value, (str, bytearray)) and len(value) >= threshold:
+        return Shared(value)
+    return value
+
+
+def share_message(args, kwargs, threshold):
+    """Apply 'share' to the positional and keyword arguments of a message."""
+    args = tuple(share(arg, threshold) for arg in args)
+    kwargs = dict((k, share(v, threshold)) for k, v in kwargs.iteritems())
+    return args, kwargs
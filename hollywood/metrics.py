@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""
+    Instrumentation of the actors, see System.stats().
+
+    Every actor counts the messages it receives and processes, the errors
+    raised by 'receive', and keeps two histograms: how long messages wait
+    in the inbox, and how long 'receive' takes (service time). The depth of
+    the inbox is the difference between the messages received and the ones
+    processed or dropped.
+
+    Counters are updated without locking, so they may be slightly off when
+    many threads send to the same actor at once: cheap is the point.
+"""
+
+import bisect
+
+
+# Upper bounds of the histogram buckets, in seconds: 1us to ~67s, doubling
+BOUNDS = tuple(0.000001 * 2 ** i for i in range(27))
+
+
+class Histogram(object):
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        # One more, for the values above the last bound
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BOUNDS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BOUNDS[i] if i < len(BOUNDS) else float('inf')
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': list(self.counts),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Metrics(object):
+
+    __slots__ = ('received', 'processed', 'errors', 'peak_depth', 'wait', 'service')
+
+    def __init__(self):
+        self.received = 0
+        self.processed = 0
+        self.errors = 0
+        self.peak_depth = 0
+        self.wait = Histogram()
+        self.service = Histogram()
+
+    def enqueued(self, dropped):
+        self.received += 1
+        depth = self.received - self.processed - dropped
+        if depth > self.peak_depth:
+            self.peak_depth = depth
+
+    def dequeued(self, waited):
+        self.processed += 1
+        self.wait.observe(waited)
+
+    def merge(self, other):
+        self.received += other.received
+        self.processed += other.processed
+        self.errors += other.errors
+        # The deepest inbox, not the sum of peaks reached at different times
+        self.peak_depth = max(self.peak_depth, other.peak_depth)
+        self.wait.merge(other.wait)
+        self.service.merge(other.service)
+
+    def snapshot(self, dropped=0):
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'errors': self.errors,
+            'dropped': dropped,
+            'depth': max(self.received - self.processed - dropped, 0),
+            'peak_depth': self.peak_depth,
+            'wait': self.wait.snapshot(),
+            'service': self.service.snapshot(),
+        }
+
+
+def prometheus(stats):
+    """Render System.stats() in the Prometheus text format."""
+    lines = []
+    counters = (
+        ('received', 'counter', 'Messages queued in the inbox.'),
+        ('processed', 'counter', 'Messages taken out of the inbox.'),
+        ('errors', 'counter', 'Exceptions raised by receive.'),
+        ('dropped', 'counter', 'Messages discarded because the inbox was full.'),
+        ('depth', 'gauge', 'Messages in the inbox.'),
+        ('peak_depth', 'gauge', 'Most messages ever in the inbox.'),
+    )
+    actors = sorted(stats['actors'].items())
+    for key, kind, description in counters:
+        name = 'hollywood_actor_%s' % key
+        if kind == 'counter':
+            name += '_total'
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, kind))
+        for actor, metrics in actors:
+            lines.append('%s{actor="%s"} %s' % (name, _escape(actor), metrics[key]))
+
+    histograms = (
+        ('wait', 'hollywood_actor_queue_wait_seconds', 'Time messages spent in the inbox.'),
+        ('service', 'hollywood_actor_service_seconds', 'Time spent in receive.'),
+    )
+    for key, name, description in histograms:
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s histogram' % name)
+        for actor, metrics in actors:
+            label = _escape(actor)
+            histogram = metrics[key]
+            cumulative = 0
+            for bound, count in zip(BOUNDS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                if bound != '+Inf':
+                    bound = '%g' % bound
+                lines.append('%s_bucket{actor="%s",le="%s"} %i' % (name, label, bound, cumulative))
+            lines.append('%s_sum{actor="%s"} %r' % (name, label, histogram['sum']))
+            lines.append('%s_count{actor="%s"} %i' % (name, label, histogram['count']))
+
+    tls = (
+        ('handshakes', 'counter', 'TLS handshakes completed.'),
+        ('handshake_failures', 'counter', 'TLS handshakes failed.'),
+        ('handshake_latency', 'gauge', 'Average time taken by a TLS handshake, in seconds.'),
+        ('sessions_resumed', 'counter', 'TLS sessions resumed.'),
+        ('resumption_ratio', 'gauge', 'Share of the TLS handshakes resuming a session.'),
+    )
+    contexts = sorted(stats.get('tls', {}).items())
+    for key, kind, description in tls:
+        name = 'hollywood_tls_%s' % key
+        if kind == 'counter':
+            name += '_total'
+        elif key == 'handshake_latency':
+            name += '_seconds'
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, kind))
+        for certfile, values in contexts:
+            lines.append('%s{certificate="%s"} %r' % (name, _escape(certfile), values[key]))
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
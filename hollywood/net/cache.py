@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+import time
+import logging
+import collections
+
+import hollywood.actor
+import hollywood.exceptions
+import hollywood.net.http
+
+
+class CachingHandler(hollywood.actor.Threaded):
+    """
+        Caches the responses of another response handler:
+            handler = hollywood.System.spawn(MyResponseHandler)
+            cache = hollywood.System.spawn(hollywood.net.cache.CachingHandler, handler)
+            server = hollywood.System.spawn(hollywood.net.http.EventServer, cache)
+
+        GET responses are cached by path and the request headers listed in
+        'vary', for 'ttl' seconds unless the handler's response says
+        otherwise with Cache-Control (max-age, no-store, no-cache, private).
+        The least recently used responses are evicted to stay under
+        'max_size' bytes. Only responses whose content is a string are
+        cached, never streamed ones or files (FileRange).
+
+        Concurrent requests for the same missing response are coalesced:
+        the handler gets the first one only, the rest wait for its response,
+        for up to 'response_timeout' seconds (then they're answered with a
+        504). Any other request is passed straight through to the handler.
+    """
+
+    ttl = 60
+    response_timeout = 30
+    max_size = 64 * 1024 * 1024
+    vary = ('accept', 'accept-encoding')
+    cacheable = (200, 203, 301, 404, 410)
+
+    def __init__(self, handler):
+        super(CachingHandler, self).__init__()
+        self.handler = handler
+        # key -> _Entry, least recently used first
+        self.cache = collections.OrderedDict()
+        self.size = 0
+        # key -> requests waiting for the response being computed
+        self.waiting = {}
+        self.hits = 0
+        self.misses = 0
+
+    def receive(self, request, response=None):
+        if isinstance(request, _Capture):
+            return self._complete(request, response)
+        if request.method != 'GET':
+            self.handler.tell(request)
+            return None
+
+        key = (request.path,) + tuple(request.headers.get(name) for name in self.vary)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry.expires > time.time() and not _no_cache(request.headers):
+                del self.cache[key]
+                self.cache[key] = entry # Now the most recently used
+                self.hits += 1
+                request.send(entry.response())
+                return None
+            self._evict(key)
+
+        self.misses += 1
+        if key in self.waiting:
+            self.waiting[key].append(request)
+            return None
+        self.waiting[key] = [request]
+        capture = _Capture(self.address, request, key, self.waiting[key])
+        try:
+            answered = self.handler.ask(capture).timeout(self.response_timeout)
+            answered.add_done_callback(capture.finish)
+        except hollywood.exceptions.MailboxFullError:
+            capture.send(hollywood.net.http.Response(503))
+        return None
+
+    def _complete(self, capture, response):
+        if self.waiting.get(capture.key) is not capture.waiting:
+            # Answered already (e.g. it timed out), the key may be in flight again
+            return None
+        waiting = self.waiting.pop(capture.key)
+        ttl = self._ttl(response)
+        if ttl:
+            self._store(capture.key, _Entry(response, time.time() + ttl))
+        elif waiting[1:] and not self._shareable(response):
+            # The others get their own response
+            for request in waiting[1:]:
+                self.handler.tell(request)
+            waiting = waiting[:1]
+        for request in waiting:
+            request.send(_copy(response))
+        return response
+
+    def _ttl(self, response):
+        """Seconds the response may be cached for, 0 if it mustn't be."""
+        if response.code not in self.cacheable or not isinstance(response.content, basestring):
+            return 0
+        ttl = self.ttl
+        for name, value in response.headers:
+            if name.lower() != 'cache-control':
+                continue
+            for directive in value.lower().split(','):
+                directive = directive.strip()
+                if directive in ('no-store', 'no-cache', 'private'):
+                    return 0
+                if directive.startswith('max-age=') or directive.startswith('s-maxage='):
+                    try:
+                        ttl = int(directive.split('=', 1)[1])
+                    except ValueError:
+                        return 0
+        return ttl
+
+    def _shareable(self, response):
+        """Whether concurrent identical requests may get the same response."""
+        if not isinstance(response.content, basestring):
+            return False
+        for name, value in response.headers:
+            if name.lower() == 'cache-control' and 'private' in value.lower():
+                return False
+        return True
+
+    def _store(self, key, entry):
+        if entry.size > self.max_size:
+            return
+        if key in self.cache:
+            self._evict(key)
+        self.cache[key] = entry
+        self.size += entry.size
+        while self.size > self.max_size:
+            self._evict(next(iter(self.cache)))
+
+    def _evict(self, key):
+        entry = self.cache.pop(key)
+        self.size -= entry.size
+
+
+class _Entry(object):
+
+    __slots__ = ('cached', 'stored', 'expires', 'size')
+
+    def __init__(self, response, expires):
+        self.cached = response
+        self.stored = time.time()
+        self.expires = expires
+        self.size = 256 + len(response.content) + sum(
+            len(name) + len(value) for name, value in response.headers)
+
+    def response(self):
+        response = _copy(self.cached)
+        response.headers.append(('Age', str(int(time.time() - self.stored))))
+        return response
+
+
+class _Capture(hollywood.net.http.Request):
+    """Stands for a request in front of the handler, hands its response over
+    to the cache instead of sending it."""
+
+    def __init__(self, cache, request, key, waiting):
+        super(_Capture, self).__init__(address=request.address)
+        self.method = request.method
+        self.path = request.path
+        self.protocol = request.protocol
+        self.headers = request.headers
+        self.body = request.body
+        self.params = request.params
+        self.cache = cache
+        self.key = key
+        # The requests waiting for this response, while it's in flight
+        self.waiting = waiting
+
+    def send(self, response):
+        self.responded = True
+        self.cache.tell(self, response)
+
+    def finish(self, future):
+        """Called once the handler is done (or late), answers for it if it
+        failed, returned without sending a response or took too long."""
+        if self.responded:
+            return
+        if isinstance(future.error, hollywood.exceptions.FutureTimeoutError):
+            logging.warning("No response for %s in time", self.path)
+            self.send(hollywood.net.http.Response(504))
+            return
+        if future.error is not None:
+            logging.error("Response handler failed on %s: %r", self.path, future.error)
+        else:
+            logging.error("Response handler returned without answering %s", self.path)
+        self.send(hollywood.net.http.Response(500))
+
+
+def _copy(response):
+    """A response which can be sent independently of the original."""
+    copy = hollywood.net.http.Response(response.code)
+    copy.content = response.content
+    copy.content_type = response.content_type
+    copy.server = response.server
+    copy.headers = list(response.headers)
+    copy.last_modified = response.last_modified
+    if response.redirect:
+        copy.redirect = response.redirect
+    copy.code = response.code
+    return copy
+
+
+def _no_cache(headers):
+    control = headers.get('cache-control', '') + headers.get('pragma', '')
+    if 'no-cache' in control.lower():
+        logging.debug("Bypassing cache: %s", control)
+        return True
+    return False
@@ -1,17 +1,250 @@
 #!/usr/bin/env python
 
+import os
+import time
+import errno
+import fcntl
+import socket
 import logging
-import datetime
-import email
+import functools
+import threading
+import collections
 import ssl
 
 import hollywood.actor
+import hollywood.exceptions
+import hollywood.metrics
 import hollywood.net.socks
+import hollywood.net.tls
+
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep",
+           "Oct", "Nov", "Dec")
+# Second and RFC 1123 representation of the last date formatted
+_date_cache = (0, '')
+
+
+def http_date(timestamp=None):
+    """Date according to RFC 1123, now unless a timestamp is given.
+
+    The current date is formatted at most once per second.
+    """
+    if timestamp is not None:
+        return _format_date(time.gmtime(timestamp))
+    global _date_cache
+    second = int(time.time())
+    cached = _date_cache
+    if cached[0] != second:
+        cached = (second, _format_date(time.gmtime(second)))
+        _date_cache = cached
+    return cached[1]
+
+
+def _format_date(date):
+    return "%s, %02d %s %04d %02d:%02d:%02d GMT" % (
+        _WEEKDAYS[date.tm_wday], date.tm_mday, _MONTHS[date.tm_mon - 1],
+        date.tm_year, date.tm_hour, date.tm_min, date.tm_sec)
 
 
 class BadRequestError(Exception):
     """Unable to properly parse the request."""
-    pass
+
+    def __init__(self, code=400):
+        super(BadRequestError, self).__init__(code)
+        # Status code of the response to send back
+        self.code = code
+
+
+class Headers(dict):
+    """Case-insensitive dictionary of headers (keys are kept lowercase)."""
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.lower())
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key.lower(), value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key.lower())
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.lower())
+
+    def get(self, key, default=None):
+        return dict.get(self, key.lower(), default)
+
+
+class RequestParser(object):
+    """Incremental HTTP/1.x request parser.
+
+    Data is fed as it's received, in pieces of any size: feed() returns
+    the requests completed by each piece (possibly several, when they're
+    pipelined). Request bodies are read according to Content-Length or
+    chunked Transfer-Encoding.
+
+    Received data is appended to a single buffer which is only compacted
+    once most of it has been consumed, and the terminator of the headers
+    isn't searched for again in data which was already scanned.
+
+    Malformed data sets 'error' (a BadRequestError), the requests completed
+    before it are still returned and nothing else is parsed afterwards.
+    """
+
+    HEAD, BODY, CHUNK_SIZE, CHUNK_DATA, TRAILER = range(5)
+
+    def __init__(self, max_header_size=64 * 1024, max_body_size=1024 * 1024):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.buffer = bytearray()
+        self.offset = 0 # Start of the unparsed data
+        self.scanned = 0 # Where to resume looking for line terminators
+        self.state = RequestParser.HEAD
+        self.request = None
+        self.remaining = 0
+        self.chunks = []
+        # Size of the trailer lines read so far
+        self.trailer = 0
+        self.error = None
+
+    def feed(self, data):
+        if self.error:
+            return []
+        self.buffer += data
+        requests = []
+        try:
+            while self._step():
+                if self.state == RequestParser.HEAD and self.request:
+                    requests.append(self.request)
+                    self.request = None
+        except BadRequestError as error:
+            self.error = error
+            return requests
+        if self.offset > len(self.buffer) / 2:
+            del self.buffer[:self.offset]
+            self.scanned -= self.offset
+            self.offset = 0
+        return requests
+
+    def _line(self, terminator, limit):
+        """Offset of the next terminator, None if it hasn't arrived yet.
+
+        Raises BadRequestError if the line is longer than 'limit', whether
+        its terminator has arrived or not.
+        """
+        start = max(self.offset, self.scanned - len(terminator) + 1)
+        end = self.buffer.find(terminator, start)
+        if end < 0:
+            self.scanned = len(self.buffer)
+            length = len(self.buffer) - self.offset
+        else:
+            self.scanned = end + len(terminator)
+            length = end - self.offset
+        if length > limit:
+            raise BadRequestError(431 if self.state in (RequestParser.HEAD,
+                                                        RequestParser.TRAILER) else 400)
+        return end if end >= 0 else None
+
+    def _take(self, end, skip):
+        data = str(self.buffer[self.offset:end])
+        self.offset = end + skip
+        self.scanned = self.offset
+        return data
+
+    def _step(self):
+        """Parse as much as possible, returns False when more data is needed."""
+        if self.state == RequestParser.HEAD:
+            end = self._line('\r\n\r\n', self.max_header_size)
+            if end is None:
+                return False
+            head = self._take(end, 4)
+            if not head.strip():
+                return True # Stray line breaks between requests
+            self.request = self._head(head)
+            length = self.request.headers.get('content-length')
+            encoding = self.request.headers.get('transfer-encoding', '').lower()
+            if encoding == 'chunked':
+                self.state = RequestParser.CHUNK_SIZE
+            elif length:
+                try:
+                    self.remaining = int(length)
+                except ValueError:
+                    raise BadRequestError
+                if self.remaining < 0:
+                    raise BadRequestError
+                if self.remaining > self.max_body_size:
+                    raise BadRequestError(413)
+                self.state = RequestParser.BODY
+            return True
+
+        if self.state == RequestParser.BODY:
+            if len(self.buffer) - self.offset < self.remaining:
+                return False
+            self.request.body = self._take(self.offset + self.remaining, 0)
+            self.state = RequestParser.HEAD
+            return True
+
+        if self.state == RequestParser.CHUNK_SIZE:
+            end = self._line('\r\n', 1024)
+            if end is None:
+                return False
+            try:
+                self.remaining = int(self._take(end, 2).split(';')[0], 16)
+            except ValueError:
+                raise BadRequestError
+            self.state = RequestParser.CHUNK_DATA if self.remaining else RequestParser.TRAILER
+            if sum(len(chunk) for chunk in self.chunks) + self.remaining > self.max_body_size:
+                raise BadRequestError(413)
+            return True
+
+        if self.state == RequestParser.CHUNK_DATA:
+            if len(self.buffer) - self.offset < self.remaining + 2:
+                return False
+            self.chunks.append(self._take(self.offset + self.remaining, 2))
+            self.state = RequestParser.CHUNK_SIZE
+            return True
+
+        # Trailer: header lines after the last chunk, ignored
+        end = self._line('\r\n', self.max_header_size - self.trailer)
+        if end is None:
+            return False
+        line = self._take(end, 2)
+        if line:
+            self.trailer += len(line) + 2
+            return True
+        self.request.body = ''.join(self.chunks)
+        self.chunks = []
+        self.trailer = 0
+        self.state = RequestParser.HEAD
+        return True
+
+    def _head(self, head):
+        lines = head.split('\r\n')
+        logging.info("REQUEST: %s", lines[0])
+        first_line = lines[0].split(' ')
+        if len(first_line) not in (2, 3):
+            logging.error("Unable to parse request: [%s]", head)
+            raise BadRequestError
+
+        request = Request()
+        request.method = first_line[0]
+        request.path = first_line[1]
+        if len(first_line) == 3:
+            request.protocol = first_line[2]
+
+        headers = request.headers
+        for line in lines[1:]:
+            name, separator, value = line.partition(':')
+            if not separator:
+                logging.error("Unable to parse request header: [%s]", line)
+                raise BadRequestError
+            name = name.strip().lower()
+            value = value.strip()
+            if name in headers:
+                # Repeated headers are equivalent to a comma separated list
+                value = headers[name] + ', ' + value
+            headers[name] = value
+        return request
 
 
 class Request(object):
@@ -25,35 +258,128 @@ class Request(object):
                 host: localhost:5000
                 connection: keep-alive
             }
+            body: the content sent along with the request, if any
+            params: {id: 42} (see hollywood.net.routes)
+
+        Requests are built by the RequestParser, optionally straight from a
+        complete raw request.
     """
 
-    def __init__(self, socket, address, raw_string):
+    def __init__(self, socket=None, address=None, raw_string=None,
+                 connection=None, sequence=0):
 
         self.socket = socket
         self.address = address
-        raw_string = raw_string.strip()
-        if not raw_string:
+        self.connection = connection
+        # Position in the connection, responses are sent in the same order
+        self.sequence = sequence
+        self.method = None
+        self.path = None
+        self.protocol = 'HTTP/1.0'
+        self.headers = Headers()
+        self.body = ''
+        # Values taken from the path, see hollywood.net.routes
+        self.params = {}
+        self.keep_alive = False
+        # Set once send() has been called
+        self.responded = False
+        if raw_string is None:
+            return
+
+        if not raw_string.strip():
             logging.error("Empty request from: %s", address)
             raise BadRequestError
-
-        try:
-            lines = raw_string.strip().splitlines()
-            logging.info("REQUEST: %s", lines[0])
-
-            first_line = lines[0].split(' ')
-            self.method = first_line[0]
-            self.path = first_line[1]
-            if len(first_line) == 3:
-                self.protocol = first_line[2]
-
-            self.headers = email.message_from_string('\r\n'.join(lines[1:]))
-        except Exception:
-            logging.error("Unable to parse request: [%s]", raw_string, exc_info=True)
+        parser = RequestParser()
+        requests = parser.feed(raw_string.lstrip())
+        if parser.error:
+            raise parser.error
+        if not requests:
+            logging.error("Incomplete request from: %s", address)
             raise BadRequestError
+        parsed = requests[0]
+        self.method = parsed.method
+        self.path = parsed.path
+        self.protocol = parsed.protocol
+        self.headers = parsed.headers
+        self.body = parsed.body
+
+    def wants_keep_alive(self):
+        option = self.headers.get('connection', '').lower()
+        if self.protocol == 'HTTP/1.1':
+            return option != 'close'
+        return option == 'keep-alive'
 
     def send(self, response):
-        self.socket.sendall(response.to_string())
-        self.socket.close()
+        self.responded = True
+        if response.protocol != self.protocol and self.protocol in ('HTTP/1.0', 'HTTP/1.1'):
+            response.protocol = self.protocol
+        response.keep_alive = self.keep_alive
+
+        if not self.connection:
+            for piece in response.pieces():
+                if isinstance(piece, FileRange):
+                    piece.sendall(self.socket)
+                else:
+                    self.socket.sendall(piece)
+            self.socket.close()
+            return
+
+        # Hand the pieces over as they're produced, so streamed responses
+        # don't have to be kept in memory
+        pieces = response.pieces()
+        previous = next(pieces)
+        for piece in pieces:
+            self.connection.send(self.sequence, previous, False)
+            previous = piece
+        # The headers are out, so whether the connection can be kept is known
+        self.connection.send(self.sequence, previous, True, not response.keep_alive)
+
+
+class FileRange(object):
+    """Piece of a response sent straight from a file: 'count' bytes from
+    'offset'.
+
+    Uses sendfile where available (not through TLS), so the content is
+    never copied into Python strings. The file is closed once sent.
+    """
+
+    def __init__(self, path, offset=0, count=None):
+        self.file = open(path, 'rb')
+        if count is None:
+            count = os.fstat(self.file.fileno()).st_size - offset
+        self.offset = offset
+        self.remaining = count
+
+    def __len__(self):
+        return self.remaining
+
+    def __str__(self):
+        self.file.seek(self.offset)
+        return self.file.read(self.remaining)
+
+    def send(self, sock):
+        """Send as much as possible without blocking, return the bytes sent."""
+        count = min(self.remaining, 1024 * 1024)
+        if hollywood.net.socks.sendfile and not isinstance(sock, ssl.SSLSocket):
+            sent = hollywood.net.socks.sendfile(sock.fileno(), self.file.fileno(),
+                                                self.offset, count)
+        else:
+            self.file.seek(self.offset)
+            sent = sock.send(self.file.read(min(count, 65536)))
+        self.offset += sent
+        self.remaining -= sent
+        if not self.remaining or not sent:
+            self.close()
+        return sent
+
+    def sendall(self, sock):
+        while self.remaining:
+            if not self.send(sock):
+                raise socket.error(errno.EPIPE, "File truncated while sending")
+
+    def close(self):
+        self.remaining = 0
+        self.file.close()
 
 
 class Response(object):
@@ -93,6 +419,7 @@ class Response(object):
         415: 'Unsupported Media Type',
         416: 'Requested Range Not Satisfiable',
         417: 'Expectation Failed',
+        431: 'Request Header Fields Too Large',
         500: 'Internal Server Error',
         501: 'Not Implemented',
         502: 'Bad Gateway',
@@ -101,35 +428,42 @@ class Response(object):
         505: 'HTTP Version Not Supported',
     }
 
+    # Contents up to this size are copied after the headers, to send them at once
+    inline_size = 16 * 1024
+
     def __init__(self, code=200):
+        # A string, a FileRange, or any iterable of strings to stream the content
         self.content = ''
+        # Additional headers: [(name, value)]
+        self.headers = []
         self.code = code
         self.protocol = 'HTTP/1.0'
+        self.keep_alive = False
         self.server = "Promenade/0.1 (noarch)"
         self.last_modified = ''
         self.content_type = 'text/html'
         self._redirect = None
         self._last_modified = None
+        self._content_length = None
 
     @property
     def date(self):
-        """Return a string representation of a date according to RFC 1123
-        (HTTP/1.0).
-
-        The supplied date must be in UTC.
+        """Return a string representation of the current date according to
+        RFC 1123 (HTTP/1.0), in UTC.
 
         """
-        now = datetime.datetime.now()
-        weekday = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][now.weekday()]
-        month = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep",
-                 "Oct", "Nov", "Dec"][now.month - 1]
-        return "%s, %02d %s %04d %02d:%02d:%02d GMT" % (weekday, now.day, month,
-                                                        now.year, now.hour,
-                                                        now.minute, now.second)
+        return http_date()
 
     @property
     def content_length(self):
-        return str(len(self.content))
+        """Length of the content, may be set for responses to HEAD requests."""
+        if self._content_length is None:
+            return len(self.content)
+        return self._content_length
+
+    @content_length.setter
+    def content_length(self, value):
+        self._content_length = value
 
     @property
     def last_modified(self):
@@ -150,36 +484,103 @@ class Response(object):
     def last_modified(self, value):
         self._last_modified = value
 
+    @property
+    def streaming(self):
+        return not isinstance(self.content, (basestring, FileRange))
+
+    @property
+    def chunked(self):
+        return self.streaming and self.protocol == 'HTTP/1.1'
+
+    def _headers(self):
+        status = Response.status_lines.get((self.protocol, self.code))
+        if status is None:
+            status = '%s %i %s\r\n' % (self.protocol, self.code, Response.codes[self.code])
+        logging.debug("RESPONSE: %s", status)
+        if self.chunked:
+            length = 'Transfer-Encoding: chunked\r\n'
+        elif self.code in (204, 304):
+            length = ''
+        elif not self.streaming:
+            length = 'Content-Length: %i\r\n' % self.content_length
+        else:
+            length = ''
+        if self._redirect:
+            length += 'Location: %s\r\n' % self._redirect
+        for name, value in self.headers:
+            length += '%s: %s\r\n' % (name, value)
+        # Without a length, the end of the content is the end of the connection
+        if self.keep_alive and (self.chunked or not self.streaming):
+            connection = 'Connection: keep-alive\r\n\r\n'
+        else:
+            self.keep_alive = False
+            connection = 'Connection: close\r\n\r\n'
+        date = http_date()
+        return '%sDate: %s\r\nServer: %s\r\nLast-Modified: %s\r\n%sContent-Type: %s\r\n%s' % (
+            status, date, self.server, self._last_modified or date, length,
+            self.content_type, connection)
+
+    def pieces(self):
+        """Yield the response in pieces: headers (and content), then the
+        streamed content, if any.
+
+        Small contents are sent along with the headers, large ones are
+        yielded on their own rather than copied.
+        """
+        if not self.streaming:
+            if not isinstance(self.content, FileRange) and len(self.content) <= Response.inline_size:
+                yield self._headers() + self.content
+            else:
+                yield self._headers()
+                yield self.content
+            return
+        chunked = self.chunked
+        yield self._headers()
+        for chunk in self.content:
+            if not chunk:
+                continue
+            if chunked:
+                chunk = '%x\r\n%s\r\n' % (len(chunk), chunk)
+            yield chunk
+        if chunked:
+            yield '0\r\n\r\n'
+
     def to_string(self):
-        header = ' '.join([self.protocol, str(self.code), Response.codes[self.code]])
-        logging.debug("RESPONSE: %s", header)
-        out = [
-            header,
-            'Date: ' + self.date,
-            'Server: ' + self.server,
-            'Last-Modified: ' + self.last_modified,
-            'Content-Length: ' + self.content_length,
-            'Content-Type: ' + self.content_type,
-            'Connection: close',
-            '\r\n',
-            self.content,
-        ]
-
-        return '\n'.join(out)
+        return ''.join(str(piece) for piece in self.pieces())
+
+
+# Encoded status lines: (protocol, code) -> 'HTTP/1.1 200 OK\r\n'
+Response.status_lines = dict(
+    ((protocol, code), '%s %i %s\r\n' % (protocol, code, reason))
+    for protocol in ('HTTP/1.0', 'HTTP/1.1')
+    for code, reason in Response.codes.iteritems())
 
 
 class RequestHandler(hollywood.actor.Threaded):
 
     def receive(self, connection, address):
-        data = connection.recv(8192) # Should be enough for everybody
-
+        parser = RequestParser()
         try:
-            request = Request(connection, address, data)
-            return request
-        except BadRequestError:
-            response = Response(400)
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    logging.error("Incomplete request from: %s", address)
+                    raise BadRequestError
+                requests = parser.feed(data)
+                if requests:
+                    break
+                if parser.error:
+                    raise parser.error
+        except BadRequestError as error:
+            response = Response(error.code)
             connection.sendall(response.to_string())
             connection.close()
+            return None
+
+        request = requests[0]
+        request.socket = connection
+        request.address = address
+        return request
 
 
 class ResponseHandler(hollywood.actor.Threaded):
@@ -192,6 +593,18 @@ class ResponseHandler(hollywood.actor.Threaded):
         return response
 
 
+class MetricsHandler(hollywood.actor.Threaded):
+    """Responds with System.stats() in the Prometheus text format, e.g.
+    routes.add('/metrics', hollywood.System.spawn(MetricsHandler))."""
+
+    def receive(self, request):
+        response = Response()
+        response.content_type = 'text/plain; version=0.0.4'
+        response.content = hollywood.metrics.prometheus(hollywood.System.stats())
+        request.send(response)
+        return response
+
+
 class Server(hollywood.actor.Threaded):
     """Usage:
 
@@ -205,36 +618,506 @@ class Server(hollywood.actor.Threaded):
         time.sleep(2)
 
     The loop isn't actually necessary, keeps the main thread busy.
+
+    Connections are accepted and read one at a time, see EventServer for
+    serving many of them concurrently.
     """
 
     def __init__(self, response_handler=None):
         super(Server, self).__init__()
         if response_handler is None:
-            response_handler = hollywood.System.spawn(response_handler)
+            response_handler = hollywood.System.spawn(ResponseHandler)
         self.response_handler = response_handler
+        self.sock = None
+
+    def stop(self):
+        super(Server, self).stop()
+        if self.sock is not None:
+            # Wakes up the listener, waiting for a connection
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self.sock.close()
+
+    def drain(self, timeout=None):
+        # The requests in progress are in the inboxes of the other actors
+        self.stop()
 
     def receive(self,
                 address='0.0.0.0',
                 port=5000,
-                certfile=None):
+                certfile=None,
+                backlog=128,
+                keyfile=None):
 
         sock_server = hollywood.System.spawn(hollywood.net.socks.Server)
-        sock_listener = hollywood.System.spawn(hollywood.net.socks.Listener)
-        request_handler = hollywood.System.spawn(hollywood.net.http.RequestHandler)
-
-        sock = sock_server.ask(address, port).get()
+        self.sock_listener = hollywood.System.spawn(hollywood.net.socks.Listener)
+        self.request_handler = hollywood.System.spawn(hollywood.net.http.RequestHandler)
+        self.tls = None
         if certfile:
-            sock = ssl.wrap_socket(sock, certfile=certfile, server_side=True)
+            # Handshakes run in their own actors, not in the listener
+            self.tls = hollywood.net.tls.context(certfile, keyfile)
+            self.handshake = hollywood.System.spawn_pool(hollywood.net.tls.Handshake, 4)
+
+        sock = self.sock = sock_server.ask(address, port, backlog).get()
         sock_server.stop()
 
         logging.warning("Starting HTTP server in port: %i (%s)", port, address)
+        self._accept(sock)
+
+    def _accept(self, sock):
+        """Accept, parse and respond as a pipeline of futures.
+
+        No thread waits for any of the stages: the next connection is
+        accepted while the previous one is still being parsed.
+        """
+        if not self.is_alive:
+            logging.warning("HTTP Server actor shutting down.")
+            return
+        accepted = self.sock_listener.ask(sock)
+        accepted.add_done_callback(lambda _: self._accept(sock))
+        if self.tls:
+            accepted = accepted.then(self._handshake)
+        accepted.then(self._parse).add_done_callback(self._dispatch)
+
+    def _handshake(self, connection):
+        conn, addr = connection
+        return self.handshake.ask(self.tls, conn, addr)
+
+    def _parse(self, connection):
+        conn, addr = connection
+        if not conn:
+            return None
+        return self.request_handler.ask(conn, addr)
+
+    def _dispatch(self, future):
+        request = future.get()
+        if not request:
+            return
+        try:
+            answered = self.response_handler.ask(request)
+        except hollywood.exceptions.MailboxFullError:
+            logging.warning("Response handler overloaded, rejecting: %s", request.address)
+            request.send(Response(503))
+            return
+        answered.add_done_callback(functools.partial(_answer_failure, request))
+
+
+class Connection(object):
+    """A client connection multiplexed by the EventServer.
+
+    Requests may be pipelined: several of them are read before the first
+    is answered, and responses are written in the same order.
+    """
+
+    def __init__(self, server, sock, address):
+        self.server = server
+        self.socket = sock
+        self.fd = sock.fileno()
+        self.address = address
+        self.parser = RequestParser(server.max_header_size, server.max_body_size)
+        # Requests parsed but not handed over yet
+        self.queued = collections.deque()
+        self.outbuf = collections.deque()
+        self.events = 0
+        self.last_active = time.time()
+        # Requests read and responses completed so far
+        self.requests = 0
+        self.responses = 0
+        # Response pieces received out of order: sequence -> [pieces, done]
+        self.pending = {}
+        # Set when no more requests will be read from the connection
+        self.closing = False
+        # When the TLS handshake started, None once completed (or without TLS)
+        self.handshake = None
+
+    def send(self, sequence, data, done=True, close=False):
+        """Queue data to be written by the server, may be called from any thread.
+
+        With 'close', the connection is closed once the response is sent.
+        """
+        self.server.write(self, sequence, data, done, close)
+
+
+class EventServer(hollywood.actor.Threaded):
+    """Serves many connections concurrently from a single event loop.
+
+    Usage is the same as Server:
+        server = hollywood.System.spawn(hollywood.net.http.EventServer, handler)
+        server.tell(port=5000, backlog=1024)
+
+    Sockets are non-blocking and watched with epoll (or poll): the server
+    accepts and reads every connection as data arrives, and hands each
+    request over to the response handler as soon as its headers are
+    complete. Responses are written back by the event loop too, so the
+    response handlers never block on slow clients.
+
+    Connections are kept alive (HTTP/1.1, or HTTP/1.0 with keep-alive)
+    until they've been idle for 'keep_alive_timeout' seconds or served
+    'max_requests' requests. Up to 'max_pipelined' requests per connection
+    are read ahead of their responses. Connections waiting for a response
+    with no progress for 'response_timeout' seconds are closed (e.g. the
+    handler forwarded the request somewhere it got lost).
+
+    Requests are parsed incrementally as data arrives (see RequestParser),
+    received straight into a buffer reused for every read.
+
+    With a certificate, TLS handshakes are driven by the event loop too,
+    and connections still handshaking after 'handshake_timeout' seconds
+    are closed (see hollywood.net.tls).
+    """
+
+    max_header_size = 64 * 1024
+    max_body_size = 1024 * 1024
+    keep_alive_timeout = 15
+    response_timeout = 60
+    max_requests = 100
+    max_pipelined = 16
+    handshake_timeout = 10
+
+    def __init__(self, response_handler=None):
+        super(EventServer, self).__init__()
+        if response_handler is None:
+            response_handler = hollywood.System.spawn(ResponseHandler)
+        self.response_handler = response_handler
+        self.tls = None
+        self.connections = {}
+        self.outgoing = collections.deque()
+        self.poller = hollywood.net.socks.Poller()
+        self.readbuf = bytearray(65536)
+        self.readview = memoryview(self.readbuf)
+        self.wakeup_in, self.wakeup_out = os.pipe()
+        # Writing to the pipe once closed could write to any file
+        self.wakeup_lock = threading.Lock()
+        for fd in (self.wakeup_in, self.wakeup_out):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    def stop(self):
+        super(EventServer, self).stop()
+        self._wakeup()
+
+    def drain(self, timeout=None):
+        # Serves until stopped, the inbox is never read meanwhile
+        self.stop()
 
+    def receive(self,
+                address='0.0.0.0',
+                port=5000,
+                certfile=None,
+                backlog=128,
+                keyfile=None):
+
+        sock = hollywood.net.socks.listen(address, port, backlog)
+        if certfile:
+            self.tls = hollywood.net.tls.context(certfile, keyfile)
+        sock.setblocking(0)
+        self.poller.register(sock.fileno(), self.poller.READ)
+        self.poller.register(self.wakeup_in, self.poller.READ)
+
+        logging.warning("Starting HTTP event server in port: %i (%s)", port, address)
+        last_sweep = time.time()
         while self.is_alive:
-            conn, addr = sock_listener.ask(sock).get()
-            if not conn:
+            for fd, events in self.poller.poll(1):
+                if fd == sock.fileno():
+                    self._accept(sock)
+                elif fd == self.wakeup_in:
+                    self._flush_outgoing()
+                elif fd in self.connections:
+                    self._handle_events(self.connections[fd], events)
+            if time.time() - last_sweep >= 1:
+                last_sweep = time.time()
+                self._sweep(last_sweep)
+
+        for connection in self.connections.values():
+            self._close(connection)
+        self.poller.close()
+        sock.close()
+        with self.wakeup_lock:
+            os.close(self.wakeup_in)
+            os.close(self.wakeup_out)
+            self.wakeup_out = None
+        logging.warning("HTTP event server actor shutting down.")
+
+    def write(self, connection, sequence, data, done=True, close=False):
+        self.outgoing.append((connection, sequence, data, done, close))
+        self._wakeup()
+
+    def _wakeup(self):
+        with self.wakeup_lock:
+            if self.wakeup_out is None:
+                return
+            try:
+                os.write(self.wakeup_out, 'x')
+            except OSError as error:
+                # Full pipe, the event loop will wake up anyways
+                if error.errno != errno.EAGAIN:
+                    raise
+
+    def _accept(self, sock):
+        while True:
+            try:
+                conn, addr = sock.accept()
+            except socket.error as error:
+                if error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            logging.debug("Received connection: %s %s", conn, addr)
+            conn.setblocking(0)
+            if self.tls:
+                conn = self.tls.wrap(conn)
+            connection = Connection(self, conn, addr)
+            if self.tls:
+                connection.handshake = time.time()
+            self.connections[connection.fd] = connection
+            connection.events = self.poller.READ
+            self.poller.register(connection.fd, connection.events)
+
+    def _sweep(self, now):
+        """Close the connections which have been idle, or waiting for a
+        response, for too long."""
+        for connection in self.connections.values():
+            if connection.handshake is not None:
+                if now - connection.handshake > self.handshake_timeout:
+                    logging.info("TLS handshake timed out: %s", connection.address)
+                    self.tls.failed()
+                    self._close(connection)
                 continue
+            inactive = now - connection.last_active
+            if connection.requests != connection.responses or connection.outbuf:
+                if inactive > self.response_timeout:
+                    logging.warning("No response for %.0fs, closing: %s", inactive,
+                                    connection.address)
+                    self._close(connection)
+            elif inactive > self.keep_alive_timeout:
+                logging.debug("Closing idle connection: %s", connection.address)
+                self._close(connection)
+
+    def _handle_events(self, connection, events):
+        if connection.handshake is not None:
+            self._handshake(connection)
+            return
+        if events & self.poller.READ:
+            self._read(connection)
+        if events & self.poller.WRITE and self._is_open(connection):
+            self._write(connection)
+        if events & self.poller.ERROR and self._is_open(connection):
+            self._close(connection)
+
+    def _handshake(self, connection):
+        """Carry on with the TLS handshake, as far as possible without blocking."""
+        try:
+            connection.socket.do_handshake()
+        except ssl.SSLWantReadError:
+            events = self.poller.READ
+        except ssl.SSLWantWriteError:
+            events = self.poller.WRITE
+        except (ssl.SSLError, socket.error) as error:
+            logging.info("TLS handshake failed with %s: %s", connection.address, error)
+            self.tls.failed()
+            self._close(connection)
+            return
+        else:
+            self.tls.completed(connection.handshake)
+            connection.handshake = None
+            connection.last_active = time.time()
+            # The first request may have arrived along with the handshake
+            self._read(connection)
+            return
+        if events != connection.events:
+            connection.events = events
+            self.poller.modify(connection.fd, events)
+
+    def _is_open(self, connection):
+        return self.connections.get(connection.fd) is connection
+
+    def _update(self, connection):
+        """Watch for the events the connection is currently interested in."""
+        events = 0
+        in_flight = connection.requests - connection.responses
+        if not connection.closing and in_flight < self.max_pipelined:
+            events |= self.poller.READ
+        if connection.outbuf:
+            events |= self.poller.WRITE
+        if events != connection.events:
+            connection.events = events
+            self.poller.modify(connection.fd, events)
+
+    def _read(self, connection):
+        while True:
+            try:
+                received = connection.socket.recv_into(self.readbuf)
+            except socket.error as error:
+                if _would_block(error):
+                    break
+                self._close(connection)
+                return
+            if not received:
+                self._close(connection)
+                return
+            connection.queued.extend(connection.parser.feed(self.readview[:received]))
+            if connection.parser.error:
+                break
+        connection.last_active = time.time()
+        self._parse(connection)
+
+    def _parse(self, connection):
+        """Hand over the queued requests, as long as not too many are in flight."""
+        while connection.queued and not connection.closing:
+            if connection.requests - connection.responses >= self.max_pipelined:
+                break
+            self._dispatch(connection, connection.queued.popleft())
+        error = connection.parser.error
+        if error and not connection.queued and not connection.closing:
+            self._refuse(connection, Response(error.code))
+        if self._is_open(connection):
+            self._update(connection)
+
+    def _dispatch(self, connection, request):
+        request.socket = connection.socket
+        request.address = connection.address
+        request.connection = connection
+        request.sequence = connection.requests
+        request.keep_alive = request.wants_keep_alive()
+        connection.requests += 1
+        if connection.requests >= self.max_requests:
+            request.keep_alive = False
+        if not request.keep_alive:
+            connection.closing = True
+        try:
+            answered = self.response_handler.ask(request)
+        except hollywood.exceptions.MailboxFullError:
+            logging.warning("Response handler overloaded, rejecting: %s", connection.address)
+            response = Response(503)
+            request.keep_alive = False
+            connection.closing = True
+            response.protocol = request.protocol
+            self._respond(connection, request.sequence, response.to_string(), True)
+            return
+        answered.add_done_callback(functools.partial(_answer_failure, request))
+
+    def _refuse(self, connection, response):
+        """Answer with an error and close the connection, nothing else is read."""
+        connection.closing = True
+        connection.requests += 1
+        self._respond(connection, connection.requests - 1, response.to_string(), True)
+
+    def _flush_outgoing(self):
+        try:
+            while os.read(self.wakeup_in, 4096):
+                pass
+        except OSError as error:
+            if error.errno != errno.EAGAIN:
+                raise
+        while self.outgoing:
+            connection, sequence, data, done, close = self.outgoing.popleft()
+            if self._is_open(connection):
+                self._respond(connection, sequence, data, done, close)
+
+    def _respond(self, connection, sequence, data, done, close=False):
+        """Queue a piece of the response to the request 'sequence'.
+
+        Pieces of later responses are held back until the earlier ones are
+        complete. With 'close', the response is the last one sent on the
+        connection (e.g. its content ends with the connection).
+        """
+        if close:
+            connection.closing = True
+            connection.requests = min(connection.requests, sequence + 1)
+        if sequence >= connection.requests:
+            # Pipelined behind a response which closes the connection
+            if isinstance(data, FileRange):
+                data.close()
+            return
+        entry = connection.pending.setdefault(sequence, [[], False])
+        entry[0].append(data)
+        entry[1] = done
+        while (connection.responses < connection.requests
+               and connection.responses in connection.pending):
+            pieces, done = connection.pending[connection.responses]
+            connection.outbuf.extend(pieces)
+            del pieces[:]
+            if not done:
+                break
+            del connection.pending[connection.responses]
+            connection.responses += 1
+        self._write(connection)
+
+    def _write(self, connection):
+        outbuf = connection.outbuf
+        while outbuf:
+            try:
+                # Small pieces (e.g. pipelined responses) are sent at once,
+                # large ones straight from their own buffer
+                while (len(outbuf) > 1 and len(outbuf[0]) + len(outbuf[1]) <= Response.inline_size
+                       and not isinstance(outbuf[0], FileRange)
+                       and not isinstance(outbuf[1], FileRange)):
+                    first = outbuf.popleft()
+                    outbuf[0] = str(first) + str(outbuf[0])
+                data = outbuf[0]
+                if isinstance(data, FileRange):
+                    data.send(connection.socket)
+                    if not data.remaining:
+                        outbuf.popleft()
+                    continue
+                sent = connection.socket.send(data)
+                if sent < len(data):
+                    outbuf[0] = buffer(data, sent)
+                else:
+                    outbuf.popleft()
+            except (socket.error, OSError) as error:
+                if _would_block(error):
+                    break
+                self._close(connection)
+                return
+            except Exception:
+                # A bad piece (e.g. a closed file, or a chunk which isn't a
+                # string) only takes its own connection down
+                logging.error("Unable to send response to %s", connection.address,
+                              exc_info=True)
+                self._close(connection)
+                return
+        connection.last_active = time.time()
+
+        finished = connection.requests == connection.responses
+        if connection.closing and finished and not connection.outbuf:
+            self._close(connection)
+            return
+        self._update(connection)
+        if finished and connection.queued and not connection.closing:
+            # Requests held back while too many were in flight
+            self._parse(connection)
+
+    def _close(self, connection):
+        if not self._is_open(connection):
+            return
+        del self.connections[connection.fd]
+        self.poller.unregister(connection.fd)
+        connection.socket.close()
+        pieces = list(connection.outbuf)
+        for pending, _ in connection.pending.values():
+            pieces.extend(pending)
+        for piece in pieces:
+            if isinstance(piece, FileRange):
+                piece.close()
+
+
+def _answer_failure(request, future):
+    """Done callback of the response handler: answers with a 500 if it
+    raised before sending a response, instead of leaving the client waiting."""
+    if future.error is None or request.responded:
+        return
+    logging.error("Response handler failed on %s %s: %r", request.method, request.path,
+                  future.error)
+    try:
+        request.send(Response(500))
+    except (socket.error, OSError):
+        pass
+
 
-            request = request_handler.ask(conn, addr).get()
-            if request:
-                self.response_handler.tell(request)
-        logging.warning("HTTP Server actor shutting down.")
+def _would_block(error):
+    """Whether a socket error means 'try again later' (including TLS)."""
+    if isinstance(error, (ssl.SSLWantReadError, ssl.SSLWantWriteError)):
+        return True
+    return error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK)
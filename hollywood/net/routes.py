@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+"""
+    Routes HTTP requests to different response handlers by method and path.
+
+    Like hollywood.router.Router, the router has no inbox nor thread: each
+    request is handed over straight away, in the server's thread, to the
+    address (actor or pool) of its route. Routes don't share a mailbox, so
+    each of them can be scaled on its own.
+
+    Route patterns are made of segments separated by '/':
+        users: matches 'users' only.
+        <name>: matches any single segment.
+        *name: matches the rest of the path, if any (last segment only).
+    The segments matched by name are placed in request.params.
+
+    Routes are kept in a trie of path segments, so finding the route of a
+    request takes time proportional to the length of its path, whatever
+    the number of routes. Static segments take precedence over parameters,
+    and parameters over the rest of the path.
+
+    Example:
+        routes = hollywood.net.routes.PathRouter()
+        routes.add('/', hollywood.System.spawn(IndexHandler))
+        routes.add('/users/<id>', hollywood.System.spawn_pool(UserHandler, 8), ['GET'])
+        routes.add('/static/*path', hollywood.System.spawn(FileHandler, 'www'))
+        server = hollywood.System.spawn(hollywood.net.http.EventServer, routes.address)
+"""
+
+import threading
+import logging
+
+import hollywood.actor
+import hollywood.future
+import hollywood.net.http
+
+
+class _Node(object):
+
+    __slots__ = ('children', 'param', 'rest', 'names', 'handlers')
+
+    def __init__(self):
+        # segment -> _Node
+        self.children = {}
+        # _Node matching any segment
+        self.param = None
+        # _Node matching the rest of the path
+        self.rest = None
+        # Names given to the parameters along the way
+        self.names = ()
+        # method -> address, None for any method
+        self.handlers = {}
+
+
+class PathRouter(object):
+
+    def __init__(self, default=None):
+        # Handles the requests no route matches, they get a 404 otherwise
+        self.default = default
+        self.root = _Node()
+        self.lock = threading.Lock()
+        self.address = hollywood.actor.Address(self)
+        self.is_alive = True
+
+    def add(self, pattern, address, methods=None):
+        """Route requests matching 'pattern' (and 'methods', any by default)
+        to 'address'."""
+        node = self.root
+        names = []
+        with self.lock:
+            for segment in _split(pattern):
+                if segment.startswith('*'):
+                    names.append(segment[1:])
+                    if node.rest is None:
+                        node.rest = _Node()
+                    node = node.rest
+                    break
+                if segment.startswith('<') and segment.endswith('>'):
+                    names.append(segment[1:-1])
+                    if node.param is None:
+                        node.param = _Node()
+                    node = node.param
+                else:
+                    node = node.children.setdefault(segment, _Node())
+            node.names = tuple(names)
+            for method in methods or [None]:
+                node.handlers[method] = address
+        logging.debug("Added route: %s %s -> %s", methods or 'ANY', pattern, address)
+
+    def match(self, method, path):
+        """(address, params) for a request, address being None if the path
+        isn't routed and a list of the allowed methods if it is, but not for
+        that method."""
+        segments = _split(path.split('?', 1)[0])
+        values = []
+        node = self._find(self.root, segments, 0, values)
+        if node is None:
+            return None, {}
+        address = node.handlers.get(method, node.handlers.get(None))
+        if address is None:
+            return sorted(node.handlers), {}
+        return address, dict(zip(node.names, values))
+
+    def _find(self, node, segments, position, values):
+        """Node matching the segments from 'position', collecting the
+        values of the parameters."""
+        if position == len(segments):
+            if node.handlers:
+                return node
+            if node.rest is not None and node.rest.handlers:
+                values.append('')
+                return node.rest
+            return None
+        segment = segments[position]
+        child = node.children.get(segment)
+        if child is not None:
+            found = self._find(child, segments, position + 1, values)
+            if found is not None:
+                return found
+        if node.param is not None:
+            values.append(segment)
+            found = self._find(node.param, segments, position + 1, values)
+            if found is not None:
+                return found
+            values.pop()
+        if node.rest is not None and node.rest.handlers:
+            values.append('/'.join(segments[position:]))
+            return node.rest
+        return None
+
+    def stop(self):
+        logging.debug("[%s] Received stop signal.", self.address)
+        self.is_alive = False
+        for address in self.addresses():
+            address.stop()
+
+    def pressure(self):
+        """The pressure of the busiest route."""
+        return max([address.pressure() for address in self.addresses()] or [0.0])
+
+    def depth(self):
+        return sum(address.depth() for address in self.addresses())
+
+    def tell(self, request):
+        self._dispatch('tell', request)
+
+    def ask(self, request):
+        return self._dispatch('ask', request)
+
+    def _dispatch(self, method, request):
+        address, params = self.match(request.method, request.path)
+        if address is None and self.default is not None:
+            address = self.default
+        if address is None or isinstance(address, list):
+            if address is None:
+                response = hollywood.net.http.Response(404)
+            else:
+                response = hollywood.net.http.Response(405)
+                response.headers.append(('Allow', ', '.join(address)))
+            request.send(response)
+            if method == 'ask':
+                future = hollywood.future.Base()
+                future.put(response)
+                return future
+            return None
+        request.params = params
+        return getattr(address, method)(request)
+
+    def addresses(self):
+        """The addresses of every route, and the default one."""
+        addresses = set()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            addresses.update(node.handlers.values())
+            stack.extend(node.children.values())
+            stack.extend(child for child in (node.param, node.rest) if child is not None)
+        if self.default is not None:
+            addresses.add(self.default)
+        return addresses
+
+
+def _split(path):
+    return [segment for segment in path.split('/') if segment]
@@ -1,21 +1,59 @@
 #!/usr/bin/env python
 
+import os
+import sys
+import errno
+import ctypes
+import ctypes.util
 import logging
+import select
 import socket
 
 import hollywood.actor
 
 
+def listen(address, port, backlog=128):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Disable nagle algorithm, makes us look better in benchmarks
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((address, port))
+    sock.listen(backlog)
+    return sock
+
+
+def _libc_sendfile():
+    """sendfile(2) through ctypes, for Pythons without os.sendfile."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        function = libc.sendfile64
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_int,
+                         ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t]
+    function.restype = ctypes.c_ssize_t
+
+    def sendfile(out_fd, in_fd, offset, count):
+        offset = ctypes.c_int64(offset)
+        sent = function(out_fd, in_fd, ctypes.byref(offset), count)
+        if sent < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        return sent
+    return sendfile
+
+
+# sendfile(out_fd, in_fd, offset, count): copies from a file to a socket
+# within the kernel, None where it isn't available
+sendfile = getattr(os, 'sendfile', None) or _libc_sendfile()
+
+
 class Server(hollywood.actor.Threaded):
 
-    def receive(self, address, port):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # Disable nagle algorithm, makes us look better in benchmarks
-        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        sock.bind((address, port))
-        sock.listen(10)
-        return sock
+    def receive(self, address, port, backlog=128):
+        return listen(address, port, backlog)
 
 
 class Listener(hollywood.actor.Threaded):
@@ -29,3 +67,45 @@ class Listener(hollywood.actor.Threaded):
         except socket.error: # Timeout
             logging.debug("No connections received, recycling.")
             return None, None
+
+
+class Poller(object):
+    """
+        Readiness notification for many file descriptors at once.
+
+        Uses epoll where available and falls back to poll. Both are level
+        triggered and share the same event flags.
+    """
+
+    READ = select.POLLIN
+    WRITE = select.POLLOUT
+    ERROR = select.POLLERR | select.POLLHUP
+
+    def __init__(self):
+        if hasattr(select, 'epoll'):
+            self.poller = select.epoll()
+            self.scale = 1
+        else:
+            self.poller = select.poll()
+            self.scale = 1000 # poll() wants milliseconds
+
+    def register(self, fd, events):
+        self.poller.register(fd, events)
+
+    def modify(self, fd, events):
+        self.poller.modify(fd, events)
+
+    def unregister(self, fd):
+        self.poller.unregister(fd)
+
+    def poll(self, timeout):
+        try:
+            return self.poller.poll(timeout * self.scale)
+        except (IOError, select.error) as error:
+            if error.args[0] == errno.EINTR:
+                return []
+            raise
+
+    def close(self):
+        if hasattr(self.poller, 'close'):
+            self.poller.close()
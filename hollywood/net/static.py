@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+import os
+import re
+import time
+import stat
+import errno
+import urllib
+import logging
+import calendar
+import mimetypes
+import collections
+import email.utils
+
+import hollywood.actor
+import hollywood.net.http
+
+
+class FileHandler(hollywood.actor.Threaded):
+    """
+        Serves the files under a directory, as a response handler:
+            files = hollywood.System.spawn(hollywood.net.static.FileHandler, '/var/www')
+            server = hollywood.System.spawn(hollywood.net.http.EventServer, files)
+
+        Small files are kept in an LRU cache, bounded by 'cache_entries' and
+        'cache_size' (bytes). Cached files are checked for changes (mtime and
+        size) at most every 'check_interval' seconds, so conditional requests
+        (If-None-Match, If-Modified-Since) are answered with a 304 without
+        touching the disk. Larger files are sent with sendfile.
+
+        Single byte ranges are supported (206, or 416 if unsatisfiable).
+
+        Behind a hollywood.net.routes.PathRouter route ending with '*path'
+        (e.g. '/static/*path'), the file served is the rest of the path
+        rather than the whole path of the request.
+    """
+
+    cache_entries = 1024
+    cache_size = 32 * 1024 * 1024
+    # Files larger than this aren't cached
+    max_cached_file = 256 * 1024
+    check_interval = 1
+    index = 'index.html'
+
+    def __init__(self, root='.'):
+        super(FileHandler, self).__init__()
+        self.root = os.path.realpath(root)
+        # path -> _Entry, least recently used first
+        self.cache = collections.OrderedDict()
+        self.cached_bytes = 0
+
+    def receive(self, request):
+        response = self.respond(request)
+        request.send(response)
+        return response
+
+    def respond(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            response = hollywood.net.http.Response(405)
+            response.headers.append(('Allow', 'GET, HEAD'))
+            return response
+
+        path = self._resolve(request.params.get('path', request.path))
+        if path is None:
+            return hollywood.net.http.Response(404)
+        try:
+            entry = self._lookup(path)
+        except (IOError, OSError) as error:
+            if error.errno in (errno.ENOENT, errno.ENOTDIR, errno.EISDIR):
+                return hollywood.net.http.Response(404)
+            if error.errno == errno.EACCES:
+                return hollywood.net.http.Response(403)
+            raise
+
+        if self._not_modified(request, entry):
+            response = hollywood.net.http.Response(304)
+        else:
+            response = self._content(request, path, entry)
+        response.headers.append(('ETag', entry.etag))
+        response.last_modified = entry.last_modified
+        return response
+
+    def _resolve(self, path):
+        """Local path of the file requested, None if it's outside the root."""
+        path = urllib.unquote(path.split('?', 1)[0].split('#', 1)[0])
+        path = os.path.realpath(os.path.join(self.root, path.lstrip('/')))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            logging.warning("Refusing to serve outside of %s: %s", self.root, path)
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, self.index)
+        return path
+
+    def _lookup(self, path):
+        now = time.time()
+        entry = self.cache.get(path)
+        if entry is None:
+            return self._load(path, now)
+        if now - entry.checked >= self.check_interval:
+            self._evict(path)
+            info = os.stat(path)
+            if (info.st_mtime, info.st_size) != (entry.mtime, entry.size):
+                return self._load(path, now)
+            entry.checked = now
+        self._store(path, entry) # Now the most recently used
+        return entry
+
+    def _load(self, path, now):
+        with open(path, 'rb') as handle:
+            info = os.fstat(handle.fileno())
+            if not stat.S_ISREG(info.st_mode):
+                raise IOError(errno.EISDIR, "Not a regular file", path)
+            entry = _Entry(path, info, now)
+            if info.st_size <= self.max_cached_file:
+                entry.content = handle.read()
+        # Large files are cached too, without their content
+        self._store(path, entry)
+        return entry
+
+    def _store(self, path, entry):
+        """(Re)insert 'entry' as the most recently used one."""
+        if path in self.cache:
+            self._evict(path)
+        self.cache[path] = entry
+        if entry.content is not None:
+            self.cached_bytes += len(entry.content)
+        while len(self.cache) > self.cache_entries or self.cached_bytes > self.cache_size:
+            self._evict(next(iter(self.cache)))
+
+    def _evict(self, path):
+        entry = self.cache.pop(path)
+        if entry.content is not None:
+            self.cached_bytes -= len(entry.content)
+
+    def _not_modified(self, request, entry):
+        tags = request.headers.get('if-none-match')
+        if tags is not None:
+            tags = [tag.strip() for tag in tags.split(',')]
+            return '*' in tags or entry.etag in tags or 'W/' + entry.etag in tags
+        since = request.headers.get('if-modified-since')
+        if since:
+            since = email.utils.parsedate(since)
+            return since is not None and int(entry.mtime) <= calendar.timegm(since)
+        return False
+
+    def _content(self, request, path, entry):
+        response = hollywood.net.http.Response()
+        response.content_type = entry.content_type
+        response.headers.append(('Accept-Ranges', 'bytes'))
+
+        start, end = 0, entry.size
+        requested = request.headers.get('range')
+        if_range = request.headers.get('if-range')
+        if requested and if_range in (None, entry.etag, entry.last_modified):
+            byte_range = _parse_range(requested, entry.size)
+            if byte_range is False:
+                response.code = 416
+                response.headers.append(('Content-Range', 'bytes */%i' % entry.size))
+                return response
+            if byte_range is not None:
+                start, end = byte_range
+                response.code = 206
+                response.headers.append(
+                    ('Content-Range', 'bytes %i-%i/%i' % (start, end - 1, entry.size)))
+
+        if request.method == 'HEAD':
+            response.content_length = end - start
+        elif entry.content is not None:
+            response.content = entry.content[start:end]
+        else:
+            response.content = hollywood.net.http.FileRange(path, start, end - start)
+        return response
+
+
+class _Entry(object):
+    """What's known about a file: its metadata and, if small, its content."""
+
+    __slots__ = ('size', 'mtime', 'etag', 'last_modified', 'content_type',
+                 'content', 'checked')
+
+    def __init__(self, path, info, checked):
+        self.size = info.st_size
+        self.mtime = info.st_mtime
+        self.etag = '"%x-%x"' % (int(info.st_mtime * 1000), info.st_size)
+        self.last_modified = hollywood.net.http.http_date(info.st_mtime)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.content = None
+        # When the file was last checked for changes
+        self.checked = checked
+
+
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """(start, end) of a single byte range, None if the header must be
+    ignored, False if it can't be satisfied."""
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix or not size:
+            return False
+        return max(size - suffix, 0), size
+    start = int(first)
+    end = int(last) + 1 if last else size
+    if start >= size:
+        return False
+    if end <= start:
+        return None
+    return start, min(end, size)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+"""
+    TLS for the HTTP servers.
+
+    A Context is created once per certificate and reused for every
+    connection, so TLS sessions can be resumed (session tickets and the
+    server side session cache) instead of running a full handshake each
+    time a client reconnects.
+
+    Handshakes never run in the accepting thread: the EventServer drives
+    them from its event loop, and the Server hands them over to Handshake
+    actors. Contexts keep track of how long handshakes take and how many
+    sessions are resumed, see Context.stats(). Those of every certificate
+    are part of System.stats(), and served by the MetricsHandler.
+"""
+
+import time
+import socket
+import logging
+import threading
+
+import ssl
+
+import hollywood.actor
+import hollywood.system
+
+
+# Forward secrecy and AEAD ciphers first, nothing known to be weak
+CIPHERS = ':'.join([
+    'ECDHE+AESGCM',
+    'ECDHE+CHACHA20',
+    'DHE+AESGCM',
+    'DHE+CHACHA20',
+    'ECDHE+AES',
+    '!aNULL', '!eNULL', '!MD5', '!DSS', '!RC4', '!3DES',
+])
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def context(certfile, keyfile=None, ciphers=CIPHERS):
+    """The Context of a certificate, created on first use."""
+    key = (certfile, keyfile, ciphers)
+    with _contexts_lock:
+        if key not in _contexts:
+            _contexts[key] = Context(certfile, keyfile, ciphers)
+        return _contexts[key]
+
+
+def stats():
+    """Context.stats() by certificate file, added up over the contexts
+    sharing one (e.g. with different ciphers)."""
+    with _contexts_lock:
+        contexts = _contexts.items()
+    totals = {}
+    for (certfile, _, _), tls in contexts:
+        counts = totals.setdefault(certfile, [0, 0, 0.0, 0])
+        for position, count in enumerate(tls.counts()):
+            counts[position] += count
+    return dict((certfile, _stats(*counts)) for certfile, counts in totals.items())
+
+
+def _stats(handshakes, failures, handshake_time, resumed):
+    return {
+        'handshakes': handshakes,
+        'handshake_failures': failures,
+        'handshake_latency': handshake_time / handshakes if handshakes else 0.0,
+        'sessions_resumed': resumed,
+        'resumption_ratio': float(resumed) / handshakes if handshakes else 0.0,
+    }
+
+
+hollywood.system.System.report('tls', stats)
+
+
+class Context(object):
+
+    def __init__(self, certfile, keyfile=None, ciphers=CIPHERS):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        for option in ('OP_NO_SSLv2', 'OP_NO_SSLv3', 'OP_NO_TLSv1', 'OP_NO_TLSv1_1',
+                       'OP_NO_COMPRESSION', 'OP_CIPHER_SERVER_PREFERENCE',
+                       'OP_SINGLE_DH_USE', 'OP_SINGLE_ECDH_USE'):
+            self.context.options |= getattr(ssl, option, 0)
+        self.context.set_ciphers(ciphers)
+        if hasattr(self.context, 'set_ecdh_curve'):
+            self.context.set_ecdh_curve('prime256v1')
+        self.context.load_cert_chain(certfile, keyfile)
+        self.lock = threading.Lock()
+        self.handshakes = 0
+        self.failures = 0
+        self.handshake_time = 0.0
+
+    def wrap(self, sock):
+        """Server side TLS socket, the handshake is left to the caller."""
+        return self.context.wrap_socket(sock, server_side=True,
+                                        do_handshake_on_connect=False)
+
+    def completed(self, started):
+        with self.lock:
+            self.handshakes += 1
+            self.handshake_time += time.time() - started
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+
+    def counts(self):
+        """Handshakes, failures, time taken by the handshakes (seconds)
+        and sessions resumed."""
+        sessions = self.context.session_stats()
+        with self.lock:
+            return self.handshakes, self.failures, self.handshake_time, sessions['hits']
+
+    def stats(self):
+        """Handshake counts and latency (seconds), sessions resumed."""
+        return _stats(*self.counts())
+
+
+class Handshake(hollywood.actor.Threaded):
+    """Runs the TLS handshake of a blocking socket, for the Server."""
+
+    timeout = 10
+
+    def receive(self, tls, conn, address):
+        if not conn:
+            return None, None
+        started = time.time()
+        try:
+            conn.settimeout(self.timeout)
+            conn = tls.wrap(conn)
+            conn.do_handshake()
+            conn.settimeout(None)
+        except (ssl.SSLError, socket.error) as error:
+            logging.info("TLS handshake failed with %s: %s", address, error)
+            tls.failed()
+            conn.close()
+            return None, None
+        tls.completed(started)
+        return conn, address
@@ -1,24 +1,396 @@
 #!/usr/bin/env python
 
-import logging
+"""
+    Shell commands.
+
+    A Command actor runs one command at a time, without ever buffering its
+    whole output when given a 'target': stdout and stderr are then told to
+    the target as they're produced, as target.tell(stream, data) with
+    stream being 'stdout' or 'stderr', either in chunks or line by line.
+    Commands which run for longer than their 'timeout' are killed, along
+    with any process they started, and CommandTimeoutError is raised.
+
+    Run many commands in parallel with a pool of Command actors, the size
+    of the pool bounds how many of them run at once:
+        commands = hollywood.os.shell.pool(16)
+        futures = [commands.ask(command, timeout=60) for command in commands_list]
+
+    Forking copies the page tables of the forking process, which gets slow
+    as the process grows. A Helper is a process forked early on, while
+    still small, which spawns the commands instead. Set 'prefork' on a
+    Command class to use the shared helper, after starting it with
+    hollywood.os.shell.helper() as soon as possible.
+"""
+
+import os
+import time
+import fcntl
+import errno
 import shlex
+import select
+import signal
+import struct
+import logging
+import tempfile
+import itertools
+import threading
 import subprocess
+import cPickle as pickle
 
 import hollywood.actor
+import hollywood.future
+import hollywood.router
+import hollywood.scheduler
+
+
+class CommandTimeoutError(Exception):
+    """When a command didn't complete in time (it's been killed)."""
+    pass
 
 
 class Command(hollywood.actor.Threaded):
 
-    def receive(self, command, env=None, shell=False):
+    chunk_size = 64 * 1024
+    # Spawn the commands through the shared Helper
+    prefork = False
+
+    def receive(self, command, env=None, shell=False, target=None, lines=False,
+                timeout=None, cwd=None):
+        """Run command and return (return code, stdout, stderr).
+
+        With a target, the output is told to it instead, and both stdout
+        and stderr are returned as None.
+        """
         if env is None:
             env = {}
         logging.debug("Running command: %s", command)
-        cmd = shlex.split(command.encode('utf-8'))
-        proc = subprocess.Popen(cmd,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                env=env,
-                                shell=shell)
-        out, err = proc.communicate()
-        return_code = proc.returncode
+        if isinstance(command, unicode):
+            command = command.encode('utf-8')
+        cmd = command if shell else shlex.split(command)
+        deadline = None if timeout is None else time.time() + timeout
+
+        if self.prefork:
+            process = helper().spawn(cmd, env, shell, cwd)
+        else:
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE,
+                                       env=env,
+                                       shell=shell,
+                                       cwd=cwd,
+                                       preexec_fn=os.setsid)
+        try:
+            out, err = self._read(process, target, lines, deadline)
+            return_code = self._wait(process, deadline)
+        except Exception as error:
+            _kill(process)
+            if isinstance(error, CommandTimeoutError):
+                logging.warning("Command timed out, killed it: %s", command)
+                raise CommandTimeoutError(command)
+            raise
         return return_code, out, err
+
+    def _read(self, process, target, lines, deadline):
+        """Read stdout and stderr as they're written, until both are closed."""
+        streams = {
+            process.stdout.fileno(): ['stdout', process.stdout, []],
+            process.stderr.fileno(): ['stderr', process.stderr, []],
+        }
+        collected = dict((name, chunks) for name, _, chunks in streams.values())
+        while streams:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise CommandTimeoutError
+            try:
+                ready = select.select(list(streams), [], [], remaining)[0]
+            except select.error as error:
+                if error.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in ready:
+                name, stream, chunks = streams[fd]
+                data = os.read(fd, self.chunk_size)
+                if not data:
+                    del streams[fd]
+                    stream.close()
+                    if target and chunks:
+                        # Last line, without a line break
+                        target.tell(name, ''.join(chunks))
+                    continue
+                if target is None:
+                    chunks.append(data)
+                elif not lines:
+                    target.tell(name, data)
+                else:
+                    self._lines(target, name, chunks, data)
+        if target:
+            return None, None
+        return ''.join(collected['stdout']), ''.join(collected['stderr'])
+
+    def _lines(self, target, name, partial, data):
+        """Tell the complete lines in data, keep the rest in 'partial'."""
+        end = data.rfind('\n')
+        if end < 0:
+            partial.append(data)
+            return
+        partial.append(data[:end + 1])
+        for line in ''.join(partial).splitlines(True):
+            target.tell(name, line)
+        del partial[:]
+        if end + 1 < len(data):
+            partial.append(data[end + 1:])
+
+    def _wait(self, process, deadline):
+        """Wait for the process to exit, its output may be closed before."""
+        if deadline is None:
+            return process.wait()
+        while process.poll() is None:
+            if deadline is not None and time.time() >= deadline:
+                raise CommandTimeoutError
+            time.sleep(0.005)
+        return process.returncode
+
+
+def _kill(process):
+    """Kill the process and whatever it started (its process group)."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError as error:
+        if error.errno != errno.ESRCH:
+            raise
+    process.stdout.close()
+    process.stderr.close()
+    process.wait()
+
+
+def pool(size=8, command_class=Command):
+    """Address of 'size' Command actors, each running one command at a time."""
+    return hollywood.System.spawn_pool(command_class, size,
+                                       hollywood.router.LeastLoaded())
+
+
+_helper = None
+_helper_lock = threading.Lock()
+
+
+def helper():
+    """The Helper shared by the Command actors, started on first use."""
+    global _helper
+    with _helper_lock:
+        if _helper is None or not _helper.pid:
+            _helper = Helper()
+            _helper.start()
+        return _helper
+
+
+class Helper(object):
+    """
+        A process which spawns commands on behalf of this one.
+
+        Commands are sent to it through a pipe, and it replies with their
+        pid, then their return code once they exit. Their output is written
+        to FIFOs read from this process, so it's streamed just the same.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.requests = None
+        self.replies = None
+        self.thread = None
+        self.directory = None
+        self.lock = threading.Lock()
+        # id -> _Spawned, until the command exits
+        self.pending = {}
+
+    def start(self):
+        requests_in, requests_out = os.pipe()
+        replies_in, replies_out = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(requests_out)
+            os.close(replies_in)
+            try:
+                _serve(requests_in, replies_out)
+            finally:
+                os._exit(0)
+        os.close(requests_in)
+        os.close(replies_out)
+        self.pid = pid
+        self.requests = requests_out
+        self.replies = os.fdopen(replies_in, 'rb')
+        self.directory = tempfile.mkdtemp(prefix='hollywood-shell-')
+        self.thread = hollywood.scheduler.start_thread('hollywood/os/shell/Helper',
+                                                       self._collect)
+        hollywood.scheduler.register(self)
+        logging.debug("Started command helper: %i", pid)
+
+    def stop(self, timeout=None):
+        with self.lock:
+            if not self.pid:
+                return
+            self.pid = None
+            # The helper exits at the end of its requests, and so does _collect
+            os.close(self.requests)
+        self.thread.join(timeout)
+        os.rmdir(self.directory)
+        hollywood.scheduler.unregister(self)
+
+    def spawn(self, cmd, env, shell, cwd):
+        """Start a command, returns an object which behaves like a Popen."""
+        spawned = _Spawned()
+        paths = []
+        for name in ('stdout', 'stderr'):
+            path = os.path.join(self.directory, '%i.%s' % (spawned.id, name))
+            os.mkfifo(path, 0600)
+            paths.append(path)
+            # Non blocking, otherwise opening waits for the writer
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            setattr(spawned, name, os.fdopen(fd, 'rb'))
+        try:
+            with self.lock:
+                if not self.pid:
+                    raise OSError(errno.ESRCH, "Command helper isn't running")
+                self.pending[spawned.id] = spawned
+                _send(self.requests, (spawned.id, cmd, env, shell, cwd, paths))
+            spawned.pid = spawned.started.get()
+        except Exception:
+            spawned.stdout.close()
+            spawned.stderr.close()
+            raise
+        finally:
+            for path in paths:
+                os.unlink(path)
+        for stream in (spawned.stdout, spawned.stderr):
+            fd = stream.fileno()
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+        return spawned
+
+    def _collect(self):
+        """Resolve the futures of the commands with the helper's replies."""
+        while True:
+            reply = _receive(self.replies)
+            if reply is None:
+                break
+            key, kind, value = reply
+            spawned = self.pending.get(key)
+            if spawned is None:
+                continue
+            if kind == 'started':
+                spawned.started.put(value)
+            elif kind == 'error':
+                del self.pending[key]
+                spawned.started.set_exception(value)
+            else:
+                del self.pending[key]
+                spawned.exited.put(value)
+        self.replies.close()
+        error = OSError(errno.ESRCH, "Command helper exited")
+        for spawned in self.pending.values():
+            for future in (spawned.started, spawned.exited):
+                if not future.ready():
+                    future.set_exception(error)
+        self.pending.clear()
+
+
+class _Spawned(object):
+    """A command spawned by the helper, as far as Command is concerned."""
+
+    ids = itertools.count()
+
+    def __init__(self):
+        self.id = next(_Spawned.ids)
+        self.pid = None
+        self.stdout = None
+        self.stderr = None
+        self.returncode = None
+        self.started = hollywood.future.Base()
+        self.exited = hollywood.future.Base()
+
+    def poll(self):
+        if self.exited.ready():
+            self.returncode = self.exited.get()
+        return self.returncode
+
+    def wait(self):
+        self.returncode = self.exited.get()
+        return self.returncode
+
+
+def _send(fd, message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    data = struct.pack('!I', len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _receive(stream):
+    """Next message from a stream, None once it's closed."""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    return pickle.loads(stream.read(struct.unpack('!I', header)[0]))
+
+
+def _serve(requests, replies):
+    """The helper's loop: spawn the commands requested, report their exits."""
+    # Children exiting interrupt the select below
+    wakeup_in, wakeup_out = os.pipe()
+    for fd in (wakeup_in, wakeup_out):
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+    # None of these are for the commands (close_fds is slow, it closes
+    # every possible descriptor)
+    for fd in (requests, replies, wakeup_in, wakeup_out):
+        fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.set_wakeup_fd(wakeup_out)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    buffered = ''
+    children = {}
+    while True:
+        try:
+            ready = select.select([requests, wakeup_in], [], [])[0]
+        except select.error as error:
+            if error.args[0] == errno.EINTR:
+                ready = [wakeup_in]
+            else:
+                raise
+
+        if wakeup_in in ready:
+            try:
+                os.read(wakeup_in, 4096)
+            except OSError:
+                pass
+            for key, process in children.items():
+                if process.poll() is not None:
+                    del children[key]
+                    _send(replies, (key, 'exited', process.returncode))
+
+        if requests in ready:
+            data = os.read(requests, 64 * 1024)
+            if not data:
+                return
+            buffered += data
+            while len(buffered) >= 4:
+                size = struct.unpack('!I', buffered[:4])[0]
+                if len(buffered) < 4 + size:
+                    break
+                message = pickle.loads(buffered[4:4 + size])
+                buffered = buffered[4 + size:]
+                key, cmd, env, shell, cwd, paths = message
+                try:
+                    outputs = [open(path, 'wb') for path in paths]
+                    try:
+                        process = subprocess.Popen(cmd, stdout=outputs[0], stderr=outputs[1],
+                                                   env=env, shell=shell, cwd=cwd,
+                                                   preexec_fn=os.setsid)
+                    finally:
+                        for output in outputs:
+                            output.close()
+                except Exception as error:
+                    _send(replies, (key, 'error', error))
+                    continue
+                children[key] = process
+                _send(replies, (key, 'started', process.pid))
@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+
+"""
+    Remote actors: addresses of actors living in other processes or hosts.
+
+    Every process taking part runs a node, listening on a TCP port:
+        hollywood.remote.authenticate('shared secret')
+        hollywood.remote.listen(7000, '0.0.0.0')
+
+    Actor classes can then be placed on another node, System.spawn creates
+    them there and returns an address which works as any other, tell and
+    ask (and the futures it returns) included:
+        hollywood.System.place(MyActor, 'otherhost:7000')
+        address = hollywood.System.spawn(MyActor)
+        address.ask(message).get()
+
+    Actors already running on a node are found by the name of their
+    address (see hollywood.actor.Address.name_of) or the name they've been
+    exported with:
+        hollywood.remote.export(address, 'pricing')
+        address = hollywood.remote.lookup('otherhost:7000', 'pricing')
+
+    Classes, messages and results travel pickled, so they must be
+    picklable and importable on both sides (not defined in __main__).
+
+    Wire protocol: each message is a frame made of its length (4 bytes,
+    network order) and its pickle (protocol 2):
+        (request id, actor name, method, args, kwargs)
+        (request id, result, error)
+    The request id is None for tells, which get no reply. Messages are
+    pickled by their sender and queued, all the messages queued by the
+    time the connection is ready to send go out in a single send.
+
+    There's a single persistent connection from each node to every other
+    node it talks to, shared by all of their addresses.
+
+    Security: unpickling runs arbitrary code, so this is a protocol for
+    trusted networks only, and the traffic isn't encrypted. Nodes listen on
+    127.0.0.1 unless told otherwise, and refuse to listen anywhere else
+    without a shared secret. Before any frame is exchanged, both ends of a
+    connection prove that they know the secret: each sends a random
+    challenge (16 bytes) and checks the HMAC-SHA256 of both challenges
+    sent back by the other end (32 bytes), the connection is closed if it
+    doesn't match.
+"""
+
+from __future__ import absolute_import
+
+import os
+import hmac
+import errno
+import struct
+import socket
+import hashlib
+import logging
+import itertools
+import threading
+import collections
+import cPickle as pickle
+
+import hollywood.actor
+import hollywood.future
+import hollywood.scheduler
+import hollywood.exceptions
+
+
+_HEADER = struct.Struct('!I')
+_CHALLENGE_SIZE = 16
+# Seconds the other end of a new connection has to answer the challenge
+HANDSHAKE_TIMEOUT = 10
+
+_lock = threading.Lock()
+# Shared by all the nodes, see authenticate()
+_secret = None
+# The node of this process, see listen()
+_node = None
+# 'host:port' -> Peer
+_peers = {}
+
+
+def authenticate(secret):
+    """Set the secret shared by all the nodes, for the connections opened
+    from now on."""
+    global _secret
+    with _lock:
+        _secret = secret
+
+
+def listen(port, address='127.0.0.1', backlog=128):
+    """Start this process' node, returns it.
+
+    Listening on anything but a loopback address requires a secret, see
+    authenticate().
+    """
+    global _node
+    with _lock:
+        if not _secret and not _loopback(address):
+            raise ValueError("A secret is needed to listen on %s, see "
+                             "hollywood.remote.authenticate" % address)
+        if _node is None:
+            _node = Node(address, port, backlog)
+            _node.start()
+        return _node
+
+
+def export(address, name=None):
+    """Make an actor reachable from other nodes under 'name' (by default,
+    the name of its address)."""
+    Node.exports[name or address.name] = address
+
+
+def lookup(node, name):
+    """Address of the actor named 'name' on 'node' ('host:port')."""
+    return Remote(peer(node), name).address
+
+
+def spawn(node, actor_class, args=(), kwargs=None):
+    """Spawn actor_class(*args, **kwargs) on 'node', returns its address."""
+    connection = peer(node)
+    name = connection.call(None, 'spawn', (actor_class, args, kwargs or {}), {}).get()
+    return Remote(connection, name).address
+
+
+def peer(node):
+    """The connection to a node, opened on first use."""
+    with _lock:
+        connection = _peers.get(node)
+        if connection is None or connection.closed:
+            host, port = node.rsplit(':', 1)
+            connection = Peer(node, host, int(port))
+            connection.start()
+            _peers[node] = connection
+        return connection
+
+
+class Remote(object):
+    """Stands for an actor on another node, behind a regular Address."""
+
+    def __init__(self, peer, name):
+        self.peer = peer
+        self.address = hollywood.actor.Address(self)
+        self.address.name = name
+
+    def tell(self, *args, **kwargs):
+        self.peer.send(None, self.address.name, 'tell', args, kwargs)
+
+    def ask(self, *args, **kwargs):
+        return self.peer.call(self.address.name, 'ask', args, kwargs)
+
+    def stop(self):
+        self.peer.send(None, self.address.name, 'stop', (), {})
+
+    def pressure(self):
+        return self.peer.call(self.address.name, 'pressure', (), {}).get()
+
+    def depth(self):
+        return self.peer.call(self.address.name, 'depth', (), {}).get()
+
+
+class Channel(object):
+    """
+        A connection carrying frames both ways.
+
+        Frames are queued by any thread and written by the channel's own
+        writer thread, many at once if they queue up. The reader thread
+        hands every frame received over to received(message).
+    """
+
+    batch_size = 256 * 1024
+
+    def __init__(self, name, sock=None):
+        self.name = name
+        self.sock = sock
+        self.outgoing = collections.deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.threads = []
+
+    def start(self):
+        for role, target in (('reader', self._read), ('writer', self._write)):
+            self.threads.append(hollywood.scheduler.start_thread(
+                'hollywood/remote/%s/%s' % (self.name, role), target))
+
+    def stop(self, timeout=None):
+        self._close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def send(self, *message):
+        """Queue a message, raises whatever prevents it from being pickled."""
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        with self.condition:
+            if self.closed:
+                raise hollywood.exceptions.NodeConnectionError(self.name)
+            self.outgoing.append(_HEADER.pack(len(data)) + data)
+            self.condition.notify()
+
+    def received(self, message):
+        raise NotImplementedError("'received' method must be overriden.")
+
+    def _write(self):
+        while True:
+            with self.condition:
+                while not self.outgoing and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # Coalesce whatever has queued up meanwhile
+                frames, size = [], 0
+                while self.outgoing and size < self.batch_size:
+                    frame = self.outgoing.popleft()
+                    frames.append(frame)
+                    size += len(frame)
+            try:
+                self.sock.sendall(''.join(frames))
+            except socket.error as error:
+                logging.warning("[%s] Connection lost: %s", self.name, error)
+                self._close()
+                return
+
+    def authenticate(self):
+        """Run the handshake, before anything is read: whether the other
+        end knows the secret."""
+        return True
+
+    def _read(self):
+        if not self.authenticate():
+            self._close()
+            return
+        buffered = ''
+        while True:
+            try:
+                data = self.sock.recv(self.batch_size)
+            except socket.error as error:
+                if error.args[0] == errno.EINTR:
+                    continue
+                data = ''
+            if not data:
+                break
+            buffered += data
+            offset = 0
+            while len(buffered) - offset >= _HEADER.size:
+                size = _HEADER.unpack_from(buffered, offset)[0]
+                end = offset + _HEADER.size + size
+                if len(buffered) < end:
+                    break
+                message = pickle.loads(buffered[offset + _HEADER.size:end])
+                offset = end
+                try:
+                    self.received(message)
+                except Exception as error:
+                    logging.error(error, exc_info=True)
+            buffered = buffered[offset:]
+        self._close()
+
+    def _close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        try:
+            # Wakes up the reader
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+        self.closed_callback()
+
+    def closed_callback(self):
+        pass
+
+
+class Peer(Channel):
+    """Connection to another node, for the addresses of its actors."""
+
+    def __init__(self, node, host, port):
+        super(Peer, self).__init__(node)
+        self.host = host
+        self.port = port
+        self.ids = itertools.count()
+        # request id -> future
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.sock = socket.create_connection((self.host, self.port), HANDSHAKE_TIMEOUT)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            authenticated = _handshake(self.sock, False)
+        except socket.error as error:
+            logging.warning("[%s] Handshake failed: %s", self.name, error)
+            authenticated = False
+        if not authenticated:
+            self.sock.close()
+            raise hollywood.exceptions.NodeAuthenticationError(self.name)
+        self.sock.settimeout(None)
+        super(Peer, self).start()
+        hollywood.scheduler.register(self)
+        logging.debug("Connected to node: %s", self.name)
+
+    def stop(self, timeout=None):
+        super(Peer, self).stop(timeout)
+        hollywood.scheduler.unregister(self)
+
+    def call(self, name, method, args, kwargs):
+        """Send a message expecting a reply, returns the future of the reply."""
+        future = hollywood.future.Base()
+        key = next(self.ids)
+        with self.lock:
+            self.pending[key] = future
+        try:
+            self.send(key, name, method, args, kwargs)
+        except Exception:
+            with self.lock:
+                del self.pending[key]
+            raise
+        return future
+
+    def received(self, message):
+        key, result, error = message
+        with self.lock:
+            future = self.pending.pop(key, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.put(result)
+
+    def closed_callback(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(hollywood.exceptions.NodeConnectionError(self.name))
+
+
+class Node(object):
+    """Accepts connections from other nodes, runs the messages they send."""
+
+    # Addresses reachable by name, besides the actors in System.processes
+    exports = {}
+
+    def __init__(self, address, port, backlog=128):
+        self.address = address
+        self.port = port
+        self.backlog = backlog
+        self.sock = None
+        self.thread = None
+        self.channels = set()
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.address, self.port))
+        self.sock.listen(self.backlog)
+        self.port = self.sock.getsockname()[1]
+        self.thread = hollywood.scheduler.start_thread('hollywood/remote/node', self._accept)
+        hollywood.scheduler.register(self)
+        logging.warning("Node listening in port: %i (%s)", self.port, self.address)
+
+    def stop(self, timeout=None):
+        global _node
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+        self.thread.join(timeout)
+        with self.lock:
+            channels = list(self.channels)
+        for channel in channels:
+            channel.stop(timeout)
+        hollywood.scheduler.unregister(self)
+        with _lock:
+            if _node is self:
+                _node = None
+
+    def _accept(self):
+        while True:
+            try:
+                sock, peer = self.sock.accept()
+            except socket.error as error:
+                if error.args[0] == errno.EINTR:
+                    continue
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            channel = _Inbound(self, '%s:%i' % peer, sock)
+            with self.lock:
+                self.channels.add(channel)
+            channel.start()
+
+    def resolve(self, name):
+        address = Node.exports.get(name)
+        if address is not None:
+            return address
+        actor = hollywood.System.processes.get(name)
+        if actor is None:
+            raise hollywood.exceptions.ActorNotRegisteredError(name)
+        return actor.address
+
+
+class _Inbound(Channel):
+    """Connection from another node, runs its messages."""
+
+    def __init__(self, node, name, sock):
+        super(_Inbound, self).__init__(name, sock)
+        self.node = node
+
+    def authenticate(self):
+        try:
+            self.sock.settimeout(HANDSHAKE_TIMEOUT)
+            if _handshake(self.sock, True):
+                self.sock.settimeout(None)
+                return True
+        except socket.error as error:
+            logging.warning("[%s] Handshake failed: %s", self.name, error)
+            return False
+        logging.warning("[%s] Refused, wrong secret", self.name)
+        return False
+
+    def received(self, message):
+        key, name, method, args, kwargs = message
+        try:
+            if method == 'spawn':
+                actor_class, args, kwargs = args
+                address = hollywood.System.spawn(actor_class, *args, **kwargs)
+                export(address)
+                return self._reply(key, address.name, None)
+            address = self.node.resolve(name)
+            if method == 'ask':
+                future = address.ask(*args, **kwargs)
+                future.add_done_callback(lambda future: self._reply(key, future.payload,
+                                                                    future.error))
+            elif method == 'tell':
+                address.tell(*args, **kwargs)
+            elif method == 'stop':
+                address.stop()
+            elif method == 'pressure':
+                self._reply(key, address.pressure(), None)
+            elif method == 'depth':
+                self._reply(key, address.depth(), None)
+        except Exception as error:
+            if key is None:
+                logging.error(error, exc_info=True)
+            else:
+                self._reply(key, None, error)
+
+    def _reply(self, key, result, error):
+        if key is None or self.closed:
+            return
+        try:
+            self.send(key, result, hollywood.actor._picklable(error))
+        except hollywood.exceptions.NodeConnectionError:
+            pass
+        except Exception as error:
+            # The result can't be pickled
+            self.send(key, None, hollywood.exceptions.ActorRuntimeError(repr(error)))
+
+    def closed_callback(self):
+        with self.node.lock:
+            self.node.channels.discard(self)
+
+
+def _handshake(sock, accepting):
+    """Challenge the other end, and answer its challenge: whether it knows
+    the secret. The accepting end answers last, once it knows the other
+    one can be trusted."""
+    secret = _secret or ''
+    challenge = os.urandom(_CHALLENGE_SIZE)
+    sock.sendall(challenge)
+    theirs = _receive(sock, _CHALLENGE_SIZE)
+    if theirs is None:
+        return False
+    answer = hmac.new(secret, theirs + challenge, hashlib.sha256).digest()
+    expected = hmac.new(secret, challenge + theirs, hashlib.sha256).digest()
+    if not accepting:
+        sock.sendall(answer)
+    received = _receive(sock, len(expected))
+    if received is None or not hmac.compare_digest(received, expected):
+        return False
+    if accepting:
+        sock.sendall(answer)
+    return True
+
+
+def _receive(sock, size):
+    """Exactly 'size' bytes, None if the connection is closed before."""
+    data = ''
+    while len(data) < size:
+        received = sock.recv(size - len(data))
+        if not received:
+            return None
+        data += received
+    return data
+
+
+def _loopback(address):
+    return address == 'localhost' or address == '::1' or address.startswith('127.')
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""
+    Routers: several actors of the same kind behind a single address.
+
+    A router isn't an actor in itself (it has no inbox nor thread), the
+    message is handed over to one of its members straight away, in the
+    sender's thread. How the member is chosen depends on the strategy:
+
+        RoundRobin: each member in turn.
+        LeastLoaded: the member with the fewest messages queued or being
+            processed (see depth()).
+        ConsistentHash: always the same member for the same message key,
+            useful when members keep state (sharding).
+        Broadcast: every member, returns a list of futures when asked.
+
+    Example:
+        addr = hollywood.System.spawn_pool(MyActor, 4, LeastLoaded())
+        addr.ask(message)
+"""
+
+import bisect
+import hashlib
+import itertools
+import threading
+import logging
+
+import hollywood.actor
+import hollywood.exceptions
+
+
+class Strategy(object):
+    """Chooses which member(s) of the router get each message."""
+
+    def add(self, member):
+        pass
+
+    def remove(self, member):
+        pass
+
+    def select(self, members, args, kwargs):
+        raise NotImplementedError("'select' method must be overriden.")
+
+    def dispatch(self, members, method, args, kwargs):
+        return getattr(self.select(members, args, kwargs), method)(*args, **kwargs)
+
+
+class RoundRobin(Strategy):
+
+    def __init__(self):
+        self.counter = itertools.count()
+
+    def select(self, members, args, kwargs):
+        return members[next(self.counter) % len(members)]
+
+
+class LeastLoaded(Strategy):
+
+    def select(self, members, args, kwargs):
+        return min(members, key=lambda member: member.depth())
+
+
+class ConsistentHash(Strategy):
+    """
+        Hashes the message key onto a ring of members.
+
+        'key' extracts the key from the message, by default its first
+        argument. Each member is placed 'replicas' times in the ring so
+        that keys are evenly spread, and adding or removing a member only
+        moves the keys of that member.
+    """
+
+    def __init__(self, key=None, replicas=100):
+        if key is None:
+            key = lambda *args, **kwargs: args[0]
+        self.key = key
+        self.replicas = replicas
+        self.ring = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def hash(value):
+        return int(hashlib.md5(str(value)).hexdigest()[:16], 16)
+
+    def add(self, member):
+        with self.lock:
+            ring = list(self.ring)
+            for i in range(self.replicas):
+                bisect.insort(ring, (self.hash('%s/%i' % (member.address.name, i)), member))
+            self.ring = ring
+
+    def remove(self, member):
+        with self.lock:
+            self.ring = [node for node in self.ring if node[1] is not member]
+
+    def select(self, members, args, kwargs):
+        ring = self.ring
+        position = bisect.bisect(ring, (self.hash(self.key(*args, **kwargs)),))
+        return ring[position % len(ring)][1]
+
+
+class Broadcast(Strategy):
+
+    def dispatch(self, members, method, args, kwargs):
+        return [getattr(member, method)(*args, **kwargs) for member in members]
+
+
+class Router(object):
+
+    def __init__(self, members=(), strategy=None):
+        self.strategy = strategy or RoundRobin()
+        self.members = []
+        self.lock = threading.Lock()
+        self.address = hollywood.actor.Address(self)
+        self.is_alive = True
+        for member in members:
+            self.add(member)
+
+    def add(self, member):
+        with self.lock:
+            self.strategy.add(member)
+            # Replaced rather than modified, senders may be iterating it
+            self.members = self.members + [member]
+
+    def remove(self, member):
+        with self.lock:
+            self.members = [m for m in self.members if m is not member]
+            self.strategy.remove(member)
+
+    def stop(self):
+        logging.debug("[%s] Received stop signal.", self.address)
+        self.is_alive = False
+        for member in self.members:
+            member.stop()
+
+    def pressure(self):
+        members = self.members
+        if not members:
+            return 0.0
+        return sum(member.pressure() for member in members) / len(members)
+
+    def depth(self):
+        return sum(member.depth() for member in self.members)
+
+    def tell(self, *args, **kwargs):
+        self._dispatch('tell', args, kwargs)
+
+    def ask(self, *args, **kwargs):
+        return self._dispatch('ask', args, kwargs)
+
+    def _dispatch(self, method, args, kwargs):
+        members = self.members
+        if not members:
+            raise hollywood.exceptions.ActorNotRegisteredError(self.address.name)
+        return self.strategy.dispatch(members, method, args, kwargs)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+"""
+    M:N scheduling of actors onto a fixed pool of worker threads.
+
+    Threaded actors own an OS thread for their whole life, which stops
+    scaling after a few hundred actors. Pooled actors are just an inbox:
+    whenever one of them has pending messages it's placed in the run queue
+    of a Scheduler, and the next free worker thread processes up to
+    'quantum' messages from it before moving on to the next actor.
+
+    An actor is never in the run queue more than once, so its messages are
+    still processed sequentially, one at a time.
+
+    A small quantum favors fairness (busy actors can't starve the others),
+    a large one favors throughput (less scheduling overhead per message).
+
+    The EventLoop plays the same role for asyncio actors: all of them share
+    a single event loop, running in its own thread.
+
+    The Timer runs delayed calls (e.g. future timeouts) from a single thread.
+"""
+
+import time
+import heapq
+import Queue
+import itertools
+import threading
+import logging
+import weakref
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+
+# Everything started and not yet stopped, so System.halt can stop them
+_running = set()
+_running_lock = threading.Lock()
+# Every thread started by hollywood, so System.halt can wait for them
+_threads = weakref.WeakSet()
+
+
+def register(executor):
+    """Have executor.stop(timeout) called by stop_all, until it's unregistered.
+
+    Executors wait for their threads for up to 'timeout' seconds (None
+    waits for as long as it takes).
+    """
+    with _running_lock:
+        _running.add(executor)
+
+
+def unregister(executor):
+    with _running_lock:
+        _running.discard(executor)
+
+
+def start_thread(name, target):
+    """Start a thread running target(), System.halt waits for it."""
+    thread = threading.Thread(name=name, target=target)
+    with _running_lock:
+        _threads.add(thread)
+    thread.start()
+    return thread
+
+
+def threads():
+    """The threads started by hollywood which are still running."""
+    with _running_lock:
+        return [thread for thread in _threads if thread.is_alive()]
+
+
+def stop_all(timeout=None):
+    """Stop every executor, within 'timeout' seconds all together."""
+    deadline = None if timeout is None else time.time() + timeout
+    with _running_lock:
+        running = list(_running)
+    for executor in running:
+        executor.stop(None if deadline is None else max(deadline - time.time(), 0))
+
+
+class Scheduler(object):
+
+    def __init__(self, workers=4, quantum=10):
+        self.workers = workers
+        self.quantum = quantum
+        self.runqueue = Queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        # Set in the worker threads
+        self.local = threading.local()
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            logging.debug("Starting scheduler with %i workers.", self.workers)
+            for i in range(self.workers):
+                self.threads.append(start_thread('hollywood/scheduler/%i' % (i),
+                                                 self._work))
+        register(self)
+
+    def stop(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self.lock:
+            threads, self.threads = self.threads, []
+            for _ in threads:
+                self.runqueue.put(None)
+        for thread in threads:
+            thread.join(None if deadline is None else max(deadline - time.time(), 0))
+        unregister(self)
+
+    def schedule(self, actor):
+        # A worker rescheduling an actor while the pool is being stopped
+        # mustn't start it again, the actor waits for the next start
+        if not self.threads and not getattr(self.local, 'worker', False):
+            self.start()
+        self.runqueue.put(actor)
+
+    def _work(self):
+        self.local.worker = True
+        while True:
+            actor = self.runqueue.get()
+            if actor is None:
+                break
+            actor._run(self.quantum)
+
+
+class EventLoop(object):
+    """
+        An asyncio event loop running forever in its own thread.
+
+        Requires asyncio (or its python 2 backport, trollius).
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread:
+                return
+            if asyncio is None:
+                raise RuntimeError("Asyncio actors require asyncio (or trollius).")
+            logging.debug("Starting event loop.")
+            self.loop = asyncio.new_event_loop()
+            self.thread = start_thread('hollywood/eventloop', self._run)
+        register(self)
+
+    def stop(self, timeout=None):
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+        if thread:
+            thread.join(timeout)
+        unregister(self)
+
+    def call(self, function, *args):
+        """Run function(*args) in the event loop, from any thread."""
+        if not self.thread:
+            self.start()
+        self.loop.call_soon_threadsafe(function, *args)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+
+class Timer(object):
+    """Calls functions after a delay, all of them from a single thread."""
+
+    def __init__(self):
+        self.thread = None
+        self.pending = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    def start(self):
+        with self.condition:
+            if self.thread:
+                return
+            self.thread = start_thread('hollywood/timer', self._run)
+        register(self)
+
+    def stop(self, timeout=None):
+        with self.condition:
+            thread, self.thread = self.thread, None
+            self.pending = []
+            self.condition.notify()
+        if thread:
+            thread.join(timeout)
+        unregister(self)
+
+    def call_later(self, delay, function, *args):
+        if not self.thread:
+            self.start()
+        with self.condition:
+            # The sequence keeps calls with the same deadline in order
+            heapq.heappush(self.pending, (time.time() + delay, next(self.sequence),
+                                          function, args))
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if not self.thread:
+                    return
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                deadline, _, function, args = self.pending[0]
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                heapq.heappop(self.pending)
+            try:
+                function(*args)
+            except Exception as error:
+                logging.error(error, exc_info=True)
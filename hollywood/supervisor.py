@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""
+    Supervisors: restart the actors whose 'receive' raises an exception.
+
+    Unsupervised actors carry on with the next message after an exception,
+    in whatever state it left them. Supervised actors stop instead, and
+    their supervisor replaces them with a new instance of the same class,
+    built with the same arguments, which takes over their address and
+    inbox: no message is lost and senders don't notice. Only the future of
+    the message which failed gets the exception.
+
+    Usage:
+        supervisor = hollywood.System.spawn(hollywood.supervisor.Supervisor)
+        address = supervisor.ask(MyActor, arg, key=value).get()
+
+    Strategies:
+        one_for_one: only the actor which failed is restarted.
+        one_for_all: all of the supervisor's actors are restarted, for actors
+            which depend on each other. The others finish the message they
+            are processing, then wait for the restart.
+
+    Restarts are delayed by 'backoff' seconds, doubling with every restart
+    up to 'max_backoff'. After 'max_restarts' restarts in 'within' seconds
+    the supervisor gives up: its actors are stopped, the futures of the
+    messages left in their inboxes fail with ActorRuntimeError, and the
+    supervisor stops too.
+
+    The settings are class attributes, subclass Supervisor to have several
+    of them (System.spawn gives a single actor per class):
+        class Workers(hollywood.supervisor.Supervisor):
+            strategy = 'one_for_all'
+            max_restarts = 10
+
+    Process actors can't be supervised, their exceptions are raised in the
+    worker process.
+"""
+
+import time
+import logging
+import collections
+
+import hollywood
+import hollywood.fun
+import hollywood.actor
+import hollywood.scheduler
+import hollywood.exceptions
+
+
+# Delays the restarts
+_timer = hollywood.scheduler.Timer()
+
+
+class _Child(object):
+
+    __slots__ = ('actor_class', 'args', 'kwargs', 'actor', 'restarting')
+
+    def __init__(self, actor_class, args, kwargs, actor):
+        self.actor_class = actor_class
+        self.args = args
+        self.kwargs = kwargs
+        # The current instance
+        self.actor = actor
+        self.restarting = False
+
+
+class _Restart(object):
+    """Time to restart 'children', once the backoff has elapsed."""
+
+    def __init__(self, children):
+        self.children = children
+
+
+class Supervisor(hollywood.actor.Threaded):
+
+    strategy = 'one_for_one'
+    max_restarts = 3
+    within = 5.0
+    backoff = 0.1
+    max_backoff = 10.0
+
+    def __init__(self, strategy=None, max_restarts=None, within=None):
+        super(Supervisor, self).__init__()
+        if strategy is not None:
+            self.strategy = strategy
+        if max_restarts is not None:
+            self.max_restarts = max_restarts
+        if within is not None:
+            self.within = within
+        if self.strategy not in ('one_for_one', 'one_for_all'):
+            raise ValueError("Unknown strategy: %s" % self.strategy)
+        self.children = []
+        # When the latest restarts happened
+        self.restarts = collections.deque()
+
+    def stop(self):
+        for child in self.children:
+            child.actor.stop()
+        super(Supervisor, self).stop()
+
+    @hollywood.fun.patternmatch(hollywood.actor.Base, Exception)
+    def receive(self, actor, error):
+        """One of the actors failed, restart it (or all of them)."""
+        child = self._child_of(actor)
+        if child is None or child.restarting:
+            return
+        logging.warning("[%s] %s failed: %r", self.address.name, actor.address.name, error)
+
+        now = time.time()
+        while self.restarts and now - self.restarts[0] > self.within:
+            self.restarts.popleft()
+        if len(self.restarts) >= self.max_restarts:
+            self._give_up()
+            return
+        self.restarts.append(now)
+
+        children = [child]
+        if self.strategy == 'one_for_all':
+            children = list(self.children)
+        for other in children:
+            other.restarting = True
+            if other is not child:
+                other.actor.suspend()
+        delay = min(self.backoff * 2 ** (len(self.restarts) - 1), self.max_backoff)
+        _timer.call_later(delay, self.address.tell, _Restart(children))
+
+    @hollywood.fun.patternmatch(_Restart)
+    def receive(self, restart):
+        for child in restart.children:
+            previous = child.actor
+            # Never two instances taking messages from the same inbox
+            previous.terminated.wait()
+            actor = child.actor_class(*child.args, **child.kwargs)
+            actor._adopt(previous)
+            child.actor = actor
+            child.restarting = False
+            with hollywood.System.actor_lock:
+                hollywood.System.processes[actor.address.name] = actor
+            logging.info("[%s] Restarted %s.", self.address.name, actor.address.name)
+
+    @hollywood.fun.default
+    def receive(self, actor_class, *args, **kwargs):
+        """Spawn actor_class(*args, **kwargs) under supervision, returns its address."""
+        if issubclass(actor_class, hollywood.actor.Process):
+            raise TypeError("Process actors can't be supervised: %s" % actor_class)
+        name = hollywood.actor.Address.name_of(actor_class)
+        actor = hollywood.System._spawn_member(name, actor_class, args, kwargs)
+        actor.supervisor = self.address
+        self.children.append(_Child(actor_class, args, kwargs, actor))
+        return actor.address
+
+    def _child_of(self, actor):
+        for child in self.children:
+            if child.actor is actor:
+                return child
+        return None
+
+    def _give_up(self):
+        logging.error("[%s] %i restarts in %.1fs, giving up.", self.address.name,
+                      len(self.restarts), self.within)
+        for child in self.children:
+            # Rejected first, stop() leaves a marker in the inbox to wake it up
+            child.actor._reject(
+                hollywood.exceptions.ActorRuntimeError(child.actor.address.name))
+            child.actor.stop()
+            hollywood.System.forget(child.actor)
+        self.children = []
+        self.stop()
@@ -1,14 +1,22 @@
 #!/usr/bin/env python
 
 import time
+import Queue
+import functools
+import itertools
 import threading
 import logging
+import collections
 
 import sys
 import signal
 
 import hollywood.actor
 import hollywood.exceptions
+import hollywood.metrics
+import hollywood.remote
+import hollywood.router
+import hollywood.scheduler
 
 # Clean shutdown with ctrl-c
 def signal_handler(sig, frame):
@@ -20,36 +28,207 @@ signal.signal(signal.SIGINT, signal_handler)
 class System(object):
 
     addresses = {}
-    processes = {}
+    # In the order they were spawned
+    processes = collections.OrderedDict()
+    # Actor class -> node ('host:port') where it's spawned, see hollywood.remote
+    placements = {}
+    instances = itertools.count()
     actor_lock = threading.RLock()
+    # Name -> function returning more stats, see report()
+    reporters = {}
+
+    @classmethod
+    def report(cls, name, function):
+        """Have function() added to stats() under 'name'."""
+        cls.reporters[name] = function
+
+    @classmethod
+    def place(cls, actor_class, node):
+        """Have actor_class spawned on another node ('host:port')."""
+        cls.placements[actor_class] = node
 
     @classmethod
     def spawn(cls, actor_class, *args, **kwargs):
         if actor_class in cls.addresses:
-            return cls.address[actor_class]
+            return cls.addresses[actor_class]
+        if actor_class in cls.placements:
+            address = hollywood.remote.spawn(cls.placements[actor_class],
+                                             actor_class, args, kwargs)
+            cls.addresses[actor_class] = address
+            return address
         actor = actor_class(*args, **kwargs)
         cls.processes[actor.address.name] = actor
         cls.addresses[actor_class] = actor.address
         return actor.address
 
     @classmethod
-    def halt(cls):
+    def spawn_pool(cls, actor_class, size, strategy=None, args=(), kwargs=None):
+        """Spawn 'size' instances of actor_class behind a single address.
+
+        Each instance is built with actor_class(*args, **kwargs). The
+        strategy defaults to hollywood.router.RoundRobin. The router's
+        'factory' spawns additional instances (see hollywood.autoscaler).
+        """
+        router = hollywood.router.Router(strategy=strategy)
+        router.address.name = hollywood.actor.Address.name_of(actor_class)
+        router.factory = functools.partial(cls._spawn_member, router.address.name,
+                                           actor_class, args, kwargs or {})
+        for _ in range(size):
+            router.add(router.factory())
+        return router.address
+
+    @classmethod
+    def _spawn_member(cls, name, actor_class, args, kwargs):
+        actor = actor_class(*args, **kwargs)
+        actor.address.name = '%s/%i' % (name, next(cls.instances))
+        with cls.actor_lock:
+            cls.processes[actor.address.name] = actor
+        return actor
+
+    @classmethod
+    def forget(cls, actor):
+        """Unregister an actor which is no longer running."""
+        with cls.actor_lock:
+            cls.processes.pop(actor.address.name, None)
+
+    @classmethod
+    def halt(cls, timeout=5.0):
+        """Stop every actor and executor, taking at most 'timeout' seconds.
+
+        Actors are drained (they process the messages already queued) in
+        dependency order: an actor holding the address of another one is
+        drained first, so it can still send to it meanwhile. Actors still
+        busy when the time is up are stopped, and the futures of the
+        messages left in their inboxes fail with ActorRuntimeError.
+        Threads started by hollywood still running by then are logged, halt
+        doesn't wait for them any longer (nor ever for the application's).
+        """
         logging.warning("Shutdown sequence initiated.")
+        deadline = time.time() + timeout
         with cls.actor_lock:
+            actors = cls.processes.values()
+            cls.processes.clear()
+            # Spawning again after halt starts from scratch
+            cls.addresses.clear()
+
+        dependents = _dependents(actors)
+        pending, draining, undrained = list(actors), [], []
+        while pending or draining:
+            draining = [actor for actor in draining if not actor.terminated.is_set()]
+            # The actors nobody still running sends to
+            ready = [actor for actor in pending
+                     if all(other.terminated.is_set() for other in dependents[actor])]
+            if not ready and pending and not draining:
+                # Circular references, newest first
+                ready = [pending[-1]]
+            for actor in ready:
+                logging.info("Halting: %s", actor.address.name)
+                pending.remove(actor)
+                draining.append(actor)
+                undrained.append(actor)
+            for actor in list(undrained):
+                try:
+                    actor.drain(0)
+                except Queue.Full:
+                    # Tried again until the deadline, then stopped below
+                    continue
+                undrained.remove(actor)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if draining:
+                draining[0].terminated.wait(min(remaining, 0.01))
+
+        for actor in actors:
+            error = hollywood.exceptions.ActorRuntimeError(actor.address.name)
+            if actor.terminated.is_set():
+                actor._reject(error)
+                continue
+            logging.warning("Actor still busy, stopping it: %s", actor.address.name)
+            # Rejected first, stop() leaves a marker in the inbox to wake it up
+            actor._reject(error)
+            actor.stop()
 
-            address_list = cls.processes.keys()
-            for address in address_list:
-                logging.info("Halting: %s", address)
-                cls.processes[address].stop()
-                del cls.processes[address]
+        hollywood.scheduler.stop_all(max(deadline - time.time(), 0))
 
-        while threading.active_count() > 1:
-            for thread in threading.enumerate():
-                logging.warning("Actor blocking termination: %s", thread.name)
-            time.sleep(1)
+        # Only hollywood's own threads, the application's are its business
+        current = threading.current_thread()
+        for thread in hollywood.scheduler.threads():
+            if thread is not current:
+                thread.join(max(deadline - time.time(), 0))
+        for thread in hollywood.scheduler.threads():
+            if thread is not current:
+                logging.warning("Thread blocking termination: %s", thread.name)
         logging.warning("Shutdown complete.")
 
 
+    @classmethod
+    def stats(cls):
+        """Metrics of every actor, by name and added up by class, plus
+        those of the reporters (e.g. 'tls', see hollywood.net.tls.stats):
+            {'actors': {name: metrics}, 'classes': {class name: metrics}, ...}
+        See hollywood.metrics.Metrics.snapshot for what's in them."""
+        with cls.actor_lock:
+            actors = cls.processes.values()
+        stats = {'actors': {}, 'classes': {}}
+        for name, function in cls.reporters.items():
+            stats[name] = function()
+        classes = {}
+        for actor in actors:
+            stats['actors'][actor.address.name] = actor.metrics.snapshot(actor.dropped)
+            name = hollywood.actor.Address.name_of(actor.__class__)
+            if name not in classes:
+                classes[name] = [hollywood.metrics.Metrics(), 0]
+            classes[name][0].merge(actor.metrics)
+            classes[name][1] += actor.dropped
+        for name, (metrics, dropped) in classes.items():
+            stats['classes'][name] = metrics.snapshot(dropped)
+        return stats
+
     @classmethod
     def alive(cls):
         return len(cls.processes)
+
+
+def _dependents(actors):
+    """actor -> the actors holding its address."""
+    dependents = dict((actor, []) for actor in actors)
+    for actor in actors:
+        for dependency in _dependencies(actor):
+            if dependency in dependents:
+                dependents[dependency].append(actor)
+    return dependents
+
+
+def _dependencies(actor):
+    """The actors whose addresses are in the attributes of 'actor'."""
+    values = []
+    for value in vars(actor).values():
+        if isinstance(value, dict):
+            values.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            values.extend(value)
+        else:
+            values.append(value)
+    found = set()
+    for value in values:
+        if isinstance(value, hollywood.actor.Address):
+            found.update(_behind(value))
+    found.discard(actor)
+    return found
+
+
+def _behind(address):
+    """The actors receiving the messages sent to 'address'."""
+    target = address.actor
+    if isinstance(target, hollywood.actor.Base):
+        return [target]
+    # Routers
+    members = getattr(target, 'members', None)
+    if members is not None:
+        return list(members)
+    # Path routers (hollywood.net.routes)
+    addresses = getattr(target, 'addresses', None)
+    if addresses is not None:
+        return [actor for each in addresses() for actor in _behind(each)]
+    return []
@@ -20,7 +20,7 @@ setup(
     license="MIT",
     keywords="actor framework",
     url="https://github.com/grilo/hollywood",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
     long_description=read('README.md'),
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -0,0 +1,90 @@
+import time
+import Queue
+import socket
+import logging
+
+import pytest
+
+import hollywood
+import hollywood.net.http
+
+
+@pytest.fixture(autouse=True)
+def halt():
+    """Every test starts from an empty System."""
+    yield
+    logging.disable(logging.WARNING)
+    try:
+        hollywood.System.halt(timeout=2.0)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def spawn():
+    """spawn(actor_class, *args, **kwargs): a new actor instance, halted
+    after the test like the others (System.spawn returns addresses, and a
+    single actor per class)."""
+    def spawn(actor_class, *args, **kwargs):
+        address = hollywood.System.spawn_pool(actor_class, 1, args=args, kwargs=kwargs)
+        return address.actor.members[0]
+    return spawn
+
+
+class _Request(hollywood.net.http.Request):
+    """Keeps the responses sent instead of writing them to a socket."""
+
+    def __init__(self, path='/', method='GET', headers=''):
+        super(_Request, self).__init__(
+            raw_string='%s %s HTTP/1.1\r\nHost: x\r\n%s\r\n' % (method, path, headers))
+        self.responses = Queue.Queue()
+
+    def send(self, response):
+        self.responses.put(response)
+
+    def response(self):
+        return self.responses.get(timeout=5)
+
+
+@pytest.fixture
+def fake_request():
+    """fake_request(path='/', method='GET', headers=''): a request whose
+    responses are kept, see its response()."""
+    return _Request
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def free_port():
+    """free_port(): a port nothing listens on."""
+    return _free_port
+
+
+@pytest.fixture
+def serve(spawn):
+    """serve(server_class, handler_class, *args, **attributes): port of a
+    running server, 'args' are passed on after the port (e.g. certfile)."""
+    def serve(server_class, handler_class, *args, **attributes):
+        handler = hollywood.System.spawn_pool(handler_class, 1)
+        server = spawn(server_class, handler)
+        for name, value in attributes.items():
+            setattr(server, name, value)
+        port = _free_port()
+        server.address.tell('127.0.0.1', port, *args)
+        deadline = time.time() + 5
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                return port
+            except socket.error:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.02)
+    return serve
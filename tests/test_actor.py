@@ -0,0 +1,106 @@
+import time
+import resource
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+
+
+class Recorder(hollywood.actor.Threaded):
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.received = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def receive(self, message):
+        self.release.wait(5)
+        if message == 'fail':
+            raise ValueError(message)
+        self.received.append(message)
+        return message * 2
+
+
+class PooledRecorder(hollywood.actor.Pooled):
+
+    def __init__(self):
+        super(PooledRecorder, self).__init__()
+        self.received = []
+        self.release = threading.Event()
+        self.release.set()
+
+    receive = Recorder.receive.im_func
+
+
+def _cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def test_messages_are_processed_in_order(spawn):
+    actor = spawn(Recorder)
+    for i in range(100):
+        actor.address.tell(i)
+    assert actor.address.ask('last').get(timeout=5) == 'lastlast'
+    assert actor.received == range(100) + ['last']
+
+
+def test_exceptions_go_to_whoever_asked(spawn):
+    actor = spawn(Recorder)
+    with pytest.raises(ValueError):
+        actor.address.ask('fail').get(timeout=5)
+    actor.address.tell('fail')
+    assert actor.address.ask(1).get(timeout=5) == 2
+    assert actor.metrics.errors == 2
+
+
+def test_idle_actors_dont_use_cpu(spawn):
+    actors = [spawn(Recorder) for _ in range(20)]
+    assert actors[-1].address.ask(1).get(timeout=5) == 2
+    started = _cpu()
+    time.sleep(0.5)
+    assert _cpu() - started < 0.1
+
+
+def test_stop_wakes_up_idle_actors(spawn):
+    actor = spawn(Recorder)
+    actor.address.stop()
+    assert actor.terminated.wait(1)
+
+
+def test_drain_processes_the_queued_messages_first(spawn):
+    actor = spawn(Recorder)
+    actor.release.clear()
+    futures = [actor.address.ask(i) for i in range(5)]
+    actor.drain()
+    actor.release.set()
+    assert actor.terminated.wait(5)
+    assert [future.get(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+
+
+def test_pooled_actors_suspended_while_busy_leave_their_messages(spawn, monkeypatch):
+    actor = spawn(PooledRecorder)
+    actor.release.clear()
+    busy = actor.address.ask(0)
+    while not actor.in_flight:
+        time.sleep(0.01)
+    get_nowait = actor.inbox.get_nowait
+
+    def suspended_meanwhile():
+        # Suspended right after the worker checked it's still alive
+        actor.suspend()
+        return get_nowait()
+    monkeypatch.setattr(actor.inbox, 'get_nowait', suspended_meanwhile)
+    futures = [actor.address.ask(i) for i in range(1, 4)]
+    actor.release.set()
+    assert busy.get(timeout=5) == 0
+    assert actor.terminated.wait(5)
+    assert actor.received == [0]
+
+    monkeypatch.undo()
+    successor = spawn(PooledRecorder)
+    successor._adopt(actor)
+    assert [future.get(timeout=5) for future in futures] == [2, 4, 6]
@@ -0,0 +1,78 @@
+import time
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+
+trollius = pytest.importorskip('trollius')
+asyncio, From, Return = trollius, trollius.From, trollius.Return
+
+
+class Sleeper(hollywood.actor.Asyncio):
+    """Answers after sleeping, without blocking the event loop."""
+
+    def __init__(self):
+        super(Sleeper, self).__init__()
+        self.log = []
+
+    @asyncio.coroutine
+    def receive(self, name, seconds=0.0):
+        self.log.append(('start', name))
+        yield From(asyncio.sleep(seconds))
+        self.log.append(('end', name))
+        if name == 'fail':
+            raise ValueError(name)
+        raise Return(name)
+
+
+class Plain(hollywood.actor.Asyncio):
+
+    def receive(self, value):
+        return threading.current_thread().name, value
+
+
+class Relay(hollywood.actor.Asyncio):
+    """Awaits the answer of another actor."""
+
+    @asyncio.coroutine
+    def receive(self, address, message):
+        result = yield From(address.ask(message).waiter)
+        raise Return(('relayed', result))
+
+
+def test_plain_receive_runs_in_the_event_loop(spawn):
+    actor = spawn(Plain)
+    assert actor.address.ask(1).get(timeout=5) == ('hollywood/eventloop', 1)
+
+
+def test_coroutines_are_run_to_completion_one_at_a_time(spawn):
+    actor = spawn(Sleeper)
+    futures = [actor.address.ask(name, 0.01) for name in 'abc']
+    assert [future.get(timeout=5) for future in futures] == list('abc')
+    assert actor.log == [(event, name) for name in 'abc' for event in ('start', 'end')]
+
+
+def test_actors_share_the_event_loop_without_blocking_it(spawn):
+    actors = [spawn(Sleeper) for _ in range(20)]
+    started = time.time()
+    futures = [actor.address.ask(i, 0.2) for i, actor in enumerate(actors)]
+    assert [future.get(timeout=5) for future in futures] == range(20)
+    assert time.time() - started < 2
+
+
+def test_exceptions_reach_the_future(spawn):
+    actor = spawn(Sleeper)
+    with pytest.raises(ValueError):
+        actor.address.ask('fail').get(timeout=5)
+    assert actor.address.ask('next').get(timeout=5) == 'next'
+
+
+def test_asks_can_be_awaited(spawn):
+    relay = spawn(Relay)
+    assert relay.address.ask(spawn(Sleeper).address, 'x').get(timeout=5) == ('relayed', 'x')
+    future = relay.address.ask(spawn(Sleeper).address, 'fail')
+    with pytest.raises(ValueError):
+        future.get(timeout=5)
+
@@ -0,0 +1,103 @@
+import time
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.autoscaler
+
+
+class Sleeper(hollywood.actor.Threaded):
+
+    def receive(self, seconds):
+        time.sleep(seconds)
+
+
+class Blocked(hollywood.actor.Threaded):
+
+    mailbox_size = 1
+
+    def receive(self, event):
+        event.wait(5)
+
+
+class AsyncEcho(hollywood.actor.Asyncio):
+
+    def receive(self, message):
+        return message
+
+
+@pytest.fixture
+def scalers():
+    """AutoScaler instances, scale() is called by the tests themselves."""
+    created = []
+
+    def create(pool, **kwargs):
+        kwargs.setdefault('cooldown', 0)
+        scaler = hollywood.autoscaler.AutoScaler(pool, **kwargs)
+        created.append(scaler)
+        return scaler
+    yield create
+    for scaler in created:
+        scaler.stop()
+
+
+def test_grows_on_backlog(scalers):
+    pool = hollywood.System.spawn_pool(Sleeper, 1)
+    for _ in range(5):
+        pool.tell(0.05)
+    scaler = scalers(pool, backlog=2)
+    scaler.scale()
+    assert len(pool.actor.members) == 2
+
+
+def test_shrinks_when_idle(scalers):
+    pool = hollywood.System.spawn_pool(Sleeper, 3)
+    scaler = scalers(pool, minimum=1)
+    scaler.scale()
+    assert len(pool.actor.members) == 2
+
+
+def test_idle_pool_does_not_grow_on_past_latency(scalers):
+    pool = hollywood.System.spawn_pool(Sleeper, 2)
+    [future.get(timeout=2) for future in [pool.ask(0.1) for _ in range(2)]]
+    for member in pool.actor.members:
+        # As if after a burst of slow messages
+        member.service_time = 0.2
+    scaler = scalers(pool, minimum=2, latency=0.05)
+    for _ in range(5):
+        scaler.scale()
+    assert len(pool.actor.members) == 2
+
+
+def test_asyncio_members(scalers):
+    pool = hollywood.System.spawn_pool(AsyncEcho, 2)
+    assert pool.ask('x').get(timeout=1) == 'x'
+    scaler = scalers(pool, minimum=1)
+    scaler.scale()
+    assert len(pool.actor.members) == 1
+
+
+def test_draining_a_full_inbox_does_not_block(scalers):
+    pool = hollywood.System.spawn_pool(Blocked, 1)
+    member = pool.actor.members[0]
+    release = threading.Event()
+    pool.tell(release)
+    deadline = time.time() + 1
+    while member.in_flight == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    pool.tell(release)
+    scaler = scalers(pool, minimum=0)
+    started = time.time()
+    scaler._drain(member)
+    assert time.time() - started < 0.5
+    assert scaler.undrained == [member]
+
+    release.set()
+    deadline = time.time() + 2
+    while scaler.undrained and time.time() < deadline:
+        time.sleep(0.05)
+        scaler._reap()
+    assert scaler.undrained == []
+    assert member.terminated.wait(2)
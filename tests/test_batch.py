@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+
+
+class Doubler(hollywood.actor.Threaded):
+    """Holds on to the batch with 'gate' in it until 'release' is set, so
+    that the messages sent meanwhile queue up."""
+
+    batch_size = 10
+
+    def __init__(self):
+        super(Doubler, self).__init__()
+        self.release = threading.Event()
+        self.batches = []
+
+    def receive_batch(self, messages):
+        values = [args[0] for args, _ in messages]
+        self.batches.append(values)
+        if 'gate' in values:
+            self.release.wait(5)
+        return self.results(values)
+
+    def results(self, values):
+        return [value * 2 for value in values]
+
+
+class PooledDoubler(hollywood.actor.Pooled):
+
+    receive_batch = Doubler.receive_batch.im_func
+    results = Doubler.results.im_func
+    batch_size = 10
+
+    def __init__(self):
+        super(PooledDoubler, self).__init__()
+        self.release = threading.Event()
+        self.batches = []
+
+
+def _gated(spawn, actor_class, values):
+    """The futures of 'values', queued behind a gate which is then opened."""
+    actor = spawn(actor_class)
+    actor.ask('gate')
+    futures = [actor.ask(value) for value in values]
+    actor.release.set()
+    return actor, futures
+
+
+@pytest.mark.parametrize('actor_class', [Doubler, PooledDoubler])
+def test_queued_messages_are_batched(spawn, actor_class):
+    actor, futures = _gated(spawn, actor_class, range(25))
+    assert [future.get(timeout=2) for future in futures] == [i * 2 for i in range(25)]
+    assert max(len(batch) for batch in actor.batches) == 10
+    assert len(actor.batches) <= 4
+
+
+def test_batch_timeout_waits_for_the_batch_to_fill_up(spawn):
+    actor = spawn(Doubler)
+    actor.batch_size = 1000
+    actor.batch_timeout = 0.2
+    futures = [actor.ask(i) for i in range(20)]
+    assert [future.get(timeout=2) for future in futures] == [i * 2 for i in range(20)]
+    assert len(actor.batches) < 20
+
+
+def test_results_can_be_none(spawn):
+    class Quiet(Doubler):
+        def results(self, values):
+            return None
+    actor, futures = _gated(spawn, Quiet, range(5))
+    assert [future.get(timeout=2) for future in futures] == [None] * 5
+
+
+def test_exception_fails_the_whole_batch(spawn):
+    class Broken(Doubler):
+        def results(self, values):
+            raise ValueError('batch')
+    actor, futures = _gated(spawn, Broken, range(5))
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.get(timeout=2)
+
+
+@pytest.mark.parametrize('results', [
+    lambda values: [1],
+    lambda values: [1] * (len(values) + 1),
+    lambda values: iter([1] * len(values)),
+    lambda values: 42,
+])
+def test_wrong_number_of_results_fails_every_future(spawn, results):
+    class Wrong(Doubler):
+        pass
+    Wrong.results = lambda self, values: results(values)
+    actor, futures = _gated(spawn, Wrong, range(5))
+    for future in futures:
+        with pytest.raises(hollywood.exceptions.ActorRuntimeError):
+            future.get(timeout=2)
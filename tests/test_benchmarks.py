@@ -0,0 +1,82 @@
+import json
+import sys
+
+import pytest
+
+import benchmarks
+import benchmarks.__main__ as runner
+
+
+def test_metric_directions_and_tolerances():
+    assert benchmarks.higher_is_better('requests_per_second')
+    assert not benchmarks.higher_is_better('p50_ms')
+    assert benchmarks.tolerance('p50_ms', 0.25) == 0.25
+    assert benchmarks.tolerance('p99_ms', 0.25) == 0.5
+    assert benchmarks.tolerance('pooled_ask_p99_us', 0.25) == 0.5
+
+
+def test_percentile():
+    assert benchmarks.percentile([], 0.5) == 0.0
+    values = range(100, 0, -1)
+    assert benchmarks.percentile(values, 0.5) == 51
+    assert benchmarks.percentile(values, 0.99) == 100
+    assert benchmarks.percentile(values, 1.0) == 100
+
+
+def test_compare_and_best():
+    baseline = {'a': {'x_per_second': 100.0, 'y_ms': 10.0}, 'b': {'z_ms': 1.0}}
+    results = {'a': {'x_per_second': 70.0, 'y_ms': 12.0, 'new_ms': 5.0},
+               'b': {'z_ms': 1.3}, 'c': {'w_ms': 1.0}}
+    assert runner.compare(results, baseline, 0.25) == [
+        ('a', 'x_per_second', 100.0, 70.0), ('b', 'z_ms', 1.0, 1.3)]
+    assert runner.best({'x_per_second': 1.0, 'y_ms': 2.0},
+                       {'x_per_second': 3.0, 'y_ms': 1.0, 'z_ms': 4.0}) == {
+        'x_per_second': 3.0, 'y_ms': 1.0, 'z_ms': 4.0}
+
+
+@pytest.mark.parametrize('name, arguments', [
+    ('tell_ask', dict(rounds=1, messages=50)),
+    ('fan_out_in', dict(rounds=1, messages=200, workers=2, senders=2)),
+    ('ping_pong', dict(rounds=1, exchanges=100)),
+    ('spawn', dict(pooled=20, threaded=5)),
+    ('patternmatch', dict(rounds=1, calls=100)),
+])
+def test_benchmarks_report_the_baseline_metrics(name, arguments):
+    with open(runner.BASELINE) as stored:
+        baseline = json.load(stored)['results']
+    assert sorted(baseline) == sorted(benchmarks.load())
+    metrics = benchmarks.load()[name](**arguments)
+    assert sorted(metrics) == sorted(baseline[name])
+    assert all(value >= 0 for value in metrics.values())
+
+
+@pytest.fixture
+def main(monkeypatch, tmpdir):
+    """main(results, *arguments): exit status of the runner, measuring
+    'results' (a list of metrics per run of each benchmark) instead."""
+    def main(results, *arguments):
+        runs = dict((name, list(metrics)) for name, metrics in results.items())
+        monkeypatch.setattr(runner, 'measure', lambda name: runs[name].pop(0))
+        monkeypatch.setattr(benchmarks, 'load', lambda: dict.fromkeys(results))
+        monkeypatch.setattr(sys, 'argv', ['benchmarks', '--baseline',
+                                          str(tmpdir.join('baseline.json'))] + list(arguments))
+        return runner.main()
+    return main
+
+
+def test_regressions_are_confirmed(main, tmpdir):
+    assert main({'a': [{'x_ms': 10.0}]}, '--save-baseline') == 0
+    # Slower once, not the second time
+    assert main({'a': [{'x_ms': 20.0}, {'x_ms': 10.0}]}) == 0
+    # Slower every time
+    output = str(tmpdir.join('results.json'))
+    assert main({'a': [{'x_ms': 20.0}] * 3}, '--output', output) == 1
+    with open(output) as results:
+        assert json.load(results)['results'] == {'a': {'x_ms': 20.0}}
+
+
+def test_saving_keeps_the_other_benchmarks(main, tmpdir):
+    assert main({'a': [{'x_ms': 1.0}], 'b': [{'y_ms': 2.0}]}, '--save-baseline') == 0
+    assert main({'a': [{'x_ms': 3.0}], 'b': []}, 'a', '--save-baseline') == 0
+    with open(str(tmpdir.join('baseline.json'))) as stored:
+        assert json.load(stored)['results'] == {'a': {'x_ms': 3.0}, 'b': {'y_ms': 2.0}}
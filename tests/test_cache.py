@@ -0,0 +1,128 @@
+import time
+import threading
+
+import pytest
+
+import hollywood.actor
+import hollywood.net.cache
+import hollywood.net.http
+
+
+class Counter(hollywood.actor.Threaded):
+    """Answers with the number of requests it got, once 'release' is set."""
+
+    def __init__(self):
+        super(Counter, self).__init__()
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def receive(self, request):
+        self.calls += 1
+        self.release.wait(5)
+        response = hollywood.net.http.Response()
+        response.content = str(self.calls)
+        request.send(response)
+
+
+class Files(hollywood.actor.Threaded):
+
+    def __init__(self, path):
+        super(Files, self).__init__()
+        self.path = path
+        self.calls = 0
+
+    def receive(self, request):
+        self.calls += 1
+        response = hollywood.net.http.Response()
+        response.content = hollywood.net.http.FileRange(self.path)
+        request.send(response)
+
+
+class Silent(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        pass
+
+
+class Broken(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        raise ValueError('broken')
+
+
+class Late(hollywood.actor.Threaded):
+    """Answers its first request after a while, the others straight away."""
+
+    def __init__(self):
+        super(Late, self).__init__()
+        self.calls = 0
+
+    def receive(self, request):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.5)
+        response = hollywood.net.http.Response()
+        response.content = str(self.calls)
+        request.send(response)
+
+
+def _cached(spawn, handler_class, *args):
+    """The handler and a cache in front of it."""
+    handler = spawn(handler_class, *args)
+    return handler, spawn(hollywood.net.cache.CachingHandler, handler.address)
+
+
+def _get(cache, request):
+    cache.address.tell(request)
+    return request.response()
+
+
+def test_responses_are_cached(spawn, fake_request):
+    handler, cache = _cached(spawn, Counter)
+    assert [_get(cache, fake_request()).content for _ in range(3)] == ['1', '1', '1']
+    assert _get(cache, fake_request('/other')).content == '2'
+    assert _get(cache, fake_request(headers='Cache-Control: no-cache\r\n')).content == '3'
+    assert handler.calls == 3
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_concurrent_requests_are_coalesced(spawn, fake_request):
+    handler, cache = _cached(spawn, Counter)
+    handler.release.clear()
+    requests = [fake_request() for _ in range(3)]
+    for request in requests:
+        cache.address.tell(request)
+    time.sleep(0.1)
+    handler.release.set()
+    assert [request.response().content for request in requests] == ['1', '1', '1']
+    assert handler.calls == 1
+
+
+def test_files_are_neither_cached_nor_shared(spawn, fake_request, tmpdir):
+    tmpdir.join('a').write('hello')
+    handler, cache = _cached(spawn, Files, str(tmpdir.join('a')))
+    for _ in range(2):
+        response = _get(cache, fake_request())
+        assert str(response.content) == 'hello'
+        response.content.file.close()
+    assert handler.calls == 2
+    assert cache.size == 0
+
+
+@pytest.mark.parametrize('handler_class', [Silent, Broken])
+def test_handler_not_answering_gets_500(spawn, fake_request, handler_class):
+    handler, cache = _cached(spawn, handler_class)
+    assert _get(cache, fake_request()).code == 500
+    assert cache.waiting == {}
+    assert _get(cache, fake_request()).code == 500
+
+
+def test_slow_handler_times_out(spawn, fake_request):
+    handler, cache = _cached(spawn, Late)
+    cache.response_timeout = 0.2
+    assert _get(cache, fake_request()).code == 504
+    assert cache.waiting == {}
+    time.sleep(0.5)
+    # The late response isn't mistaken for the answer to the next request
+    assert _get(cache, fake_request()).content == '2'
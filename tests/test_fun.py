@@ -0,0 +1,134 @@
+import pytest
+
+from hollywood.fun import patternmatch, default, Any
+
+
+class Base(object):
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+class OldStyle:
+    pass
+
+
+class Matcher(object):
+
+    @patternmatch(int)
+    def match(self, value):
+        return 'int'
+
+    @patternmatch(str)
+    def match(self, value):
+        return 'str'
+
+    @patternmatch(Base)
+    def match(self, value):
+        return 'base'
+
+    @patternmatch(object)
+    def match(self, value):
+        return 'object'
+
+    @patternmatch(int, int)
+    def match(self, first, second):
+        return 'int, int'
+
+    @patternmatch(int, Any)
+    def match(self, first, second):
+        return 'int, any'
+
+    @patternmatch(OldStyle)
+    def match(self, value):
+        return 'old style'
+
+    @patternmatch(float)
+    @patternmatch(long)
+    def match(self, value, **kwargs):
+        return 'number', kwargs
+
+
+class Strict(object):
+
+    @patternmatch(int)
+    def match(self, value):
+        return 'strict int'
+
+
+class WithDefault(object):
+
+    @patternmatch(int)
+    def match(self, value):
+        return 'int'
+
+    @default
+    def match(self, *args):
+        return 'default', args
+
+
+@pytest.mark.parametrize('args, expected', [
+    ((1,), 'int'),
+    (('a',), 'str'),
+    ((Base(),), 'base'),
+    ((Derived(),), 'base'),
+    ((True,), 'int'),
+    (([],), 'object'),
+    ((1, 2), 'int, int'),
+    ((1, 'a'), 'int, any'),
+    ((OldStyle(),), 'old style'),
+])
+def test_most_specific_method_wins(args, expected):
+    assert Matcher().match(*args) == expected
+
+
+def test_stacked_decorators_and_kwargs():
+    assert Matcher().match(1.5, unit='m') == ('number', {'unit': 'm'})
+    assert Matcher().match(2L) == ('number', {})
+
+
+def test_no_match():
+    # Misses aren't remembered, the second call fails the same way
+    for _ in range(2):
+        with pytest.raises(TypeError, match='No match'):
+            Matcher().match('a', 1)
+        with pytest.raises(TypeError, match='No match'):
+            Strict().match('a')
+
+
+def test_default():
+    assert WithDefault().match(1) == 'int'
+    assert WithDefault().match('a', 2) == ('default', ('a', 2))
+
+
+def test_classes_have_their_own_registry():
+    assert Strict().match(1) == 'strict int'
+    assert Matcher().match(1) == 'int'
+
+
+def test_methods_are_resolved_once_per_type(monkeypatch):
+    multimethod = Matcher.__dict__['match'].multimethod
+    multimethod.cache.clear()
+    resolved = []
+    resolve = multimethod.resolve
+    monkeypatch.setattr(multimethod, 'resolve',
+                        lambda key: resolved.append(key) or resolve(key))
+    matcher = Matcher()
+    for _ in range(3):
+        assert matcher.match(Derived()) == 'base'
+        assert matcher.match(1, 'a') == 'int, any'
+    assert resolved == [Derived, (int, str)]
+
+
+def test_duplicate_registration():
+    with pytest.raises(TypeError):
+        class Duplicate(object):
+            @patternmatch(int)
+            def match(self, value):
+                pass
+
+            @patternmatch(int)
+            def match(self, value):
+                pass
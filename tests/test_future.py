@@ -0,0 +1,179 @@
+import time
+import threading
+
+import pytest
+
+import hollywood.actor
+import hollywood.exceptions
+import hollywood.future
+
+
+def _resolve_later(future, value, delay=0.05):
+    threading.Timer(delay, future.put, [value]).start()
+
+
+def test_put_and_get():
+    future = hollywood.future.Base()
+    assert not future.ready()
+    future.put(42)
+    assert future.ready()
+    assert future.get() == 42
+    assert future.get_nowait() == 42
+
+
+def test_exceptions_are_raised_by_get():
+    future = hollywood.future.Base()
+    future.set_exception(ValueError('oops'))
+    with pytest.raises(ValueError):
+        future.get()
+
+
+def test_resolved_once():
+    future = hollywood.future.Base()
+    future.put(1)
+    with pytest.raises(hollywood.exceptions.FutureAlreadyResolvedError):
+        future.put(2)
+    with pytest.raises(hollywood.exceptions.FutureAlreadyResolvedError):
+        future.set_exception(ValueError())
+    assert future.get() == 1
+
+
+def test_get_waits_for_the_result():
+    future = hollywood.future.Base()
+    _resolve_later(future, 'late')
+    assert future.get(timeout=5) == 'late'
+
+
+def test_get_times_out():
+    future = hollywood.future.Base()
+    with pytest.raises(hollywood.exceptions.FutureTimeoutError):
+        future.get_nowait()
+    started = time.time()
+    with pytest.raises(hollywood.exceptions.FutureTimeoutError):
+        future.get(timeout=0.05)
+    assert time.time() - started >= 0.04
+
+
+def test_no_event_unless_someone_waits():
+    future = hollywood.future.Base()
+    future.put(1)
+    future.get()
+    assert future.event is None
+
+
+def test_many_threads_waiting():
+    future = hollywood.future.Base()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(future.get(timeout=5)))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    future.put('x')
+    for thread in threads:
+        thread.join(5)
+    assert results == ['x'] * 10
+
+
+def test_done_callbacks():
+    future = hollywood.future.Base()
+    called = []
+    future.add_done_callback(lambda f: called.append(('before', f.payload)))
+    future.put(1)
+    future.add_done_callback(lambda f: called.append(('after', f.payload)))
+    assert called == [('before', 1), ('after', 1)]
+
+
+def test_failing_callbacks_dont_stop_the_others():
+    future = hollywood.future.Base()
+    called = []
+    future.add_done_callback(lambda f: 1 / 0)
+    future.add_done_callback(lambda f: called.append(f.payload))
+    future.put(1)
+    assert called == [1]
+
+
+def _resolved(value):
+    future = hollywood.future.Base()
+    future.put(value)
+    return future
+
+
+def _failed(error):
+    future = hollywood.future.Base()
+    future.set_exception(error)
+    return future
+
+
+def test_map():
+    future = hollywood.future.Base()
+    mapped = future.map(lambda value: value + 1)
+    assert not mapped.ready()
+    future.put(1)
+    assert mapped.get() == 2
+    with pytest.raises(ZeroDivisionError):
+        _resolved(0).map(lambda value: 1 / value).get()
+    with pytest.raises(ValueError):
+        _failed(ValueError()).map(lambda value: value).get()
+
+
+def test_then_chains_futures():
+    second = hollywood.future.Base()
+    chained = _resolved(1).then(lambda value: second)
+    assert not chained.ready()
+    second.put('second')
+    assert chained.get() == 'second'
+    assert _resolved(1).then(lambda value: value * 3).get() == 3
+    with pytest.raises(ValueError):
+        _resolved(1).then(lambda value: _failed(ValueError())).get()
+
+
+class Double(hollywood.actor.Threaded):
+
+    def receive(self, value):
+        return value * 2
+
+
+def test_pipeline_of_asks(spawn):
+    double = spawn(Double).address
+    future = double.ask(1).then(double.ask).then(double.ask)
+    assert future.get(timeout=5) == 8
+
+
+def test_timeout():
+    never = hollywood.future.Base()
+    with pytest.raises(hollywood.exceptions.FutureTimeoutError):
+        never.timeout(0.05).get(timeout=5)
+    late = hollywood.future.Base()
+    limited = late.timeout(5)
+    late.put(1)
+    assert limited.get(timeout=1) == 1
+
+
+def test_gather():
+    futures = [hollywood.future.Base() for _ in range(3)]
+    gathered = hollywood.future.gather(futures)
+    for i, future in reversed(list(enumerate(futures))):
+        assert not gathered.ready()
+        future.put(i)
+    assert gathered.get() == [0, 1, 2]
+    assert hollywood.future.gather([]).get() == []
+
+
+def test_gather_fails_as_soon_as_one_does():
+    futures = [hollywood.future.Base() for _ in range(3)]
+    gathered = hollywood.future.gather(futures)
+    futures[1].set_exception(ValueError())
+    with pytest.raises(ValueError):
+        gathered.get_nowait()
+    futures[0].put(0)
+    futures[2].put(2)
+
+
+def test_first():
+    futures = [hollywood.future.Base() for _ in range(3)]
+    first = hollywood.future.first(futures)
+    futures[2].put('third')
+    futures[0].set_exception(ValueError())
+    assert first.get() == 'third'
+    with pytest.raises(ValueError):
+        hollywood.future.first([_failed(ValueError())]).get()
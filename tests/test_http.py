@@ -0,0 +1,388 @@
+import time
+import socket
+import email.utils
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.net.http
+
+
+class Hello(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        response = hollywood.net.http.Response()
+        response.content = 'hello %s' % request.path
+        request.send(response)
+
+
+class Broken(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        raise ValueError('broken')
+
+
+class Silent(hollywood.actor.Threaded):
+    """Never answers."""
+
+    def receive(self, request):
+        pass
+
+
+class _Client(object):
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port))
+        self.sock.settimeout(5)
+        self.buffered = ''
+
+    def sendall(self, data):
+        self.sock.sendall(data)
+
+    def recv(self, size):
+        if self.buffered:
+            data, self.buffered = self.buffered, ''
+            return data
+        return self.sock.recv(size)
+
+    def close(self):
+        self.sock.close()
+
+
+def _connect(port):
+    return _Client(port)
+
+
+def _read_response(client):
+    """Status code and body of the next response, None if the connection closed."""
+    data = ''
+    while '\r\n\r\n' not in data:
+        received = client.recv(65536)
+        if not received:
+            return None
+        data += received
+    head, body = data.split('\r\n\r\n', 1)
+    length = 0
+    for line in head.split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    while len(body) < length:
+        body += client.recv(65536)
+    body, client.buffered = body[:length], body[length:]
+    return int(head.split(' ')[1]), body
+
+
+def _get(port, path='/', headers=''):
+    sock = _connect(port)
+    try:
+        sock.sendall('GET %s HTTP/1.1\r\nHost: x\r\nConnection: close\r\n%s\r\n' % (path, headers))
+        return _read_response(sock)
+    finally:
+        sock.close()
+
+
+@pytest.mark.parametrize('server_class', [hollywood.net.http.Server,
+                                          hollywood.net.http.EventServer])
+def test_serves_requests(serve, server_class):
+    port = serve(server_class, Hello)
+    assert _get(port, '/a') == (200, 'hello /a')
+
+
+@pytest.mark.parametrize('server_class', [hollywood.net.http.Server,
+                                          hollywood.net.http.EventServer])
+def test_failing_handler_answers_500(serve, server_class):
+    port = serve(server_class, Broken)
+    assert _get(port)[0] == 500
+
+
+def test_keep_alive(serve):
+    port = serve(hollywood.net.http.EventServer, Hello)
+    sock = _connect(port)
+    for path in ('/a', '/b', '/c'):
+        sock.sendall('GET %s HTTP/1.1\r\nHost: x\r\n\r\n' % path)
+        assert _read_response(sock) == (200, 'hello %s' % path)
+    sock.close()
+
+
+def test_failing_handler_keeps_the_connection_usable(serve):
+    port = serve(hollywood.net.http.EventServer, Broken)
+    sock = _connect(port)
+    for _ in range(2):
+        sock.sendall('GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+        assert _read_response(sock)[0] == 500
+    sock.close()
+
+
+def test_connection_without_response_is_closed(serve):
+    port = serve(hollywood.net.http.EventServer, Silent, response_timeout=0.5)
+    sock = _connect(port)
+    sock.sendall('GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+    started = time.time()
+    assert _read_response(sock) is None
+    assert time.time() - started < 3
+    sock.close()
+
+
+class Streaming(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        response = hollywood.net.http.Response()
+        if request.path == '/bad':
+            # Not a string, only noticed when writing it out
+            response.content = iter(['first', 42])
+        else:
+            response.content = (piece for piece in ['a', 'b', 'c'])
+        request.send(response)
+
+
+class ClosedFile(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        response = hollywood.net.http.Response()
+        if request.path == '/closed':
+            content = hollywood.net.http.FileRange(__file__)
+            content.file.close()
+            content.remaining = 100000
+            response.content = content
+        else:
+            response.content = 'fine'
+        request.send(response)
+
+
+def test_streamed_response_is_chunked(serve):
+    port = serve(hollywood.net.http.EventServer, Streaming)
+    sock = _connect(port)
+    sock.sendall('GET / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    data = ''
+    while True:
+        received = sock.recv(65536)
+        if not received:
+            break
+        data += received
+    head, body = data.split('\r\n\r\n', 1)
+    assert 'transfer-encoding: chunked' in head.lower()
+    assert body == '1\r\na\r\n1\r\nb\r\n1\r\nc\r\n0\r\n\r\n'
+
+
+def test_streamed_response_to_keep_alive_http10_closes(serve):
+    # Without chunks, only the end of the connection ends the content
+    port = serve(hollywood.net.http.EventServer, Streaming)
+    sock = _connect(port)
+    sock.sendall('GET / HTTP/1.0\r\nConnection: keep-alive\r\n\r\n'
+                 'GET / HTTP/1.0\r\nConnection: keep-alive\r\n\r\n')
+    data = ''
+    while True:
+        received = sock.recv(65536)
+        if not received:
+            break
+        data += received
+    head, body = data.split('\r\n\r\n', 1)
+    assert 'connection: close' in head.lower()
+    assert body == 'abc'
+
+
+def test_pipelined_requests_are_answered_in_order(serve):
+    port = serve(hollywood.net.http.EventServer, Hello)
+    sock = _connect(port)
+    sock.sendall(''.join('GET /%i HTTP/1.1\r\nHost: x\r\n\r\n' % i for i in range(5)))
+    for i in range(5):
+        assert _read_response(sock) == (200, 'hello /%i' % i)
+    sock.close()
+
+
+@pytest.mark.parametrize('handler_class, path, protocol', [
+    (Streaming, '/bad', 'HTTP/1.0'),
+    (ClosedFile, '/closed', 'HTTP/1.1'),
+])
+def test_bad_response_only_closes_its_connection(serve, handler_class, path, protocol):
+    port = serve(hollywood.net.http.EventServer, handler_class)
+    other = _connect(port)
+    sock = _connect(port)
+    sock.sendall('GET %s %s\r\nHost: x\r\n\r\n' % (path, protocol))
+    data = ''
+    while True:
+        received = sock.recv(65536)
+        if not received:
+            break
+        data += received
+    sock.close()
+    # The server carries on, for old and new connections
+    other.sendall('GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+    assert _read_response(other)[0] == 200
+    other.close()
+    assert _get(port)[0] == 200
+
+
+def _parse(data, pieces=1, **limits):
+    parser = hollywood.net.http.RequestParser(**limits)
+    size = max(len(data) // pieces, 1)
+    requests = []
+    for start in range(0, len(data), size):
+        requests.extend(parser.feed(data[start:start + size]))
+    return parser, requests
+
+
+@pytest.mark.parametrize('pieces', [1, 7, 1000])
+def test_parser_in_pieces_of_any_size(pieces):
+    data = ('GET /a HTTP/1.1\r\nHost: x\r\n\r\n'
+            'POST /b HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello'
+            'POST /c HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+            '3\r\nabc\r\n2;ext\r\nde\r\n0\r\nX-Trailer: 1\r\n\r\n')
+    parser, requests = _parse(data, pieces)
+    assert parser.error is None
+    assert [(r.method, r.path, r.body) for r in requests] == [
+        ('GET', '/a', ''), ('POST', '/b', 'hello'), ('POST', '/c', 'abcde')]
+    assert requests[0].headers['HOST'] == 'x'
+
+
+@pytest.mark.parametrize('pieces', [1, 3])
+def test_parser_header_line_over_the_limit(pieces):
+    data = 'GET / HTTP/1.1\r\nX-Big: %s\r\n\r\n' % ('a' * 5000)
+    parser, requests = _parse(data, pieces, max_header_size=100)
+    assert requests == []
+    assert parser.error.code == 431
+
+
+def test_parser_headers_over_the_limit_all_together():
+    data = 'GET / HTTP/1.1\r\n' + ''.join('X-%i: %s\r\n' % (i, 'a' * 20) for i in range(10))
+    parser, requests = _parse(data + '\r\n', max_header_size=100)
+    assert parser.error.code == 431
+
+
+def test_parser_headers_at_the_limit():
+    head = 'GET / HTTP/1.1\r\nX: '
+    head += 'a' * (100 - len(head))
+    parser, requests = _parse(head + '\r\n\r\n', max_header_size=100)
+    assert parser.error is None
+    assert len(requests) == 1
+
+
+def test_parser_chunk_size_line_over_the_limit():
+    data = 'POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n1;%s\r\na\r\n0\r\n\r\n' % (
+        'x' * 2000)
+    parser, requests = _parse(data)
+    assert parser.error.code == 400
+
+
+def test_parser_trailers_over_the_limit():
+    data = ('POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n1\r\na\r\n0\r\n' +
+            'X-T: %s\r\n' % ('a' * 40) * 5 + '\r\n')
+    parser, requests = _parse(data, max_header_size=100)
+    assert parser.error.code == 431
+
+
+@pytest.mark.parametrize('data, code', [
+    ('POST / HTTP/1.1\r\nContent-Length: 2000\r\n\r\n', 413),
+    ('POST / HTTP/1.1\r\nContent-Length: nope\r\n\r\n', 400),
+    ('POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n', 400),
+    ('GET\r\n\r\n', 400),
+    ('GET / HTTP/1.1\r\nno separator\r\n\r\n', 400),
+])
+def test_parser_errors(data, code):
+    parser, requests = _parse(data, max_body_size=1000)
+    assert parser.error.code == code
+
+
+def test_parser_keeps_requests_before_an_error():
+    parser, requests = _parse('GET /a HTTP/1.1\r\n\r\nGET\r\n\r\n')
+    assert [request.path for request in requests] == ['/a']
+    assert parser.error.code == 400
+    assert parser.feed('GET /b HTTP/1.1\r\n\r\n') == []
+
+
+def test_oversized_header_is_answered_with_431(serve):
+    port = serve(hollywood.net.http.EventServer, Hello, max_header_size=100)
+    assert _get(port, headers='X-Big: %s\r\n' % ('a' * 5000))[0] == 431
+
+
+def _head(data):
+    """Status line and headers (a dict) of a serialized response."""
+    head = data.split('\r\n\r\n', 1)[0].split('\r\n')
+    return head[0], dict(line.split(': ', 1) for line in head[1:])
+
+
+def test_http_date():
+    assert hollywood.net.http.http_date(0) == 'Thu, 01 Jan 1970 00:00:00 GMT'
+    now = time.time()
+    assert hollywood.net.http.http_date(now) == email.utils.formatdate(now, usegmt=True)
+
+
+def test_current_date_is_formatted_once_per_second(monkeypatch):
+    monkeypatch.setattr(time, 'time', lambda: 86400.25)
+    assert hollywood.net.http.http_date() == 'Fri, 02 Jan 1970 00:00:00 GMT'
+    formatted = []
+    monkeypatch.setattr(hollywood.net.http, '_format_date',
+                        lambda date: formatted.append(date) or 'formatted')
+    monkeypatch.setattr(time, 'time', lambda: 86400.75)
+    assert hollywood.net.http.http_date() == 'Fri, 02 Jan 1970 00:00:00 GMT'
+    assert formatted == []
+    monkeypatch.setattr(time, 'time', lambda: 86401.0)
+    assert hollywood.net.http.http_date() == 'formatted'
+
+
+@pytest.mark.parametrize('protocol, keep_alive, connection', [
+    ('HTTP/1.1', True, 'keep-alive'),
+    ('HTTP/1.1', False, 'close'),
+    ('HTTP/1.0', False, 'close'),
+])
+def test_response_serialization(protocol, keep_alive, connection):
+    response = hollywood.net.http.Response(404)
+    response.protocol = protocol
+    response.keep_alive = keep_alive
+    response.content = 'missing'
+    response.content_type = 'text/plain'
+    response.headers.append(('X-Custom', 'yes'))
+    data = response.to_string()
+    status, headers = _head(data)
+    assert status == '%s 404 Not Found' % protocol
+    assert headers['Content-Length'] == '7'
+    assert headers['Content-Type'] == 'text/plain'
+    assert headers['Connection'] == connection
+    assert headers['X-Custom'] == 'yes'
+    assert 'Date' in headers
+    assert data.endswith('\r\n\r\nmissing')
+
+
+def test_not_modified_has_no_length():
+    status, headers = _head(hollywood.net.http.Response(304).to_string())
+    assert status == 'HTTP/1.0 304 Not Modified'
+    assert 'Content-Length' not in headers
+
+
+def test_redirect():
+    response = hollywood.net.http.Response()
+    response.redirect = '/elsewhere'
+    status, headers = _head(response.to_string())
+    assert status == 'HTTP/1.0 301 Moved Permanently'
+    assert headers['Location'] == '/elsewhere'
+
+
+def test_large_contents_arent_copied():
+    response = hollywood.net.http.Response()
+    response.content = 'a' * (hollywood.net.http.Response.inline_size + 1)
+    pieces = list(response.pieces())
+    assert len(pieces) == 2 and pieces[1] is response.content
+    response.content = 'small'
+    assert len(list(response.pieces())) == 1
+
+
+@pytest.mark.parametrize('protocol', ['HTTP/1.0', 'HTTP/1.1'])
+def test_streamed_response_serialization(protocol):
+    response = hollywood.net.http.Response()
+    response.protocol = protocol
+    response.keep_alive = True
+    response.content = iter(['ab', '', 'cde'])
+    data = response.to_string()
+    status, headers = _head(data)
+    body = data.split('\r\n\r\n', 1)[1]
+    if protocol == 'HTTP/1.1':
+        assert headers['Transfer-Encoding'] == 'chunked'
+        assert headers['Connection'] == 'keep-alive'
+        assert body == '2\r\nab\r\n3\r\ncde\r\n0\r\n\r\n'
+    else:
+        # The end of the content is the end of the connection
+        assert 'Content-Length' not in headers
+        assert headers['Connection'] == 'close'
+        assert body == 'abcde'
@@ -0,0 +1,150 @@
+import time
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+
+
+class Gate(hollywood.actor.Threaded):
+    """Holds on to its first message until 'release' is set."""
+
+    mailbox_size = 2
+
+    def __init__(self):
+        super(Gate, self).__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.received = []
+
+    def receive(self, message):
+        self.started.set()
+        self.release.wait(5)
+        self.received.append(message)
+        return message
+
+
+def _busy(actor_class):
+    """An actor stuck in its first message, with an empty inbox."""
+    address = hollywood.System.spawn_pool(actor_class, 1)
+    actor = address.actor.members[0]
+    address.tell('first')
+    assert actor.started.wait(1)
+    return actor
+
+
+def _drained(actor, timeout=1):
+    deadline = time.time() + timeout
+    while actor.depth() and time.time() < deadline:
+        time.sleep(0.01)
+    return actor.depth() == 0
+
+
+class Blocking(Gate):
+    overflow_timeout = 0.1
+
+
+class Rejecting(Gate):
+    overflow = 'reject'
+
+
+class DropNewest(Gate):
+    overflow = 'drop_newest'
+
+
+class DropOldest(Gate):
+    overflow = 'drop_oldest'
+
+
+def test_block_times_out():
+    actor = _busy(Blocking)
+    actor.tell(1)
+    actor.tell(2)
+    started = time.time()
+    with pytest.raises(hollywood.exceptions.MailboxFullError):
+        actor.tell(3)
+    assert time.time() - started >= 0.1
+    actor.release.set()
+
+
+def test_block_waits_for_room():
+    actor = _busy(Blocking)
+    actor.overflow_timeout = 2
+    actor.tell(1)
+    actor.tell(2)
+    threading.Timer(0.1, actor.release.set).start()
+    assert actor.ask(3).get(timeout=2) == 3
+
+
+def test_reject():
+    actor = _busy(Rejecting)
+    actor.tell(1)
+    actor.tell(2)
+    with pytest.raises(hollywood.exceptions.MailboxFullError):
+        actor.tell(3)
+    assert actor.pressure() == 1.0
+    actor.release.set()
+
+
+def test_drop_newest():
+    actor = _busy(DropNewest)
+    actor.tell(1)
+    actor.tell(2)
+    dropped = actor.ask(3)
+    with pytest.raises(hollywood.exceptions.MailboxFullError):
+        dropped.get(timeout=1)
+    actor.release.set()
+    assert _drained(actor)
+    assert actor.ask(4).get(timeout=1) == 4
+    assert actor.received == ['first', 1, 2, 4]
+    assert actor.dropped == 1
+
+
+def test_drop_oldest():
+    actor = _busy(DropOldest)
+    oldest = actor.ask(1)
+    actor.tell(2)
+    actor.tell(3)
+    with pytest.raises(hollywood.exceptions.MailboxFullError):
+        oldest.get(timeout=1)
+    actor.release.set()
+    assert _drained(actor)
+    assert actor.ask(4).get(timeout=1) == 4
+    assert actor.received == ['first', 2, 3, 4]
+
+
+def test_drop_oldest_skips_the_markers():
+    actor = _busy(DropOldest)
+    actor.inbox.put_nowait(hollywood.actor._WAKE)
+    oldest = actor.ask(1)
+    # Dropping 1, not the marker
+    actor.tell(2)
+    with pytest.raises(hollywood.exceptions.MailboxFullError):
+        oldest.get(timeout=1)
+    actor.release.set()
+    assert _drained(actor)
+    assert actor.ask(3).get(timeout=1) == 3
+    assert actor.received == ['first', 2, 3]
+
+
+def test_drop_oldest_keeps_the_stop_request():
+    actor = _busy(DropOldest)
+    actor.tell(1)
+    actor.drain()
+    actor.tell(2)
+    actor.release.set()
+    assert actor.terminated.wait(1)
+    # 1 was dropped, the drain marker wasn't
+    assert actor.received == ['first']
+
+
+def test_unbounded_by_default():
+    class Sink(hollywood.actor.Pooled):
+        def receive(self, message):
+            pass
+    actor = Sink()
+    for i in range(1000):
+        actor.tell(i)
+    assert actor.pressure() == 0.0
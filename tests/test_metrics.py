@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.metrics
+import hollywood.net.http
+
+
+class Gate(hollywood.actor.Threaded):
+    """Waits for 'release' before processing anything."""
+
+    def __init__(self):
+        super(Gate, self).__init__()
+        self.release = threading.Event()
+
+    def receive(self, message):
+        self.release.wait(5)
+        if message == 'fail':
+            raise ValueError(message)
+        return message
+
+
+class Bounded(Gate):
+
+    mailbox_size = 2
+    overflow = 'drop_newest'
+
+
+def test_histogram():
+    histogram = hollywood.metrics.Histogram()
+    for value in (0.0000005, 0.001, 0.001, 0.001, 100.0):
+        histogram.observe(value)
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(100.0030005)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[-1] == 1
+    assert 0.001 <= histogram.quantile(0.5) < 0.002
+    assert histogram.quantile(1.0) == float('inf')
+    assert hollywood.metrics.Histogram().quantile(0.5) == 0.0
+
+    other = hollywood.metrics.Histogram()
+    other.observe(0.001)
+    histogram.merge(other)
+    assert histogram.count == 6
+    assert histogram.snapshot()['buckets'] == histogram.counts
+
+
+def test_merged_metrics():
+    metrics, other = hollywood.metrics.Metrics(), hollywood.metrics.Metrics()
+    for _ in range(3):
+        metrics.enqueued(0)
+    for _ in range(2):
+        other.enqueued(0)
+        other.dequeued(0.001)
+    metrics.merge(other)
+    assert (metrics.received, metrics.processed, metrics.peak_depth) == (5, 2, 3)
+    assert metrics.wait.count == 2
+
+
+def test_actor_metrics(spawn):
+    actor = spawn(Gate)
+    futures = [actor.address.ask(message) for message in (1, 'fail', 2)]
+    stats = hollywood.System.stats()['actors'][actor.address.name]
+    assert stats['received'] == 3
+    assert stats['depth'] + stats['processed'] == 3
+    assert stats['peak_depth'] >= 2
+    actor.release.set()
+    with pytest.raises(ValueError):
+        futures[1].get(timeout=5)
+    assert futures[2].get(timeout=5) == 2
+    stats = hollywood.System.stats()['actors'][actor.address.name]
+    assert (stats['processed'], stats['errors'], stats['depth']) == (3, 1, 0)
+    assert stats['wait']['count'] == 3
+    assert stats['service']['count'] == 3
+
+
+def test_dropped_messages(spawn):
+    actor = spawn(Bounded)
+    for i in range(6):
+        actor.address.tell(i)
+    stats = hollywood.System.stats()['actors'][actor.address.name]
+    assert stats['dropped'] >= 3
+    assert stats['depth'] <= 2
+    actor.release.set()
+
+
+def test_stats_by_class():
+    address = hollywood.System.spawn_pool(Gate, 3)
+    for member in address.actor.members:
+        member.release.set()
+    for future in [address.ask(i) for i in range(9)]:
+        future.get(timeout=5)
+    stats = hollywood.System.stats()
+    name = hollywood.actor.Address.name_of(Gate)
+    assert stats['classes'][name]['processed'] == 9
+    assert sum(metrics['processed'] for actor, metrics in stats['actors'].items()
+               if actor.startswith(name)) == 9
+
+
+def test_prometheus_format():
+    metrics = hollywood.metrics.Metrics()
+    metrics.enqueued(0)
+    metrics.dequeued(0.001)
+    metrics.service.observe(0.5)
+    stats = {'actors': {'a"b': metrics.snapshot()}, 'classes': {}}
+    lines = hollywood.metrics.prometheus(stats).splitlines()
+    assert '# TYPE hollywood_actor_received_total counter' in lines
+    assert 'hollywood_actor_received_total{actor="a\\"b"} 1' in lines
+    assert 'hollywood_actor_depth{actor="a\\"b"} 0' in lines
+    assert '# TYPE hollywood_actor_service_seconds histogram' in lines
+    assert 'hollywood_actor_service_seconds_bucket{actor="a\\"b",le="+Inf"} 1' in lines
+    assert 'hollywood_actor_service_seconds_count{actor="a\\"b"} 1' in lines
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines
+               if line.startswith('hollywood_actor_queue_wait_seconds_bucket')]
+    assert buckets == sorted(buckets) and buckets[-1] == 1
+
+
+def test_metrics_handler(spawn, fake_request):
+    handler = spawn(hollywood.net.http.MetricsHandler)
+    request = fake_request('/metrics')
+    handler.address.tell(request)
+    response = request.response()
+    assert response.content_type.startswith('text/plain')
+    assert 'hollywood_actor_received_total{actor="%s"}' % handler.address.name in response.content
@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+
+
+class Worker(hollywood.actor.Process):
+
+    def __init__(self, greeting='hello'):
+        super(Worker, self).__init__()
+        self.greeting = greeting
+        self.count = 0
+
+    def receive(self, command, value=None):
+        self.count += 1
+        if command == 'pid':
+            return os.getpid()
+        if command == 'greet':
+            return '%s %s' % (self.greeting, value)
+        if command == 'count':
+            return self.count
+        if command == 'echo':
+            return value
+        if command == 'fail':
+            raise ValueError(value)
+        if command == 'unpicklable':
+            raise ValueError(lambda: None)
+        if command == 'sleep':
+            time.sleep(value)
+        if command == 'die':
+            os._exit(1)
+
+
+class BatchWorker(hollywood.actor.Process):
+
+    def receive_batch(self, messages):
+        return [(os.getpid(), len(messages))] * len(messages)
+
+
+def test_receive_runs_in_a_worker_process(spawn):
+    actor = spawn(Worker, 'hi')
+    assert actor.address.ask('pid').get(timeout=5) != os.getpid()
+    # Set up in __init__, before the fork
+    assert actor.address.ask('greet', 'there').get(timeout=5) == 'hi there'
+
+
+def test_state_lives_in_the_worker(spawn):
+    actor = spawn(Worker)
+    futures = [actor.address.ask('count') for _ in range(200)]
+    assert [future.get(timeout=5) for future in futures] == range(1, 201)
+    assert actor.count == 0
+
+
+@pytest.mark.parametrize('size', [10, 1024 * 1024])
+def test_large_strings_round_trip(spawn, size):
+    actor = spawn(Worker)
+    value = os.urandom(size)
+    assert actor.address.ask('echo', value).get(timeout=5) == value
+    assert actor.address.ask('echo', bytearray(value)).get(timeout=5) == bytearray(value)
+
+
+def test_exceptions_are_sent_back(spawn):
+    actor = spawn(Worker)
+    with pytest.raises(ValueError):
+        actor.address.ask('fail', 'oops').get(timeout=5)
+    with pytest.raises(hollywood.exceptions.ActorRuntimeError):
+        actor.address.ask('unpicklable').get(timeout=5)
+    assert actor.address.ask('echo', 1).get(timeout=5) == 1
+
+
+def test_worker_dying_fails_the_pending_futures(spawn):
+    actor = spawn(Worker)
+    # The others are sent to the worker while it sleeps
+    actor.address.tell('sleep', 0.2)
+    futures = [actor.address.ask('die')] + [actor.address.ask('echo', i) for i in range(5)]
+    for future in futures:
+        with pytest.raises(hollywood.exceptions.ActorRuntimeError):
+            future.get(timeout=5)
+    assert actor.terminated.wait(5)
+    assert actor.depth() == 0
+
+
+def test_stopping_resolves_every_future(spawn):
+    actor = spawn(Worker)
+    futures = [actor.address.ask('echo', i) for i in range(50)]
+    actor.address.stop()
+    for i, future in enumerate(futures):
+        try:
+            assert future.get(timeout=5) == i
+        except hollywood.exceptions.ActorRuntimeError:
+            pass
+    assert actor.terminated.wait(5)
+
+
+def test_stopping_before_any_message(spawn):
+    actor = spawn(Worker)
+    actor.address.stop()
+    assert actor.terminated.wait(1)
+    assert actor.process is None
+
+
+def test_batches_are_handed_over_to_receive_batch(spawn):
+    actor = spawn(BatchWorker)
+    futures = [actor.address.ask(i) for i in range(50)]
+    results = [future.get(timeout=5) for future in futures]
+    assert os.getpid() not in set(pid for pid, _ in results)
+    assert 1 <= min(size for _, size in results)
+    assert max(size for _, size in results) <= BatchWorker.batch_size
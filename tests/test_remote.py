@@ -0,0 +1,177 @@
+import os
+import socket
+import threading
+import multiprocessing
+import cPickle as pickle
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+import hollywood.remote
+
+
+class Echo(hollywood.actor.Threaded):
+
+    def receive(self, message):
+        if message == 'fail':
+            raise ValueError(message)
+        return message
+
+
+class Memory(hollywood.actor.Threaded):
+    """Remembers what it's told, answers where it lives."""
+
+    def __init__(self):
+        super(Memory, self).__init__()
+        self.told = []
+
+    def receive(self, message=None):
+        if message is None:
+            return os.getpid(), self.told
+        self.told.append(message)
+
+
+unpickled = threading.Event()
+
+
+def _unpickle():
+    unpickled.set()
+
+
+class _Payload(object):
+    """Sets 'unpickled' when it's unpickled."""
+
+    def __reduce__(self):
+        return _unpickle, ()
+
+
+@pytest.fixture
+def node(monkeypatch):
+    """A node listening on loopback with a secret, its 'host:port'."""
+    monkeypatch.setattr(hollywood.remote, '_secret', None)
+    hollywood.remote.authenticate('secret')
+    listening = hollywood.remote.listen(0)
+    yield '127.0.0.1:%i' % listening.port
+    listening.stop()
+
+
+def _serve_node(connection):
+    """Runs a node in a child process until told to stop."""
+    hollywood.remote._node = None
+    hollywood.remote._peers.clear()
+    hollywood.remote.authenticate('secret')
+    listening = hollywood.remote.listen(0)
+    connection.send(listening.port)
+    connection.recv()
+    listening.stop()
+
+
+@pytest.fixture
+def other_node(monkeypatch):
+    """A node in another process, its 'host:port'."""
+    monkeypatch.setattr(hollywood.remote, '_secret', None)
+    monkeypatch.setattr(hollywood.remote, '_peers', {})
+    connection, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_node, args=(child,))
+    process.daemon = True
+    process.start()
+    assert connection.poll(10)
+    yield '127.0.0.1:%i' % connection.recv()
+    for peer in hollywood.remote._peers.values():
+        peer.stop()
+    connection.send(None)
+    process.join(5)
+
+
+def test_listens_on_loopback_by_default(node):
+    assert hollywood.remote._node.address == '127.0.0.1'
+
+
+def test_listening_elsewhere_needs_a_secret(monkeypatch):
+    monkeypatch.setattr(hollywood.remote, '_secret', None)
+    with pytest.raises(ValueError):
+        hollywood.remote.listen(0, '0.0.0.0')
+    assert hollywood.remote._node is None
+
+
+def test_remote_actors(node):
+    address = hollywood.remote.spawn(node, Echo)
+    assert address.ask('hello').get(timeout=5) == 'hello'
+    with pytest.raises(ValueError):
+        address.ask('fail').get(timeout=5)
+    assert address.depth() == 0
+
+    hollywood.remote.export(address, 'echo')
+    assert hollywood.remote.lookup(node, 'echo').ask(42).get(timeout=5) == 42
+    with pytest.raises(hollywood.exceptions.ActorNotRegisteredError):
+        hollywood.remote.lookup(node, 'missing').ask(1).get(timeout=5)
+
+
+def _refused(sock):
+    """Whether the node closed the connection."""
+    sock.settimeout(5)
+    try:
+        while True:
+            if not sock.recv(65536):
+                return True
+    except socket.error:
+        return True
+
+
+def test_nothing_is_unpickled_before_the_handshake(node):
+    unpickled.clear()
+    host, port = node.split(':')
+    sock = socket.create_connection((host, int(port)))
+    data = pickle.dumps((None, 'x', 'tell', (_Payload(),), {}), pickle.HIGHEST_PROTOCOL)
+    sock.sendall((hollywood.remote._HEADER.pack(len(data)) + data) * 4)
+    assert _refused(sock)
+    assert not unpickled.is_set()
+
+
+def test_nodes_must_know_the_secret(node):
+    unpickled.clear()
+    host, port = node.split(':')
+    sock = socket.create_connection((host, int(port)))
+    sock.sendall(os.urandom(16) + '\0' * 32)
+    data = pickle.dumps((None, 'x', 'tell', (_Payload(),), {}), pickle.HIGHEST_PROTOCOL)
+    sock.sendall(hollywood.remote._HEADER.pack(len(data)) + data)
+    assert _refused(sock)
+    assert not unpickled.is_set()
+
+
+def test_peers_must_know_the_secret(monkeypatch):
+    """A peer refuses a node which can't answer its challenge."""
+    monkeypatch.setattr(hollywood.remote, 'HANDSHAKE_TIMEOUT', 5)
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    def impostor():
+        sock, _ = listener.accept()
+        sock.sendall(os.urandom(16) + '\0' * 32)
+        _refused(sock)
+        sock.close()
+    thread = threading.Thread(target=impostor)
+    thread.start()
+    with pytest.raises(hollywood.exceptions.NodeAuthenticationError):
+        hollywood.remote.peer('127.0.0.1:%i' % listener.getsockname()[1])
+    thread.join(5)
+    listener.close()
+
+
+def test_nodes_in_other_processes(other_node):
+    hollywood.remote.authenticate('secret')
+    address = hollywood.remote.spawn(other_node, Memory)
+    address.tell('first')
+    address.tell('second')
+    pid, told = address.ask().get(timeout=5)
+    assert pid != os.getpid()
+    assert told == ['first', 'second']
+    assert hollywood.remote.spawn(other_node, Echo).ask('hello').get(timeout=5) == 'hello'
+
+
+def test_nodes_in_other_processes_refuse_the_wrong_secret(other_node):
+    hollywood.remote.authenticate('wrong')
+    with pytest.raises(hollywood.exceptions.NodeAuthenticationError):
+        hollywood.remote.spawn(other_node, Echo)
@@ -0,0 +1,133 @@
+import time
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.router
+import hollywood.exceptions
+
+
+class Echo(hollywood.actor.Threaded):
+
+    def receive(self, message):
+        return message
+
+
+class Name(hollywood.actor.Pooled):
+
+    def receive(self, message):
+        return self.address.name
+
+
+class AsyncName(hollywood.actor.Asyncio):
+
+    def receive(self, message):
+        return self.address.name
+
+
+class Sleeper(hollywood.actor.Threaded):
+
+    def receive(self, seconds, started=None):
+        if started is not None:
+            started.set()
+        time.sleep(seconds)
+        return self.address.name
+
+
+def _members(address):
+    return address.actor.members
+
+
+def test_round_robin_takes_turns():
+    address = hollywood.System.spawn_pool(Name, 3)
+    names = [address.ask(i).get(timeout=1) for i in range(6)]
+    assert names[:3] == names[3:]
+    assert len(set(names)) == 3
+
+
+def test_consistent_hash_same_key_same_member():
+    address = hollywood.System.spawn_pool(Name, 4, hollywood.router.ConsistentHash())
+    for key in ('a', 'b', 'c'):
+        assert len(set(address.ask(key).get(timeout=1) for _ in range(5))) == 1
+
+
+def test_consistent_hash_only_moves_keys_of_removed_member():
+    strategy = hollywood.router.ConsistentHash()
+    address = hollywood.System.spawn_pool(Name, 4, strategy)
+    before = dict((key, address.ask(key).get(timeout=1)) for key in range(200))
+    removed = _members(address)[0]
+    address.actor.remove(removed)
+    after = dict((key, address.ask(key).get(timeout=1)) for key in range(200))
+    moved = [key for key in before if before[key] != after[key]]
+    assert moved
+    assert all(before[key] == removed.address.name for key in moved)
+
+
+def test_broadcast_reaches_every_member():
+    address = hollywood.System.spawn_pool(Name, 3, hollywood.router.Broadcast())
+    names = [future.get(timeout=1) for future in address.ask('x')]
+    assert len(set(names)) == 3
+
+
+def test_empty_router_raises():
+    router = hollywood.router.Router()
+    with pytest.raises(hollywood.exceptions.ActorNotRegisteredError):
+        router.address.tell('x')
+
+
+def test_depth_counts_the_message_in_flight():
+    address = hollywood.System.spawn_pool(Sleeper, 1)
+    started = threading.Event()
+    address.tell(0.3, started)
+    assert started.wait(1)
+    # Inbox empty, but busy
+    assert address.depth() == 1
+    address.tell(0)
+    assert address.depth() == 2
+
+
+def test_depth_of_asyncio_actor():
+    address = hollywood.System.spawn_pool(AsyncName, 1)
+    assert address.ask('x').get(timeout=1)
+    assert address.depth() == 0
+
+
+def test_least_loaded_with_asyncio_members():
+    address = hollywood.System.spawn_pool(AsyncName, 2, hollywood.router.LeastLoaded())
+    assert address.ask('x').get(timeout=1).startswith(address.name)
+
+
+def test_least_loaded_skips_busy_members():
+    address = hollywood.System.spawn_pool(Sleeper, 2, hollywood.router.LeastLoaded())
+    started = threading.Event()
+    busy = address.ask(0.3, started)
+    assert started.wait(1)
+    assert address.ask(0).get(timeout=1) != busy.get(timeout=1)
+
+
+def test_least_loaded_spreads_slow_messages():
+    address = hollywood.System.spawn_pool(Sleeper, 4, hollywood.router.LeastLoaded())
+    started = time.time()
+    futures = [address.ask(0.2) for _ in range(8)]
+    [future.get(timeout=5) for future in futures]
+    # Two rounds of four, not stacked on the same members
+    assert time.time() - started < 0.55
+
+
+class Doubler(hollywood.actor.Process):
+
+    def receive(self, number):
+        return number * 2
+
+
+def test_depth_of_process_actor_after_tells():
+    address = hollywood.System.spawn_pool(Doubler, 1)
+    for i in range(10):
+        address.tell(i)
+    assert address.ask(1).get(timeout=5) == 2
+    deadline = time.time() + 2
+    while address.depth() and time.time() < deadline:
+        time.sleep(0.01)
+    assert address.depth() == 0
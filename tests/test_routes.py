@@ -0,0 +1,84 @@
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.net.http
+import hollywood.net.routes
+import hollywood.net.static
+
+
+class Named(hollywood.actor.Threaded):
+    """Answers with its name and the parameters of the request."""
+
+    def __init__(self, name):
+        super(Named, self).__init__()
+        self.name = name
+
+    def receive(self, request):
+        response = hollywood.net.http.Response()
+        response.content = '%s %s' % (self.name, sorted(request.params.items()))
+        request.send(response)
+
+
+def _routes(spawn, *table, **options):
+    """A PathRouter to Named handlers, 'table' holds (pattern, name[, methods])."""
+    router = hollywood.net.routes.PathRouter(**options)
+    for route in table:
+        pattern, name, methods = (route + (None,))[:3]
+        router.add(pattern, spawn(Named, name).address, methods)
+    return router
+
+
+def _get(router, request):
+    router.tell(request)
+    return request.response()
+
+
+def test_routes_by_path(spawn, fake_request):
+    router = _routes(spawn, ('/', 'index'), ('/users/<id>', 'user'), ('/users/me', 'me'),
+                     ('/users/<id>/posts/<post>', 'post'), ('/static/*path', 'static'))
+    assert _get(router, fake_request('/')).content == 'index []'
+    assert _get(router, fake_request('/users/42?x=1')).content == "user [('id', '42')]"
+    assert _get(router, fake_request('/users/me')).content == 'me []'
+    assert (_get(router, fake_request('/users/1/posts/2')).content
+            == "post [('id', '1'), ('post', '2')]")
+    assert (_get(router, fake_request('/static/css/a.css')).content
+            == "static [('path', 'css/a.css')]")
+    assert _get(router, fake_request('/static')).content == "static [('path', '')]"
+    assert _get(router, fake_request('/missing')).code == 404
+
+
+def test_routes_by_method(spawn, fake_request):
+    router = _routes(spawn, ('/users', 'list', ['GET']), ('/users', 'create', ['POST']))
+    assert _get(router, fake_request('/users')).content == 'list []'
+    assert _get(router, fake_request('/users', 'POST')).content == 'create []'
+    response = _get(router, fake_request('/users', 'DELETE'))
+    assert response.code == 405
+    assert ('Allow', 'GET, POST') in response.headers
+
+
+def test_default_route(spawn, fake_request):
+    router = _routes(spawn, ('/a', 'a'), default=spawn(Named, 'default').address)
+    assert _get(router, fake_request('/b')).content == 'default []'
+
+
+def test_addresses_of_every_route(spawn):
+    default = spawn(Named, 'default').address
+    router = _routes(spawn, ('/a', 'a'), ('/b/<id>', 'b'), ('/c/*path', 'c'), default=default)
+    names = sorted(address.actor.name for address in router.addresses())
+    assert names == ['a', 'b', 'c', 'default']
+
+
+def test_ask_returns_the_future_of_the_route(spawn, fake_request):
+    router = _routes(spawn, ('/a', 'a'))
+    assert router.ask(fake_request('/a')).get(timeout=5) is None
+    assert router.ask(fake_request('/b')).get(timeout=5).code == 404
+
+
+def test_serves_files_under_a_route(spawn, fake_request, tmpdir):
+    tmpdir.mkdir('css').join('a.css').write('body {}')
+    router = hollywood.net.routes.PathRouter()
+    router.add('/static/*path', spawn(hollywood.net.static.FileHandler, str(tmpdir)).address)
+    response = _get(router, fake_request('/static/css/a.css'))
+    assert (response.code, response.content) == (200, 'body {}')
+    assert _get(router, fake_request('/static/../../etc/passwd')).code == 404
@@ -0,0 +1,85 @@
+import time
+import threading
+
+import hollywood
+import hollywood.actor
+import hollywood.scheduler
+
+
+class Counter(hollywood.actor.Pooled):
+
+    def __init__(self):
+        super(Counter, self).__init__()
+        self.count = 0
+        self.threads = set()
+
+    def receive(self, message):
+        # Not thread safe on purpose: messages must be processed one at a time
+        count = self.count
+        time.sleep(0)
+        self.count = count + 1
+        self.threads.add(threading.current_thread().name)
+        return self.count
+
+
+def _workers():
+    return [thread for thread in threading.enumerate()
+            if thread.name.startswith('hollywood/scheduler/')]
+
+
+def test_messages_are_processed_sequentially():
+    actor = Counter()
+    futures = [actor.ask(i) for i in range(500)]
+    assert [future.get(timeout=5) for future in futures] == list(range(1, 501))
+
+
+def test_many_actors_share_the_workers():
+    actors = [Counter() for _ in range(1000)]
+    futures = [actor.ask(None) for actor in actors]
+    assert all(future.get(timeout=5) == 1 for future in futures)
+    assert len(_workers()) == hollywood.actor.Pooled.scheduler.workers
+
+
+def test_quantum_yields_the_worker():
+    scheduler = hollywood.scheduler.Scheduler(workers=1, quantum=1)
+    order = []
+
+    class Recorder(hollywood.actor.Pooled):
+        def receive(self, message):
+            if callable(message):
+                message(1)
+            order.append(message)
+    Recorder.scheduler = scheduler
+    first, second = Recorder(), Recorder()
+    gate = threading.Event()
+    first.tell(gate.wait)
+    time.sleep(0.05)
+    for i in range(3):
+        first.tell(('first', i))
+        second.tell(('second', i))
+    gate.set()
+    deadline = time.time() + 2
+    while len(order) < 7 and time.time() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    # Interleaved rather than one actor after the other
+    names = [message[0] for message in order[1:]]
+    assert len(names) == 6
+    assert all(name != following for name, following in zip(names, names[1:]))
+
+
+def test_restarts_after_stop():
+    actor = Counter()
+    assert actor.ask(None).get(timeout=1) == 1
+    hollywood.scheduler.stop_all()
+    assert not _workers()
+    assert actor.ask(None).get(timeout=1) == 2
+
+
+def test_stop_while_busy_does_not_restart_the_workers():
+    actor = Counter()
+    for i in range(2000):
+        actor.tell(i)
+    hollywood.actor.Pooled.scheduler.stop(1.0)
+    time.sleep(0.1)
+    assert not _workers()
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.os.shell
+
+
+class Collector(hollywood.actor.Threaded):
+    """Keeps what commands tell it."""
+
+    def __init__(self):
+        super(Collector, self).__init__()
+        self.told = []
+
+    def receive(self, stream, data=None):
+        if stream == 'sync':
+            return self.told
+        self.told.append((stream, data))
+
+
+class Preforked(hollywood.os.shell.Command):
+
+    prefork = True
+
+
+@pytest.fixture(params=[hollywood.os.shell.Command, Preforked])
+def command_class(request):
+    return request.param
+
+
+def test_runs_commands(spawn, command_class):
+    command = spawn(command_class).address
+    assert command.ask('echo hello').get(timeout=5) == (0, 'hello\n', '')
+    assert command.ask('echo oops >&2; exit 3', shell=True).get(timeout=5) == (3, '', 'oops\n')
+    assert command.ask('pwd', cwd='/tmp').get(timeout=5)[1] == '/tmp\n'
+    assert command.ask('echo $NAME', env={'NAME': 'x'}, shell=True).get(timeout=5)[1] == 'x\n'
+
+
+def test_streams_the_output(spawn, command_class):
+    command = spawn(command_class).address
+    collector = spawn(Collector).address
+    result = command.ask('printf "a\\nb"; printf c >&2', shell=True, target=collector)
+    assert result.get(timeout=5) == (0, None, None)
+    told = collector.ask('sync').get(timeout=5)
+    assert ''.join(data for stream, data in told if stream == 'stdout') == 'a\nb'
+    assert ''.join(data for stream, data in told if stream == 'stderr') == 'c'
+
+
+def test_streams_lines(spawn):
+    command = spawn(hollywood.os.shell.Command).address
+    collector = spawn(Collector).address
+    script = 'printf "one\\ntw"; sleep 0.05; printf "o\\nthree\\nfour"'
+    command.ask(script, shell=True, target=collector, lines=True).get(timeout=5)
+    assert collector.ask('sync').get(timeout=5) == [
+        ('stdout', 'one\n'), ('stdout', 'two\n'), ('stdout', 'three\n'), ('stdout', 'four')]
+
+
+def test_timeout_kills_the_command_and_its_children(spawn, command_class, tmpdir):
+    command = spawn(command_class).address
+    marker = tmpdir.join('marker')
+    started = time.time()
+    future = command.ask('(sleep 0.5; touch %s) & sleep 5' % marker, shell=True, timeout=0.2)
+    with pytest.raises(hollywood.os.shell.CommandTimeoutError):
+        future.get(timeout=5)
+    assert time.time() - started < 2
+    time.sleep(0.6)
+    assert not marker.check()
+
+
+def test_pool_runs_commands_in_parallel():
+    commands = hollywood.os.shell.pool(4)
+    started = time.time()
+    futures = [commands.ask('sleep 0.3') for _ in range(4)]
+    assert [future.get(timeout=5)[0] for future in futures] == [0] * 4
+    assert time.time() - started < 1.0
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import hollywood.net.http
+import hollywood.net.static
+
+
+def _files(spawn, tmpdir, **contents):
+    """A FileHandler serving 'contents' from 'tmpdir'."""
+    for name, content in contents.items():
+        tmpdir.join(name).write(content)
+    return spawn(hollywood.net.static.FileHandler, str(tmpdir))
+
+
+def _request(handler, path, headers=''):
+    request = hollywood.net.http.Request(
+        raw_string='GET %s HTTP/1.1\r\nHost: x\r\n%s\r\n' % (path, headers))
+    return handler.respond(request)
+
+
+def _cached(handler):
+    return sum(len(entry.content) for entry in handler.cache.values()
+               if entry.content is not None)
+
+
+def test_serves_files(spawn, tmpdir):
+    handler = _files(spawn, tmpdir, a='hello')
+    response = _request(handler, '/a')
+    assert (response.code, response.content) == (200, 'hello')
+    assert _request(handler, '/missing').code == 404
+    assert _request(handler, '/../../etc/passwd').code == 404
+
+
+@pytest.mark.parametrize('check_interval', [0, 60])
+def test_cache_hits_dont_count_twice(spawn, tmpdir, check_interval):
+    handler = _files(spawn, tmpdir, a='a' * 100, b='b' * 10)
+    handler.check_interval = check_interval
+    for _ in range(5):
+        _request(handler, '/a')
+        _request(handler, '/b')
+    assert handler.cached_bytes == _cached(handler) == 110
+
+
+def test_least_recently_used_files_are_evicted(spawn, tmpdir):
+    handler = _files(spawn, tmpdir, a='a' * 100, b='b' * 100, c='c' * 100)
+    handler.cache_size = 250
+    _request(handler, '/a')
+    _request(handler, '/b')
+    _request(handler, '/a')
+    _request(handler, '/c')
+    assert list(handler.cache) == [os.path.join(handler.root, name) for name in 'ac']
+    assert handler.cached_bytes == _cached(handler) == 200
+
+
+def test_changed_files_are_reloaded(spawn, tmpdir):
+    handler = _files(spawn, tmpdir, a='old')
+    handler.check_interval = 0
+    assert _request(handler, '/a').content == 'old'
+    tmpdir.join('a').write('newer')
+    assert _request(handler, '/a').content == 'newer'
+    assert handler.cached_bytes == _cached(handler) == 5
+
+
+def test_conditional_requests(spawn, tmpdir):
+    handler = _files(spawn, tmpdir, a='hello')
+    etag = dict(_request(handler, '/a').headers)['ETag']
+    assert _request(handler, '/a', 'If-None-Match: %s\r\n' % etag).code == 304
+    assert _request(handler, '/a', 'If-None-Match: "other"\r\n').code == 200
+
+
+@pytest.mark.parametrize('header, code, content', [
+    ('bytes=1-2', 206, 'el'),
+    ('bytes=-2', 206, 'lo'),
+    ('bytes=3-', 206, 'lo'),
+    ('bytes=10-', 416, None),
+    ('lines=1-2', 200, 'hello'),
+])
+def test_ranges(spawn, tmpdir, header, code, content):
+    response = _request(_files(spawn, tmpdir, a='hello'), '/a', 'Range: %s\r\n' % header)
+    assert response.code == code
+    if content is not None:
+        assert response.content == content
+
+
+def test_large_files_are_sent_from_disk(spawn, tmpdir):
+    handler = _files(spawn, tmpdir, a='a' * 100)
+    handler.max_cached_file = 10
+    response = _request(handler, '/a', 'Range: bytes=10-19\r\n')
+    assert isinstance(response.content, hollywood.net.http.FileRange)
+    assert str(response.content) == 'a' * 10
+    response.content.file.close()
+    assert handler.cached_bytes == 0
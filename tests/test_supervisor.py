@@ -0,0 +1,112 @@
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+import hollywood.supervisor
+
+
+class Counter(hollywood.actor.Threaded):
+    """Counts its messages since it was (re)started."""
+
+    def __init__(self, start=0):
+        super(Counter, self).__init__()
+        self.count = start
+
+    def receive(self, message):
+        if message == 'fail':
+            raise ValueError(message)
+        if message == 'instance':
+            return id(self)
+        self.count += 1
+        return self.count
+
+
+class PooledCounter(hollywood.actor.Pooled):
+
+    def __init__(self, start=0):
+        super(PooledCounter, self).__init__()
+        self.count = start
+
+    receive = Counter.receive.im_func
+
+
+class Other(Counter):
+    pass
+
+
+class Worker(hollywood.actor.Process):
+
+    def receive(self, message):
+        return message
+
+
+class Fast(hollywood.supervisor.Supervisor):
+
+    backoff = 0.01
+
+
+class AllForOne(Fast):
+
+    strategy = 'one_for_all'
+
+
+class GivingUp(Fast):
+
+    max_restarts = 2
+
+
+@pytest.mark.parametrize('actor_class', [Counter, PooledCounter])
+def test_failed_actors_are_restarted(spawn, actor_class):
+    supervisor = spawn(Fast).address
+    address = supervisor.ask(actor_class, 10).get(timeout=5)
+    assert address.ask('x').get(timeout=5) == 11
+    failed = address.ask('fail')
+    # Queued behind the failure, handled by the new instance
+    queued = [address.ask('x') for _ in range(3)]
+    with pytest.raises(ValueError):
+        failed.get(timeout=5)
+    assert [future.get(timeout=5) for future in queued] == [11, 12, 13]
+
+
+def test_one_for_one_restarts_the_failed_actor_only(spawn):
+    supervisor = spawn(Fast).address
+    first = supervisor.ask(Counter).get(timeout=5)
+    second = supervisor.ask(Other).get(timeout=5)
+    instances = first.ask('instance').get(timeout=5), second.ask('instance').get(timeout=5)
+    first.tell('fail')
+    assert first.ask('instance').get(timeout=5) != instances[0]
+    assert second.ask('instance').get(timeout=5) == instances[1]
+
+
+def test_one_for_all_restarts_them_all(spawn):
+    supervisor = spawn(AllForOne).address
+    first = supervisor.ask(Counter).get(timeout=5)
+    second = supervisor.ask(Other).get(timeout=5)
+    assert second.ask('x').get(timeout=5) == 1
+    first.tell('fail')
+    assert first.ask('x').get(timeout=5) == 1
+    # Restarted too, the count starts over
+    assert second.ask('x').get(timeout=5) == 1
+
+
+def test_supervisor_gives_up(spawn):
+    supervisor = spawn(GivingUp)
+    address = supervisor.address.ask(Counter).get(timeout=5)
+    for _ in range(GivingUp.max_restarts):
+        with pytest.raises(ValueError):
+            address.ask('fail').get(timeout=5)
+        assert address.ask('x').get(timeout=5) == 1
+    failed = address.ask('fail')
+    left = address.ask('x')
+    with pytest.raises(ValueError):
+        failed.get(timeout=5)
+    with pytest.raises(hollywood.exceptions.ActorRuntimeError):
+        left.get(timeout=5)
+    assert supervisor.terminated.wait(5)
+
+
+def test_process_actors_cant_be_supervised(spawn):
+    supervisor = spawn(Fast).address
+    with pytest.raises(TypeError):
+        supervisor.ask(Worker).get(timeout=5)
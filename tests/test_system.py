@@ -0,0 +1,119 @@
+import time
+import threading
+
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.exceptions
+
+
+class Echo(hollywood.actor.Threaded):
+
+    def receive(self, message):
+        return message
+
+
+class Sink(hollywood.actor.Threaded):
+
+    def __init__(self, log):
+        super(Sink, self).__init__()
+        self.log = log
+
+    def receive(self, message):
+        time.sleep(0.01)
+        self.log.append(('sink', message))
+
+
+class Front(hollywood.actor.Pooled):
+    """Forwards everything to its Sink."""
+
+    def __init__(self, log):
+        super(Front, self).__init__()
+        self.log = log
+        self.sink = hollywood.System.spawn(Sink, log)
+
+    def receive(self, message):
+        time.sleep(0.01)
+        self.log.append(('front', message))
+        self.sink.tell(message)
+
+
+class Busy(hollywood.actor.Threaded):
+
+    def receive(self, seconds):
+        time.sleep(seconds)
+
+
+class Full(hollywood.actor.Threaded):
+
+    mailbox_size = 2
+
+    def receive(self, event):
+        event.wait(5)
+
+
+def test_halt_is_quick_when_idle():
+    hollywood.System.spawn_pool(Echo, 20)
+    hollywood.System.spawn(Echo).ask('x').get(timeout=1)
+    started = time.time()
+    hollywood.System.halt()
+    assert time.time() - started < 0.5
+    assert hollywood.System.alive() == 0
+
+
+def test_halt_drains_senders_before_receivers():
+    log = []
+    front = hollywood.System.spawn(Front, log)
+    for i in range(10):
+        front.tell(i)
+    hollywood.System.halt()
+    # Nothing lost: the sink was still running while the front drained
+    assert [message for actor, message in log if actor == 'front'] == list(range(10))
+    assert [message for actor, message in log if actor == 'sink'] == list(range(10))
+
+
+def test_halt_stops_busy_actors_at_the_deadline():
+    busy = hollywood.System.spawn(Busy)
+    busy.tell(1)
+    queued = [busy.ask(0) for _ in range(3)]
+    started = time.time()
+    hollywood.System.halt(timeout=0.3)
+    assert time.time() - started < 0.8
+    for future in queued:
+        with pytest.raises(hollywood.exceptions.ActorRuntimeError):
+            future.get(timeout=1)
+
+
+def test_halt_drains_full_inboxes_once_there_is_room():
+    full = hollywood.System.spawn(Full)
+    events = [threading.Event() for _ in range(3)]
+    futures = [full.ask(event) for event in events]
+    # Room in the inbox only once the first message is done
+    threading.Timer(0.1, lambda: [event.set() for event in events]).start()
+    started = time.time()
+    hollywood.System.halt(timeout=2)
+    assert time.time() - started < 1
+    assert all(future.get(timeout=1) is None for future in futures)
+
+
+def test_halt_doesnt_wait_for_application_threads():
+    done = threading.Event()
+    thread = threading.Thread(target=done.wait, args=(5,))
+    thread.start()
+    try:
+        hollywood.System.spawn(Echo).ask('x').get(timeout=1)
+        started = time.time()
+        hollywood.System.halt(timeout=2)
+        assert time.time() - started < 0.5
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_spawn_after_halt_starts_a_new_actor():
+    first = hollywood.System.spawn(Echo)
+    hollywood.System.halt()
+    second = hollywood.System.spawn(Echo)
+    assert second is not first
+    assert second.ask('again').get(timeout=1) == 'again'
@@ -0,0 +1,122 @@
+import sys
+import time
+import socket
+import subprocess
+
+import ssl
+import pytest
+
+import hollywood
+import hollywood.actor
+import hollywood.metrics
+import hollywood.net.http
+import hollywood.net.tls
+
+
+class Hello(hollywood.actor.Threaded):
+
+    def receive(self, request):
+        response = hollywood.net.http.Response()
+        response.content = 'hello'
+        request.send(response)
+
+
+@pytest.fixture(scope='module')
+def certfile(tmpdir_factory):
+    """A self-signed certificate, along with its key."""
+    path = str(tmpdir_factory.mktemp('tls').join('server.pem'))
+    try:
+        subprocess.check_call(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-subj', '/CN=localhost', '-keyout', path, '-out', path],
+            stdout=open('/dev/null', 'w'), stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip('openssl is needed to create a certificate')
+    return path
+
+
+def _get(port):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.settimeout(5)
+    sock = ssl.wrap_socket(sock)
+    try:
+        sock.sendall('GET / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        # Read up to the end of the content, the server may not shut TLS down
+        data = ''
+        while '\r\n\r\n' not in data or len(data) < _length(data):
+            received = sock.recv(65536)
+            if not received:
+                break
+            data += received
+        return data
+    finally:
+        sock.close()
+
+
+def _length(data):
+    """Length of the response at the start of 'data'."""
+    head = data.split('\r\n\r\n', 1)[0]
+    for line in head.split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            return len(head) + 4 + int(value)
+    return len(data) + 1
+
+
+@pytest.mark.parametrize('server_class', [hollywood.net.http.Server,
+                                          hollywood.net.http.EventServer])
+def test_serves_https(serve, certfile, server_class):
+    port = serve(server_class, Hello, certfile)
+    before = hollywood.net.tls.context(certfile).stats()['handshakes']
+    for _ in range(2):
+        response = _get(port)
+        assert response.startswith('HTTP/1.1 200') and response.endswith('hello')
+    stats = hollywood.System.stats()['tls'][certfile]
+    assert stats['handshakes'] == before + 2
+    assert stats['handshake_latency'] > 0
+
+
+def test_failed_handshakes_are_counted(serve, certfile):
+    port = serve(hollywood.net.http.EventServer, Hello, certfile)
+    _get(port)
+    before = hollywood.net.tls.context(certfile).stats()['handshake_failures']
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall('GET / HTTP/1.1\r\n\r\n')
+    sock.settimeout(5)
+    try:
+        while sock.recv(65536):
+            pass
+    except socket.error:
+        pass
+    sock.close()
+    deadline = time.time() + 5
+    while hollywood.System.stats()['tls'][certfile]['handshake_failures'] == before:
+        assert time.time() < deadline
+        time.sleep(0.02)
+
+
+def test_contexts_sharing_a_certificate_are_added_up(certfile):
+    before = hollywood.net.tls.context(certfile).stats()['handshakes']
+    for ciphers in (hollywood.net.tls.CIPHERS, 'ECDHE+AESGCM'):
+        hollywood.net.tls.context(certfile, ciphers=ciphers).completed(time.time())
+    assert hollywood.System.stats()['tls'][certfile]['handshakes'] == before + 2
+
+
+def test_core_doesnt_import_tls():
+    subprocess.check_call([sys.executable, '-c', (
+        "import sys, hollywood; "
+        "sys.exit('hollywood.net.tls' in sys.modules)")])
+
+
+def test_tls_stats_in_prometheus():
+    stats = {'actors': {}, 'classes': {}, 'tls': {'/etc/"a".pem': {
+        'handshakes': 4, 'handshake_failures': 1, 'handshake_latency': 0.25,
+        'sessions_resumed': 3, 'resumption_ratio': 0.75}}}
+    lines = hollywood.metrics.prometheus(stats).splitlines()
+    for line in ('# TYPE hollywood_tls_handshakes_total counter',
+                 'hollywood_tls_handshakes_total{certificate="/etc/\\"a\\".pem"} 4',
+                 'hollywood_tls_handshake_failures_total{certificate="/etc/\\"a\\".pem"} 1',
+                 'hollywood_tls_handshake_latency_seconds{certificate="/etc/\\"a\\".pem"} 0.25',
+                 'hollywood_tls_sessions_resumed_total{certificate="/etc/\\"a\\".pem"} 3',
+                 'hollywood_tls_resumption_ratio{certificate="/etc/\\"a\\".pem"} 0.75'):
+        assert line in lines